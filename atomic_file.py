@@ -0,0 +1,34 @@
+"""Atomic writes of the workflow's local files (caches, state, progress)."""
+
+import json
+import os
+from typing import Any
+
+
+def write_bytes(path: str, data: bytes, mode: int = 0o666) -> None:
+    """Write a file atomically via a temporary file next to it.
+
+    Missing parent directories are created. ``mode`` is the permission of a
+    newly created file, before the umask.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_json(path: str, data: Any, mode: int = 0o666) -> None:
+    """Write compact JSON atomically, keeping non-ASCII text as is."""
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    write_bytes(path, text.encode("utf-8"), mode)
+
+
+def read_json(path: str) -> Any:
+    """Parsed contents of a JSON file, or None if it is missing or broken."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
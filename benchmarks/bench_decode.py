@@ -0,0 +1,107 @@
+"""Benchmark: per-row modifier/glyph decoding vs the precomputed batch decoder.
+
+The per-row baseline is the original implementation: ``int()`` on every
+field, a fresh list and ``"+".join`` per modifier mask.
+
+Usage: python benchmarks/bench_decode.py [--rows N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_extractor import GLYPH_MAP, decode_columns  # noqa: E402
+
+Columns = Tuple[List[str], List[str], List[str]]
+
+
+def legacy_decode_modifiers(mask: int) -> str:
+    parts: List[str] = []
+    if not (mask & 8):
+        parts.append("Cmd")
+    if mask & 4:
+        parts.append("Ctrl")
+    if mask & 1:
+        parts.append("Shift")
+    if mask & 2:
+        parts.append("Opt")
+    return "+".join(parts)
+
+
+def legacy_decode_glyph(code: int) -> str:
+    return GLYPH_MAP.get(code, f"Glyph({code})")
+
+
+def legacy_columns(
+    mods: Sequence[str], chars: Sequence[str], glyphs: Sequence[str]
+) -> Tuple[List[str], List[str]]:
+    modifiers: List[str] = []
+    keys: List[str] = []
+    for mod_raw, char_raw, glyph_raw in zip(mods, chars, glyphs):
+        modifier = ""
+        key = ""
+        if char_raw or glyph_raw:
+            if mod_raw:
+                modifier = legacy_decode_modifiers(int(mod_raw))
+            if char_raw:
+                key = char_raw
+            elif glyph_raw:
+                key = legacy_decode_glyph(int(glyph_raw))
+        modifiers.append(modifier)
+        keys.append(key)
+    return modifiers, keys
+
+
+def synthetic_columns(rows: int, seed: int = 0) -> Columns:
+    """Raw columns where about half the rows have a shortcut, 1 in 5 a glyph."""
+    rng = random.Random(seed)
+    glyph_codes = list(GLYPH_MAP)
+    mods: List[str] = []
+    chars: List[str] = []
+    glyphs: List[str] = []
+    for _ in range(rows):
+        kind = rng.random()
+        mods.append(str(rng.randrange(16)) if kind < 0.5 else "")
+        if kind < 0.4:
+            chars.append(chr(65 + rng.randrange(26)))
+            glyphs.append("")
+        elif kind < 0.5:
+            chars.append("")
+            glyphs.append(str(rng.choice(glyph_codes)))
+        else:
+            chars.append("")
+            glyphs.append("")
+    return mods, chars, glyphs
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'per-row (s)':>12} {'batch (s)':>12} {'speedup':>8}")
+    for n in args.rows:
+        cols = synthetic_columns(n)
+        assert legacy_columns(*cols) == decode_columns(*cols)
+        old = best_of(lambda: legacy_columns(*cols), args.repeat)
+        new = best_of(lambda: decode_columns(*cols), args.repeat)
+        print(f"{n:>8} {old:>12.4f} {new:>12.4f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark: memory of MenuTree vs the list of (modifier, key, levels) tuples.
+
+A synthetic osascript dump is parsed with ``_parse_output`` so strings are
+allocated the way they are in a real run (one per field per row). Retained
+memory is measured with tracemalloc after the intermediate data is freed.
+
+Usage: python benchmarks/bench_menu_tree.py [--items N] [--depth D]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_extractor import MenuItem, _parse_output  # noqa: E402
+from menu_tree import MenuTree  # noqa: E402
+
+
+def synthetic_dump(items: int, depth: int, menus: int = 10) -> str:
+    """Tab-delimited dump with ``items`` rows spread over ``menus`` menus."""
+    lines = ["App"]
+    per_menu = max(items // menus, 1)
+    fanout = max(int(round(per_menu ** (1 / max(depth - 1, 1)))), 2)
+    for m in range(menus):
+        count = 0
+
+        def _walk(path: List[str], level: int) -> None:
+            nonlocal count
+            for i in range(fanout):
+                if count >= per_menu:
+                    return
+                count += 1
+                this = path + [f"Item {m + 1}-{count}"]
+                shortcut = ("0", chr(65 + i % 26), "") if i % 3 == 0 else ("", "", "")
+                lines.append("\t".join(shortcut + tuple(this)))
+                if level < depth:
+                    _walk(this, level + 1)
+
+        _walk([f"Menu {m + 1}"], 2)
+    return "\n".join(lines) + "\n"
+
+
+def retained(build: Callable[[], object]) -> Tuple[int, float, object]:
+    """Bytes still allocated by ``build()``'s result, and its build time."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--depth", type=int, default=4)
+    args = parser.parse_args()
+
+    raw = synthetic_dump(args.items, args.depth)
+    _, items = _parse_output(raw)
+
+    def _tuples() -> List[MenuItem]:
+        return _parse_output(raw)[1]
+
+    def _tree() -> MenuTree:
+        return MenuTree.from_items(_parse_output(raw)[1])
+
+    list_bytes, list_time, _ = retained(_tuples)
+    tree_bytes, tree_time, tree = retained(_tree)
+    assert isinstance(tree, MenuTree)
+    assert list(tree.iter_items()) == items
+
+    start = time.perf_counter()
+    for _ in tree.iter_items():
+        pass
+    iter_time = time.perf_counter() - start
+
+    print(f"rows: {len(items):,}  nodes: {tree.node_count:,}  names: {len(tree.names):,}")
+    print(f"list of tuples: {list_bytes / 1e6:8.2f} MB  (parse {list_time:.3f} s)")
+    print(f"MenuTree:       {tree_bytes / 1e6:8.2f} MB  (parse + build {tree_time:.3f} s)")
+    print(f"ratio:          {list_bytes / tree_bytes:8.1f}x")
+    print(f"iter_items():   {iter_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
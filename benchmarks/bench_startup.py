@@ -0,0 +1,97 @@
+"""Benchmark: module import cost of the workflow entry point.
+
+Runs ``python -X importtime`` in a fresh interpreter for each target and
+reports the cumulative import time of the heaviest modules. With
+``--max-ms`` the script exits non-zero when ``import main`` gets slower,
+so regressions (e.g. a heavy top-level import) are caught.
+
+Usage: python benchmarks/bench_startup.py [--top N] [--max-ms MS] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ["main", "menu_extractor", "sheet_writer"]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for each module ``module`` imports.
+
+    Interpreter startup (``site`` and ``.pth`` hooks) is excluded: only the
+    subtree ending at the target's own line is kept.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    rows: List[Tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            # A top-level import closes the previous subtree
+            if name.strip() == module:
+                rows.append((module, int(self_us), int(cumulative_us)))
+                return rows
+            rows = []
+            continue
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def measure(module: str, repeat: int) -> Dict[str, object]:
+    """Median total import time of ``module`` and its heaviest dependencies."""
+    totals: List[int] = []
+    runs: List[List[Tuple[str, int, int]]] = []
+    for _ in range(repeat):
+        rows = import_times(module)
+        runs.append(rows)
+        totals.append(next(cum for name, _, cum in rows if name == module))
+    median = statistics.median(totals)
+    rows = runs[totals.index(min(totals, key=lambda t: abs(t - median)))]
+    return {
+        "module": module,
+        "total_ms": median / 1000,
+        "modules": {name: cum / 1000 for name, _, cum in rows},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [measure(target, args.repeat) for target in TARGETS]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"import {result['module']}: {result['total_ms']:.1f} ms")
+            modules: Dict[str, float] = result["modules"]  # type: ignore[assignment]
+            heaviest = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)
+            for name, ms in heaviest[: args.top]:
+                print(f"  {ms:>8.1f} ms  {name}")
+
+    main_ms: float = results[0]["total_ms"]  # type: ignore[assignment]
+    if args.max_ms is not None and main_ms > args.max_ms:
+        print(f"import main took {main_ms:.1f} ms (> {args.max_ms} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
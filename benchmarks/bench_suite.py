@@ -0,0 +1,413 @@
+"""Benchmark suite: offline end-to-end runs and parser throughput.
+
+A stub ``osascript`` is put on PATH that answers the workflow's scripts
+with a synthetic menu dump of the requested size and depth after a
+configurable delay, and records notifications. A local HTTP server stands
+in for the token endpoint and the Sheets/Drive APIs. ``main.main()`` runs
+in a fresh interpreter inside a temporary workflow directory (as built by
+``make build``) with Google API URLs rewritten to the local server.
+
+Measured per size: wall time of the whole process, ``main.main()`` time,
+peak RSS, and ``_parse_output`` / ``_parse_records`` throughput. Results
+are written as JSON; ``--compare`` prints the change against an earlier
+result file and ``--max-regression`` fails when a metric got worse.
+
+Usage: python benchmarks/bench_suite.py [--items N ...] [--output FILE]
+       [--compare FILE] [--max-regression PCT]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SUCCESS = "スプレッドシートに書き込みました"
+
+# Run in the child interpreter: route Google API calls to the local server,
+# then time main.main() and report peak RSS.
+BOOTSTRAP = """\
+import json, resource, sys, time
+import requests
+
+base = sys.argv[1]
+_request = requests.Session.request
+
+def request(self, method, url, *args, **kwargs):
+    for host in ("https://sheets.googleapis.com", "https://www.googleapis.com"):
+        url = url.replace(host, base)
+    return _request(self, method, url, *args, **kwargs)
+
+requests.Session.request = request
+start = time.perf_counter()
+import main
+main.main()
+seconds = time.perf_counter() - start
+print(json.dumps({"main_seconds": seconds, "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+STUB_OSASCRIPT = """\
+#!{python}
+import sys
+sys.path.insert(0, {bench_dir!r})
+from bench_suite import stub_main
+stub_main(sys.argv)
+"""
+
+
+def synthetic_rows(items: int, depth: int, menus: int = 10) -> List[List[str]]:
+    """Raw MOD/CHAR/GLYPH/levels rows, 1 to ``depth`` levels deep."""
+    rows: List[List[str]] = []
+    for i in range(items):
+        levels = [f"メニュー {i % menus}"] + [f"項目 {i}-{d}" for d in range(1, 1 + i % depth)]
+        shortcut = ["0", chr(65 + i % 26), ""] if i % 3 == 0 else ["", "", ""]
+        rows.append(shortcut + levels)
+    return rows
+
+
+def text_dump(app_name: str, rows: List[List[str]]) -> str:
+    return "\n".join([app_name] + ["\t".join(row) for row in rows]) + "\n"
+
+
+def records_dump(app_name: str, rows: List[List[str]]) -> str:
+    body = app_name + "\x1f" + "".join(
+        "\x1f".join(row[:3] + ["\x1d".join(row[3:])]) + "\x1f" for row in rows
+    )
+    header = f"AML1\x1f{len(rows)}"
+    return f"{len(header)}:{header}{body}\n"
+
+
+def stub_main(argv: List[str]) -> None:
+    """Entry point of the stub osascript (``osascript -e SCRIPT``).
+
+    Configured with BENCH_ITEMS, BENCH_DEPTH, BENCH_LATENCY (seconds before
+    a traversal answers) and BENCH_NOTIFY_LOG.
+    """
+    script = argv[2]
+    if "display notification" in script:
+        # The message and title are passed as script arguments
+        with open(os.environ["BENCH_NOTIFY_LOG"], "a", encoding="utf-8") as f:
+            f.write(" ".join(argv[3:]) + "\n")
+        return
+    if "bundle identifier" in script:
+        print("App\ncom.example.app\n1.0")
+        return
+    if "every menu bar item" in script:
+        print("App\n" + "\n".join(f"メニュー {m}" for m in range(10)))
+        return
+    if "background only" in script:
+        print("App")
+        return
+
+    time.sleep(float(os.environ.get("BENCH_LATENCY", "0")))
+    rows = synthetic_rows(int(os.environ["BENCH_ITEMS"]), int(os.environ["BENCH_DEPTH"]))
+    if "log rowText" in script:
+        sys.stderr.write(text_dump("App", rows))
+    elif "(ASCII character 31)" in script:
+        sys.stdout.write(records_dump("App", rows))
+    else:
+        sys.stdout.write(text_dump("App", rows))
+
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    """Token endpoint plus the Drive/Sheets calls made by sheet_writer."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    calls = 0
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._read_body()
+        if self.path.startswith("/token"):
+            self._reply({"access_token": "bench-token", "expires_in": 3600, "token_type": "Bearer"})
+        elif self.path.startswith("/drive/v3/files"):
+            self._reply({"id": "bench-sheet", "name": "App"})
+        elif ":batchUpdate" in self.path and "/values:" not in self.path:
+            self._reply({"spreadsheetId": "bench-sheet", "replies": []})
+        else:
+            self._reply({"spreadsheetId": "bench-sheet", "totalUpdatedRows": 0})
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self._read_body()
+        self._reply({"spreadsheetId": "bench-sheet", "updatedRows": 0})
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._reply(
+            {
+                "spreadsheetId": "bench-sheet",
+                "properties": {"title": "App"},
+                "sheets": [
+                    {
+                        "properties": {
+                            "sheetId": 0,
+                            "title": "Sheet1",
+                            "index": 0,
+                            "gridProperties": {"rowCount": 1000, "columnCount": 26},
+                        }
+                    }
+                ],
+            }
+        )
+
+    def _read_body(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _reply(self, body: Dict[str, Any]) -> None:
+        FakeGoogle.calls += 1
+        time.sleep(self.latency)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def service_account(token_uri: str) -> Dict[str, str]:
+    """A throwaway service account key whose token endpoint is local."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        "type": "service_account",
+        "project_id": "bench",
+        "private_key_id": "1",
+        "private_key": pem,
+        "client_email": "bench@bench.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": token_uri,
+    }
+
+
+class Harness:
+    """Temporary workflow directory, stub osascript and local API server."""
+
+    def __init__(self, api_latency: float) -> None:
+        self.tmp = tempfile.mkdtemp(prefix="alfred-menu-bench-")
+        self.workflow = os.path.join(self.tmp, "workflow")
+        self.bin = os.path.join(self.tmp, "bin")
+        os.makedirs(self.workflow)
+        os.makedirs(self.bin)
+        for name in os.listdir(ROOT):
+            if name.endswith(".py"):
+                shutil.copy(os.path.join(ROOT, name), self.workflow)
+
+        stub = os.path.join(self.bin, "osascript")
+        with open(stub, "w", encoding="utf-8") as f:
+            f.write(STUB_OSASCRIPT.format(python=sys.executable, bench_dir=BENCH_DIR))
+        os.chmod(stub, 0o755)
+
+        FakeGoogle.latency = api_latency
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.httpd.server_port}"
+        with open(os.path.join(self.workflow, "credentials.json"), "w", encoding="utf-8") as f:
+            json.dump(service_account(f"{self.base}/token"), f)
+
+    def run_main(self, items: int, depth: int, latency: float) -> Dict[str, float]:
+        """Run ``main.main()`` once in a fresh interpreter with cold caches."""
+        data_dir = tempfile.mkdtemp(dir=self.tmp)
+        notify_log = os.path.join(data_dir, "notify.log")
+        env = dict(
+            os.environ,
+            PATH=f"{self.bin}{os.pathsep}{os.environ.get('PATH', '')}",
+            alfred_workflow_data=data_dir,
+            menu_cache="0",
+            # The stub reads script sources, not compiled .scpt files
+            script_cache="0",
+            BENCH_ITEMS=str(items),
+            BENCH_DEPTH=str(depth),
+            BENCH_LATENCY=str(latency),
+            BENCH_NOTIFY_LOG=notify_log,
+        )
+        calls = FakeGoogle.calls
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", BOOTSTRAP, self.base],
+            cwd=self.workflow,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall = time.perf_counter() - start
+
+        with open(notify_log, encoding="utf-8") as f:
+            notifications = f.read()
+        if SUCCESS not in notifications:
+            raise RuntimeError(f"run failed: {notifications.strip()}\n{result.stderr}")
+        child = json.loads(result.stdout.strip().splitlines()[-1])
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        rss_bytes = child["max_rss"] * (1 if sys.platform == "darwin" else 1024)
+        return {
+            "wall_seconds": wall,
+            "main_seconds": child["main_seconds"],
+            "peak_rss_mb": rss_bytes / 2**20,
+            "api_calls": FakeGoogle.calls - calls,
+        }
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def bench_end_to_end(
+    harness: Harness, items: int, depth: int, latency: float, repeat: int
+) -> Dict[str, Any]:
+    runs = [harness.run_main(items, depth, latency) for _ in range(repeat)]
+    result: Dict[str, Any] = {"items": items, "depth": depth, "latency": latency}
+    for key in ("wall_seconds", "main_seconds", "peak_rss_mb"):
+        result[key] = round(statistics.median(run[key] for run in runs), 4)
+    result["api_calls"] = runs[-1]["api_calls"]
+    return result
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parsers(items: int, depth: int, repeat: int) -> List[Dict[str, Any]]:
+    # Imported here so the stub osascript, which imports this module,
+    # starts without loading the workflow modules.
+    sys.path.insert(0, ROOT)
+    from menu_extractor import _parse_output, _parse_records
+
+    rows = synthetic_rows(items, depth)
+    dumps: List[Tuple[str, Callable[[str], object], str]] = [
+        ("text", _parse_output, text_dump("App", rows)),
+        ("records", _parse_records, records_dump("App", rows)),
+    ]
+    results = []
+    for name, parse, raw in dumps:
+        seconds = best_of(lambda: parse(raw), repeat)
+        results.append(
+            {
+                "items": items,
+                "format": name,
+                "seconds": round(seconds, 5),
+                "items_per_second": round(items / seconds),
+            }
+        )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+# Metrics compared by --compare, and whether larger is better
+METRICS = {
+    ("end_to_end", "wall_seconds"): False,
+    ("end_to_end", "main_seconds"): False,
+    ("end_to_end", "peak_rss_mb"): False,
+    ("parser", "items_per_second"): True,
+}
+
+
+def _keyed(results: Dict[str, Any], section: str) -> Dict[Tuple[Any, ...], Dict[str, Any]]:
+    return {(r["items"], r.get("format", "")): r for r in results.get(section, [])}
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any]) -> float:
+    """Print per-metric changes; return the worst regression in percent."""
+    worst = 0.0
+    print(f"\ncompared with {base.get('commit') or 'base'}:")
+    for (section, metric), higher_is_better in METRICS.items():
+        old = _keyed(base, section)
+        for key, entry in _keyed(current, section).items():
+            if key not in old or not old[key].get(metric):
+                continue
+            change = (entry[metric] - old[key][metric]) / old[key][metric] * 100
+            regression = -change if higher_is_better else change
+            worst = max(worst, regression)
+            label = f"{section} {key[0]} {key[1]}".rstrip()
+            print(f"  {label:<28} {metric:<18} {change:>+7.1f}%")
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="osascript delay (s)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="per API call delay (s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results", "latest.json"))
+    parser.add_argument("--compare", default=None, help="earlier result file")
+    parser.add_argument("--max-regression", type=float, default=None, help="percent")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "end_to_end": [],
+        "parser": [],
+    }
+    harness = Harness(args.api_latency)
+    try:
+        print(f"{'items':>8} {'wall (s)':>9} {'main (s)':>9} {'RSS (MB)':>9} {'API':>5}")
+        for n in args.items:
+            e2e = bench_end_to_end(harness, n, args.depth, args.latency, args.repeat)
+            results["end_to_end"].append(e2e)
+            print(
+                f"{n:>8} {e2e['wall_seconds']:>9.3f} {e2e['main_seconds']:>9.3f}"
+                f" {e2e['peak_rss_mb']:>9.1f} {e2e['api_calls']:>5}"
+            )
+    finally:
+        harness.close()
+
+    print(f"\n{'items':>8} {'format':>8} {'items/s':>12}")
+    for n in args.items:
+        for entry in bench_parsers(n, args.depth, args.repeat):
+            results["parser"].append(entry)
+            print(f"{n:>8} {entry['format']:>8} {entry['items_per_second']:>12,}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            worst = compare(json.load(f), results)
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"regression of {worst:.1f}% (> {args.max_regression}%)", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
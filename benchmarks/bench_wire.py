@@ -0,0 +1,72 @@
+"""Benchmark: TAB/LF text output vs the unit/record separated wire format.
+
+Both dumps describe the same synthetic menus; ``_parse_output`` splits
+lines and fields per row, ``_parse_records`` splits the body once and
+slices the fixed-stride columns.
+
+Usage: python benchmarks/bench_wire.py [--rows N ...]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_extractor import GLYPH_MAP, _parse_output, _parse_records  # noqa: E402
+
+
+def synthetic_rows(rows: int, seed: int = 0) -> List[List[str]]:
+    """Raw MOD/CHAR/GLYPH/levels rows, 1 to 4 levels deep."""
+    rng = random.Random(seed)
+    glyph_codes = list(GLYPH_MAP)
+    out: List[List[str]] = []
+    for i in range(rows):
+        kind = rng.random()
+        mod = str(rng.randrange(16)) if kind < 0.5 else ""
+        char = chr(65 + rng.randrange(26)) if kind < 0.4 else ""
+        glyph = str(rng.choice(glyph_codes)) if 0.4 <= kind < 0.5 else ""
+        levels = [f"メニュー {i % 12}"] + [f"項目 {i}-{d}" for d in range(rng.randrange(4))]
+        out.append([mod, char, glyph] + levels)
+    return out
+
+
+def dumps(app_name: str, rows: List[List[str]]) -> Tuple[str, str]:
+    """Render rows as (text, records) osascript output."""
+    text = "\n".join([app_name] + ["\t".join(row) for row in rows]) + "\n"
+    body = app_name + "\x1f" + "".join(
+        "\x1f".join(row[:3] + ["\x1d".join(row[3:])]) + "\x1f" for row in rows
+    )
+    header = f"AML1\x1f{len(rows)}"
+    return text, f"{len(header)}:{header}{body}\n"
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'text (s)':>10} {'records (s)':>12} {'speedup':>8}")
+    for n in args.rows:
+        text, records = dumps("App", synthetic_rows(n))
+        assert _parse_output(text) == _parse_records(records)
+        old = best_of(lambda: _parse_output(text), args.repeat)
+        new = best_of(lambda: _parse_records(records), args.repeat)
+        print(f"{n:>8} {old:>10.4f} {new:>12.4f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,562 @@
 """Alfred Workflow: Extract menu items and write to Google Spreadsheet."""
 
+import importlib
+import json
 import os
+import sqlite3
 import subprocess
 import sys
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from urllib.parse import quote
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "lib"))
 
+import script_cache  # noqa: E402
+import timing  # noqa: E402
+from atomic_file import write_json  # noqa: E402
+from menu_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, MenuCache  # noqa: E402
+from menu_diff import MenuDiff  # noqa: E402
+from menu_export import EXPORT_FORMATS, export_items  # noqa: E402
 from menu_extractor import (  # noqa: E402
     AccessibilityError,
+    AppMenus,
+    ExtractionTimeoutError,
+    HelperClient,
     MenuBarNotFoundError,
     MenuExtractionError,
+    MenuFilter,
+    MenuItem,
+    PartialMenus,
+    extract_apps,
     extract_menus,
+    extract_menus_partial,
+    get_app_identity,
+    get_frontmost_app,
+    helper_request,
+    iter_menus,
+    use_helper,
 )
-from sheet_writer import write_to_spreadsheet  # noqa: E402
+from menu_snapshots import SnapshotStore  # noqa: E402
+from shortcut_index import DB_FILE, ShortcutIndex  # noqa: E402
+
+if TYPE_CHECKING:
+    import gspread
+
+# sheet_writer pulls in gspread, google-auth, requests and cryptography,
+# which cost more than a typical extraction. It is imported only when a
+# write happens (preloaded in the background while osascript runs).
+WRITER_MODULE = "sheet_writer"
+
+BUNDLE_ID = "com.hirshim.alfred-menu-list"
+
+# Snapshots kept per app in the local history (``snapshot_keep``)
+DEFAULT_SNAPSHOT_KEEP = 20
+
+# Message and title are passed as arguments so the script can be compiled once
+NOTIFY_SCRIPT = """\
+on run argv
+    display notification (item 1 of argv) with title (item 2 of argv)
+end run"""
 
 
 def notify(message: str, title: str = "alfred-menu-list") -> None:
-    """Show macOS notification."""
-    msg = message.replace("\\", "\\\\").replace('"', '\\"')
-    ttl = title.replace("\\", "\\\\").replace('"', '\\"')
-    subprocess.run(
-        [
-            "osascript",
-            "-e",
-            f'display notification "{msg}" with title "{ttl}"',
+    """Show macOS notification, through the resident helper when it answers.
+
+    Unless the helper ran the script successfully (it may be busy, time
+    out or fail), a new osascript process shows the notification.
+    """
+    response = helper_request({"op": "notify", "message": message, "title": title}, 10)
+    if response is None or response.get("returncode") != 0:
+        subprocess.run(
+            script_cache.osascript_args(NOTIFY_SCRIPT, message, title), timeout=10
+        )
+
+
+def notify_done(message: str) -> None:
+    """Notify a successful run, with the stage timings when profiling.
+
+    The full profile is saved to ``profile.json`` in the workflow data
+    directory and its slowest stages are appended to the message.
+    """
+    profiler = timing.active()
+    if profiler is not None:
+        timing.save_report(profiler, os.path.join(workflow_data_dir(), "profile.json"))
+        message = f"{message}\n{profiler.summary()}"
+    notify(message)
+
+
+def write_to_spreadsheet(
+    app_name: str,
+    items: List[MenuItem],
+    credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    progress_path: Optional[str] = None,
+    shortcuts: bool = False,
+    master_key: Optional[str] = None,
+    sheet_ids_path: Optional[str] = None,
+) -> str:
+    """Lazily import sheet_writer and call its write_to_spreadsheet()."""
+    writer = importlib.import_module(WRITER_MODULE)
+    url: str = writer.write_to_spreadsheet(
+        app_name,
+        items,
+        credentials_path,
+        token_cache_path,
+        progress_path,
+        shortcuts,
+        master_key,
+        sheet_ids_path,
+    )
+    return url
+
+
+def write_incremental(
+    app_name: str,
+    items: List[MenuItem],
+    credentials_path: str,
+    state_dir: str,
+    token_cache_path: Optional[str] = None,
+) -> Tuple[str, MenuDiff]:
+    """Lazily import sheet_writer and call its write_incremental()."""
+    writer = importlib.import_module(WRITER_MODULE)
+    result: Tuple[str, MenuDiff] = writer.write_incremental(
+        app_name, items, credentials_path, state_dir, token_cache_path
+    )
+    return result
+
+
+def write_batch(
+    results: List[Tuple[str, List[MenuItem]]],
+    credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    master_key: Optional[str] = None,
+    sheet_ids_path: Optional[str] = None,
+) -> str:
+    """Lazily import sheet_writer and call its write_batch()."""
+    writer = importlib.import_module(WRITER_MODULE)
+    url: str = writer.write_batch(
+        results, credentials_path, token_cache_path, master_key, sheet_ids_path
+    )
+    return url
+
+
+def preload_writer() -> threading.Thread:
+    """Import sheet_writer on a background thread.
+
+    Extraction mostly waits on osascript, so the import cost overlaps with
+    it instead of delaying the start of the traversal.
+    """
+    thread = threading.Thread(
+        target=importlib.import_module, args=(WRITER_MODULE,), name="preload-writer"
+    )
+    thread.start()
+    return thread
+
+
+def export_pipelined(
+    credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    menu_filter: Optional[MenuFilter] = None,
+) -> Tuple[str, List[MenuItem]]:
+    """Extract menus and write a new spreadsheet with overlapping stages.
+
+    Authorization starts right away and the spreadsheet is created as soon
+    as the streaming traversal reports the app name, both on a worker
+    thread while osascript is still walking the menus. The upload waits
+    for both stages. Extraction errors are raised before writer errors, as
+    in the sequential flow, and an unused spreadsheet is deleted.
+
+    Returns:
+        (app_name, items); nothing is uploaded when items is empty.
+    """
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    def _authorize() -> "gspread.Client":
+        writer = importlib.import_module(WRITER_MODULE)
+        gc: "gspread.Client" = writer.authorize(credentials_path, token_cache_path)
+        return gc
+
+    def _create(app_name: str) -> "gspread.Spreadsheet":
+        writer = importlib.import_module(WRITER_MODULE)
+        sh: "gspread.Spreadsheet" = writer.create_spreadsheet(client.result(), app_name)
+        return sh
+
+    def _discard(sheet: "Future[gspread.Spreadsheet]") -> None:
+        try:
+            client.result().del_spreadsheet(sheet.result().id)
+        except Exception:
+            pass
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline") as pool:
+        client = pool.submit(_authorize)
+        app_name, rows = iter_menus(menu_filter=menu_filter)
+        sheet = pool.submit(_create, app_name)
+        try:
+            items = list(rows)
+        except MenuExtractionError:
+            _discard(sheet)
+            raise
+        if not items:
+            _discard(sheet)
+            return app_name, items
+
+        writer = importlib.import_module(WRITER_MODULE)
+        shortcuts = menu_filter is not None and menu_filter.shortcuts_only
+        writer.write_rows(sheet.result(), items, shortcuts=shortcuts)
+    return app_name, items
+
+
+def export_batch(
+    app_names: Optional[List[str]],
+    credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    max_workers: int = 4,
+    menu_filter: Optional[MenuFilter] = None,
+) -> Tuple[Optional[str], List[AppMenus]]:
+    """Extract several apps concurrently and write them to one spreadsheet.
+
+    Apps that fail or have no menu items are left out of the spreadsheet
+    but kept in the returned results. A report with per-app timing is
+    saved to ``batch_report.json`` in the workflow data directory.
+
+    Returns:
+        (url, results); url is None when no app produced items.
+    """
+    results = extract_apps(app_names, max_workers=max_workers, menu_filter=menu_filter)
+    for r in results:
+        if r.error is None:
+            save_snapshot(r.app_name, r.items, r.bundle_id, r.version)
+            update_shortcut_index(r.app_name, r.items, menu_filter)
+    written = [(r.app_name, r.items) for r in results if r.error is None and r.items]
+    url = None
+    if written:
+        url = write_batch(
+            written,
+            credentials_path,
+            token_cache_path,
+            master_spreadsheet(),
+            sheet_ids_path(),
+        )
+    save_batch_report(
+        os.path.join(workflow_data_dir(), "batch_report.json"), url, results
+    )
+    return url, results
+
+
+def save_batch_report(path: str, url: Optional[str], results: List[AppMenus]) -> None:
+    """Write per-app item counts, timing and errors of a batch run as JSON."""
+    report = {
+        "spreadsheet": url,
+        "failed": sum(1 for r in results if r.error is not None),
+        "seconds": round(sum(r.seconds for r in results), 3),
+        "apps": [
+            {
+                "app": r.app_name,
+                "items": len(r.items),
+                "seconds": round(r.seconds, 3),
+                "error": None if r.error is None else str(r.error),
+            }
+            for r in results
         ],
-        timeout=10,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def extract_partial(selection: MenuFilter) -> PartialMenus:
+    """Extract with checkpoints so a timeout keeps the rows read so far.
+
+    An unfinished result is saved to ``partial.json`` in the workflow data
+    directory; the next run on the same frontmost app walks only the
+    top-level menus it did not complete. The file is removed once an
+    extraction completes.
+    """
+    path = os.path.join(workflow_data_dir(), "partial.json")
+    resume = load_partial(path)
+    if resume is not None and resume.app_name != get_frontmost_app():
+        resume = None
+    result = extract_menus_partial(
+        env_int("extract_timeout", 60), menu_filter=selection, resume=resume
+    )
+    if result.complete:
+        if os.path.exists(path):
+            os.remove(path)
+    else:
+        save_partial(path, result)
+    return result
+
+
+def load_partial(path: str) -> Optional[PartialMenus]:
+    """Read a result saved by ``save_partial()``, or None if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        items: List[MenuItem] = [(m, k, levels) for m, k, levels in data["items"]]
+        return PartialMenus(data["app_name"], items, data["completed"], False)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_partial(path: str, result: PartialMenus) -> None:
+    """Save an unfinished extraction for the next run to resume."""
+    data = {
+        "app_name": result.app_name,
+        "completed": result.completed,
+        "items": [list(item) for item in result.items],
+    }
+    write_json(path, data)
+
+
+def batch_app_names() -> Optional[List[str]]:
+    """Apps named by the ``batch_apps`` variable (comma or newline separated).
+
+    Returns None for ``all`` (every running app with a user interface) and
+    an empty list when the variable is not set.
+    """
+    if os.environ.get("batch_apps", "").strip().lower() == "all":
+        return None
+    return env_list("batch_apps")
+
+
+def menu_filter() -> MenuFilter:
+    """Build the traversal filter from workflow variables.
+
+    ``include_menus``, ``exclude_menus`` and ``skip_menus`` are comma or
+    newline separated lists; ``max_depth`` limits the levels per row (empty
+    or 0 for no limit, at least 2) and ``shortcuts_only`` keeps only items
+    with a key equivalent.
+    """
+    depth = env_int("max_depth", 0)
+    include = env_list("include_menus")
+    return MenuFilter(
+        include=tuple(include) if include else None,
+        exclude=tuple(env_list("exclude_menus")),
+        max_depth=max(depth, 2) if depth > 0 else None,
+        skip=tuple(env_list("skip_menus")),
+        shortcuts_only=env_flag("shortcuts_only"),
+    )
+
+
+def workflow_data_dir() -> str:
+    """Alfred workflow data directory (``alfred_workflow_data``)."""
+    return os.environ.get("alfred_workflow_data") or os.path.expanduser(
+        f"~/Library/Application Support/Alfred/Workflow Data/{BUNDLE_ID}"
+    )
+
+
+def workflow_cache_dir() -> str:
+    """Alfred workflow cache directory (``alfred_workflow_cache``)."""
+    return os.environ.get("alfred_workflow_cache") or os.path.expanduser(
+        "~/Library/Caches/com.runningwithcrayons.Alfred/Workflow Data/" + BUNDLE_ID
+    )
+
+
+def helper_socket_path() -> str:
+    """Socket of the resident helper, in the per-user temporary directory.
+
+    Unix socket paths are limited to about 100 bytes, which the workflow
+    cache directory can exceed.
+    """
+    return os.path.join(os.environ.get("TMPDIR") or "/tmp", f"{BUNDLE_ID}.helper.sock")
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer Alfred workflow variable."""
+    try:
+        return int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def env_list(name: str) -> List[str]:
+    """Read a comma or newline separated Alfred workflow variable."""
+    value = os.environ.get(name, "")
+    return [
+        part.strip() for part in value.replace("\n", ",").split(",") if part.strip()
+    ]
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean Alfred workflow variable ("1"/"true"/"yes")."""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def menu_cache() -> Optional[MenuCache]:
+    """Build the menu cache from workflow variables, or None if disabled."""
+    if not env_flag("menu_cache", default=True):
+        return None
+    return MenuCache(
+        os.path.join(workflow_data_dir(), "menu_cache"),
+        ttl=env_int("cache_ttl", DEFAULT_TTL),
+        max_entries=env_int("cache_max_entries", DEFAULT_MAX_ENTRIES),
+    )
+
+
+def snapshot_store() -> Optional[SnapshotStore]:
+    """Local extraction history, or None if disabled by ``snapshots=0``."""
+    if not env_flag("snapshots", default=True):
+        return None
+    return SnapshotStore(os.path.join(workflow_data_dir(), "snapshots"))
+
+
+def save_snapshot(
+    app_name: str, items: List[MenuItem], bundle_id: str = "", version: str = ""
+) -> None:
+    """Add an extraction to the local history and prune old snapshots.
+
+    A failure to write the history never fails the run.
+    """
+    store = snapshot_store()
+    if store is None or not items:
+        return
+    with timing.span("snapshot"):
+        try:
+            store.put(app_name, items, bundle_id, version)
+            store.prune(env_int("snapshot_keep", DEFAULT_SNAPSHOT_KEEP))
+        except OSError:
+            pass
+
+
+def frontmost_identity() -> Optional[Tuple[str, str, str]]:
+    """``get_app_identity()`` of the frontmost app, or None if it cannot be read."""
+    try:
+        return get_app_identity()
+    except (MenuExtractionError, subprocess.SubprocessError, OSError):
+        return None
+
+
+def update_shortcut_index(
+    app_name: str, items: List[MenuItem], selection: Optional[MenuFilter] = None
+) -> None:
+    """Refresh the app's rows in the local shortcut index (``shortcut_index``).
+
+    ``ShortcutIndex.update()`` replaces every row of the app, so only
+    unfiltered extractions are indexed: pruned menus or a ``shortcuts_only``
+    run would drop the other rows from search. Index errors never fail the
+    run.
+    """
+    if not env_flag("shortcut_index", default=True) or not items:
+        return
+    if selection is not None and selection != MenuFilter():
+        return
+    with timing.span("index"):
+        try:
+            with ShortcutIndex(os.path.join(workflow_data_dir(), DB_FILE)) as index:
+                index.update(app_name, items)
+        except (OSError, sqlite3.Error):
+            pass
+
+
+def master_spreadsheet() -> Optional[str]:
+    """Key of the spreadsheet to update in place (``master_spreadsheet``), if set."""
+    return os.environ.get("master_spreadsheet", "").strip() or None
+
+
+def sheet_ids_path() -> str:
+    """Cache of worksheet ids in the master spreadsheet."""
+    return os.path.join(workflow_data_dir(), "master_sheets.json")
+
+
+def token_cache_path() -> Optional[str]:
+    """Access token cache file, or None if disabled by ``token_cache=0``."""
+    if not env_flag("token_cache", default=True):
+        return None
+    return os.path.join(workflow_data_dir(), "token_cache.json")
+
+
+def upload_progress_path(app_name: str) -> Optional[str]:
+    """Progress file for a resumable upload, or None if ``resumable_upload=0``."""
+    if not env_flag("resumable_upload", default=True):
+        return None
+    return os.path.join(
+        workflow_data_dir(), "uploads", quote(app_name, safe="") + ".json"
     )
 
 
-def main() -> None:
+def export_local(export_format: str, menu_filter: Optional[MenuFilter] = None) -> None:
+    """Stream the menus of the frontmost app to a file under ``menus/``.
+
+    Rows go from osascript to disk as they arrive, without network access
+    or credentials.
+    """
+    app_name, rows = iter_menus(menu_filter=menu_filter)
+    path, count = export_items(
+        app_name, rows, os.path.join(workflow_data_dir(), "menus"), export_format
+    )
+    if not count:
+        os.remove(path)
+        notify(f"メニュー項目が見つかりません: {app_name}")
+        return
+    notify_done(f"{app_name} のメニューを {os.path.basename(path)} に書き出しました")
+
+
+def count_items(items: List[MenuItem]) -> None:
+    """Record item count and depth counters when profiling."""
+    if timing.active() is not None:
+        timing.count("items", len(items))
+        timing.peak(
+            "max_depth", max((len(levels) for _, _, levels in items), default=0)
+        )
+
+
+def main(export_format: Optional[str] = None, profile: Optional[bool] = None) -> None:
+    """Run the workflow.
+
+    Args:
+        export_format: ``"csv"``, ``"tsv"``, ``"jsonl"`` or ``"xlsx"`` to
+            write a local file instead of a spreadsheet. Defaults to the
+            ``export_format`` workflow variable.
+        profile: Time each stage and report it (see ``notify_done()``).
+            Defaults to the ``profile`` workflow variable.
+    """
+    if profile is None:
+        profile = env_flag("profile")
+    if profile:
+        timing.enable()
+    if env_flag("script_cache", default=True):
+        script_cache.enable(os.path.join(workflow_cache_dir(), "scripts"))
+    if env_flag("helper"):
+        use_helper(
+            HelperClient(
+                helper_socket_path(), autostart=True, idle=env_int("helper_idle", 300)
+            )
+        )
+    try:
+        run(export_format)
+    finally:
+        use_helper(None)
+        script_cache.disable()
+        timing.disable()
+
+
+def run(export_format: Optional[str] = None) -> None:
+    """One workflow run; see ``main()``."""
+    selection = menu_filter()
+    if export_format is None:
+        export_format = os.environ.get("export_format", "").strip().lower()
+    if export_format:
+        if export_format not in EXPORT_FORMATS:
+            notify(f"未対応の書き出し形式です: {export_format}")
+            return
+        try:
+            export_local(export_format, selection)
+        except ExtractionTimeoutError:
+            notify("メニュー取得がタイムアウトしました")
+        except AccessibilityError:
+            notify("アクセシビリティ権限を許可してください")
+        except MenuBarNotFoundError:
+            notify("メニューバーが見つかりません")
+        except MenuExtractionError:
+            notify("メニュー取得に失敗しました")
+        except OSError:
+            notify("ファイルの書き出しに失敗しました")
+        return
+
     workflow_dir = os.path.dirname(os.path.abspath(__file__))
     credentials_path = os.path.join(workflow_dir, "credentials.json")
 
@@ -37,16 +564,107 @@ def main() -> None:
         notify("credentials.json が見つかりません")
         return
 
+    batch = batch_app_names()
+    master = master_spreadsheet()
+    incremental = env_flag("incremental") and master is None
+    partial = env_flag("partial_extraction")
+    pipelined = (
+        env_flag("pipeline") and not incremental and not partial and master is None
+    )
+    if not pipelined:
+        preload_writer()
     try:
-        app_name, items = extract_menus()
+        if batch is None or batch:
+            with timing.span("batch"):
+                url, results = export_batch(
+                    batch,
+                    credentials_path,
+                    token_cache_path(),
+                    env_int("batch_workers", 4),
+                    selection,
+                )
+            failed = sum(1 for r in results if r.error is not None)
+            if url is None:
+                notify(f"メニューを取得できたアプリがありません（失敗 {failed}）")
+            else:
+                written = sum(1 for r in results if r.error is None and r.items)
+                notify_done(
+                    f"{written} 個のアプリのメニューを書き込みました（失敗 {failed}）"
+                )
+            return
+
+        complete = True
+        cache = None if pipelined or partial else menu_cache()
+        # Read once for both the cache key and the snapshot
+        identity = None
+        if cache is not None or snapshot_store() is not None:
+            with timing.span("identity"):
+                identity = frontmost_identity()
+        if pipelined:
+            with timing.span("pipeline"):
+                app_name, items = export_pipelined(
+                    credentials_path, token_cache_path(), selection
+                )
+        elif partial:
+            with timing.span("extract"):
+                result = extract_partial(selection)
+            app_name, items, complete = result.app_name, result.items, result.complete
+        else:
+            with timing.span("extract"):
+                app_name, items = extract_menus(
+                    cache=cache,
+                    force_refresh=env_flag("force_refresh"),
+                    menu_filter=selection,
+                    identity=identity,
+                )
+        count_items(items)
 
         if not items:
             notify(f"メニュー項目が見つかりません: {app_name}")
             return
+        if complete:
+            if identity is not None and identity[0] == app_name:
+                save_snapshot(app_name, items, identity[1], identity[2])
+            else:
+                save_snapshot(app_name, items)
+            update_shortcut_index(app_name, items, selection)
 
-        write_to_spreadsheet(app_name, items, credentials_path)
-        notify(f"{app_name} のメニューをスプレッドシートに書き込みました")
+        if incremental and complete:
+            state_dir = os.path.join(workflow_data_dir(), "exports")
+            with timing.span("write"):
+                _, diff = write_incremental(
+                    app_name, items, credentials_path, state_dir, token_cache_path()
+                )
+            counts = diff.summary()
+            notify_done(
+                f"{app_name} のメニューを更新しました"
+                f"（追加 {counts['added']} / 削除 {counts['removed']}"
+                f" / 変更 {counts['changed']}）"
+            )
+            return
+
+        if not pipelined:
+            with timing.span("write"):
+                write_to_spreadsheet(
+                    app_name,
+                    items,
+                    credentials_path,
+                    token_cache_path(),
+                    None if master else upload_progress_path(app_name),
+                    selection.shortcuts_only,
+                    master,
+                    sheet_ids_path(),
+                )
+        if not complete:
+            notify_done(
+                f"{app_name} のメニューを途中まで書き込みました"
+                f"（完了 {len(result.completed)} メニュー、再実行で続きを取得します）"
+            )
+            return
+        notify_done(f"{app_name} のメニューをスプレッドシートに書き込みました")
 
+    except ExtractionTimeoutError:
+        notify("メニュー取得がタイムアウトしました")
     except AccessibilityError:
         notify("アクセシビリティ権限を許可してください")
     except MenuBarNotFoundError:
@@ -58,4 +676,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    main(profile=True if "--profile" in sys.argv[1:] else None)
@@ -0,0 +1,106 @@
+"""On-disk cache of extracted menus keyed by bundle identifier and version."""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from atomic_file import write_json
+from menu_extractor import MenuItem
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 50
+
+INDEX_FILE = "index.json"
+
+
+class MenuCache:
+    """Cache of ``(app_name, items)`` results with TTL and LRU eviction.
+
+    Each entry is stored as compact JSON in its own file under ``directory``;
+    ``index.json`` maps keys to files with creation and last-use times.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(bundle_id: str, version: str) -> str:
+        """Build the cache key for an application bundle and version."""
+        return f"{bundle_id}@{version}"
+
+    def get(self, key: str) -> Optional[Tuple[str, List[MenuItem]]]:
+        """Return the cached result for ``key``, or None if missing or expired."""
+        index = self._load_index()
+        entry = index.get(key)
+        if entry is None:
+            return None
+
+        now = time.time()
+        path = os.path.join(self.directory, entry["file"])
+        if self.ttl > 0 and now - entry["created"] > self.ttl:
+            self._remove(index, key)
+            self._save_index(index)
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self._remove(index, key)
+            self._save_index(index)
+            return None
+
+        entry["used"] = now
+        self._save_index(index)
+        items: List[MenuItem] = [(m, k, levels) for m, k, levels in data["items"]]
+        return data["app_name"], items
+
+    def put(self, key: str, app_name: str, items: List[MenuItem]) -> None:
+        """Store a result under ``key`` and evict least recently used entries."""
+        os.makedirs(self.directory, exist_ok=True)
+        index = self._load_index()
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+        payload = {"app_name": app_name, "items": [list(item) for item in items]}
+        write_json(os.path.join(self.directory, filename), payload)
+
+        now = time.time()
+        index[key] = {"file": filename, "created": now, "used": now}
+        while len(index) > max(self.max_entries, 1):
+            oldest = min(index, key=lambda k: index[k]["used"])
+            self._remove(index, oldest)
+        self._save_index(index)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        index = self._load_index()
+        for key in list(index):
+            self._remove(index, key)
+        self._save_index(index)
+
+    def _remove(self, index: Dict[str, Any], key: str) -> None:
+        entry = index.pop(key)
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except FileNotFoundError:
+            pass
+
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                index: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index
+
+    def _save_index(self, index: Dict[str, Any]) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        write_json(os.path.join(self.directory, INDEX_FILE), index)
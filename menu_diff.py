@@ -0,0 +1,67 @@
+"""Keyed diff of menu items between two extractions."""
+
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+from menu_extractor import MenuItem
+
+
+class MenuDiff(NamedTuple):
+    """Row-level difference between an old and a new list of items.
+
+    Items are matched by their ``levels`` path. ``added`` and ``changed``
+    index into the new list, ``removed`` into the old one. ``in_order`` is
+    False when rows present in both lists appear in a different order.
+    """
+
+    added: List[int]
+    removed: List[int]
+    changed: List[int]
+    in_order: bool
+
+    def summary(self) -> Dict[str, int]:
+        """Counts per change type."""
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+        }
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+def item_keys(items: List[MenuItem]) -> List[Hashable]:
+    """Key each item by its path plus occurrence number for duplicate paths."""
+    seen: Dict[Tuple[str, ...], int] = {}
+    keys: List[Hashable] = []
+    for _, _, levels in items:
+        path = tuple(levels)
+        n = seen.get(path, 0)
+        seen[path] = n + 1
+        keys.append((path, n))
+    return keys
+
+
+def diff_items(old: List[MenuItem], new: List[MenuItem]) -> MenuDiff:
+    """Compute the keyed diff from ``old`` to ``new``."""
+    old_keys = item_keys(old)
+    new_keys = item_keys(new)
+    old_index = {key: i for i, key in enumerate(old_keys)}
+    new_index = {key: i for i, key in enumerate(new_keys)}
+
+    added: List[int] = []
+    changed: List[int] = []
+    kept_new: List[Hashable] = []
+    for i, key in enumerate(new_keys):
+        j = old_index.get(key)
+        if j is None:
+            added.append(i)
+            continue
+        kept_new.append(key)
+        if old[j][:2] != new[i][:2]:
+            changed.append(i)
+
+    removed = [j for j, key in enumerate(old_keys) if key not in new_index]
+    kept_old = [key for key in old_keys if key in new_index]
+
+    return MenuDiff(added, removed, changed, kept_old == kept_new)
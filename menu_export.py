@@ -0,0 +1,244 @@
+"""Local file exporters for menu items (CSV, TSV, JSONL, XLSX)."""
+
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from menu_extractor import MenuItem
+
+EXPORT_FORMATS = ("csv", "tsv", "jsonl", "xlsx")
+
+SHORTCUT_HEADER = ("修飾キー", "キー", "メニュー")
+
+# Characters that are not allowed in XML 1.0 text
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Characters Excel does not allow in worksheet names
+_SHEET_INVALID = re.compile(r"[\[\]:*?/\\]")
+
+# xml.sax.saxutils.escape would pull in urllib.request at import time
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+Writer = Callable[[str, str, List[str], Iterator[List[str]]], None]
+
+
+def build_header(depth: int) -> List[str]:
+    """Column headers for rows up to ``depth`` levels deep (at least one)."""
+    header = ["修飾キー", "キー"]
+    for i in range(1, max(depth, 1) + 1):
+        header.append(f"Level {i}")
+    return header
+
+
+def build_shortcut_rows(items: Iterable[MenuItem]) -> List[List[str]]:
+    """Header and one row per distinct shortcut, for the compact sheet.
+
+    Items without a key are dropped. Menus sharing a shortcut are listed
+    in one cell, one ``A > B`` path per line in menu order.
+    """
+    paths: Dict[Tuple[str, str], Dict[str, None]] = {}
+    for modifier, key, levels in items:
+        if key:
+            paths.setdefault((modifier, key), {})[" > ".join(levels)] = None
+    rows = [list(SHORTCUT_HEADER)]
+    for (modifier, key), menus in paths.items():
+        rows.append([modifier, key, "\n".join(menus)])
+    return rows
+
+
+def export_items(
+    app_name: str, items: Iterable[MenuItem], directory: str, fmt: str
+) -> Tuple[str, int]:
+    """Write menu items to ``{app_name}_{timestamp}.{fmt}`` in ``directory``.
+
+    Items are consumed once and spooled to a temporary JSON-lines file
+    while the deepest level is tracked; the file is then written with the
+    same header as the spreadsheet and every row padded to its width. Memory
+    use does not grow with the number of items, so ``items`` can be the
+    iterator of ``iter_menus()``. The file is moved into place when complete.
+    An export made in the same second gets a ``_2``, ``_3``... suffix
+    instead of replacing the earlier one.
+
+    Returns:
+        (path, number of rows written).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    path = _claim_path(
+        os.path.join(directory, f"{app_name.replace('/', '_')}_{now}"), fmt
+    )
+    tmp = f"{path}.tmp"
+
+    try:
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+            count, depth = _spool(items, spool)
+            spool.seek(0)
+            header = build_header(depth)
+            rows = (_pad(json.loads(line), len(header)) for line in spool)
+            _WRITERS[fmt](tmp, app_name, header, rows)
+            os.replace(tmp, path)
+    except BaseException:
+        for leftover in (tmp, path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    return path, count
+
+
+def _claim_path(stem: str, fmt: str) -> str:
+    """Create an empty ``{stem}.{fmt}`` (or ``{stem}_2.{fmt}``...) and return its path.
+
+    The file is created exclusively, so concurrent exports in the same
+    second never pick the same name.
+    """
+    n = 1
+    while True:
+        path = f"{stem}.{fmt}" if n == 1 else f"{stem}_{n}.{fmt}"
+        try:
+            with open(path, "x"):
+                return path
+        except FileExistsError:
+            n += 1
+
+
+def _spool(items: Iterable[MenuItem], spool: IO[str]) -> Tuple[int, int]:
+    """Write one JSON array per item; return (row count, deepest level)."""
+    count = 0
+    depth = 0
+    for modifier, key, levels in items:
+        spool.write(json.dumps([modifier, key] + levels, ensure_ascii=False))
+        spool.write("\n")
+        count += 1
+        if len(levels) > depth:
+            depth = len(levels)
+    return count, depth
+
+
+def _pad(row: List[str], width: int) -> List[str]:
+    row.extend([""] * (width - len(row)))
+    return row
+
+
+def _write_csv(
+    path: str, app_name: str, header: List[str], rows: Iterator[List[str]]
+) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_tsv(
+    path: str, app_name: str, header: List[str], rows: Iterator[List[str]]
+) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, dialect="excel-tab")
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_jsonl(
+    path: str, app_name: str, header: List[str], rows: Iterator[List[str]]
+) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+_XLSX_CONTENT_TYPES = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" \
+ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" \
+ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_XLSX_RELS = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" \
+Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" \
+Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_XLSX_WORKBOOK = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" \
+xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_XLSX_WORKBOOK_RELS = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" \
+Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" \
+Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+
+def _write_xlsx(
+    path: str, app_name: str, header: List[str], rows: Iterator[List[str]]
+) -> None:
+    """Write a single-sheet workbook with inline strings.
+
+    The worksheet XML is streamed into the archive row by row, so no
+    shared string table or row buffer is kept in memory.
+    """
+    sheet_name = _SHEET_INVALID.sub("_", app_name)[:31] or "Menus"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_RELS)
+        zf.writestr(
+            "xl/workbook.xml",
+            _XLSX_WORKBOOK.format(name=_escape(sheet_name)),
+        )
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        with zf.open("xl/worksheets/sheet1.xml", "w") as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                f.write(
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    "<sheetData>"
+                )
+                f.write(_xlsx_row(header))
+                for row in rows:
+                    f.write(_xlsx_row(row))
+                f.write("</sheetData></worksheet>")
+
+
+def _xlsx_row(row: List[str]) -> str:
+    cells = []
+    for value in row:
+        if value:
+            text = _escape(value)
+            cells.append(
+                f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+            )
+        else:
+            cells.append("<c/>")
+    return "<row>" + "".join(cells) + "</row>"
+
+
+def _escape(text: str) -> str:
+    return _XML_INVALID.sub("", text).translate(_XML_ESCAPES)
+
+
+_WRITERS: Dict[str, Writer] = {
+    "csv": _write_csv,
+    "tsv": _write_tsv,
+    "jsonl": _write_jsonl,
+    "xlsx": _write_xlsx,
+}
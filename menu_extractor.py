@@ -1,7 +1,31 @@
 """Menu extractor using AppleScript (System Events)."""
 
+import hashlib
+import json
+import os
+import re
 import subprocess
-from typing import Dict, List, Tuple
+import sys
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import script_cache
+import timing
+
+if TYPE_CHECKING:
+    from menu_cache import MenuCache
 
 # Type alias: (modifier_string, key_string, [level1, level2, ...])
 MenuItem = Tuple[str, str, List[str]]
@@ -40,6 +64,27 @@ GLYPH_MAP: Dict[int, str] = {
     140: "Eject",
 }
 
+# Attribute fetch strategies understood by _build_applescript()
+TRAVERSAL_MODES = ("item", "bulk")
+
+# Output formats understood by _build_applescript(): TAB/LF lines, or
+# unit/record separated fields parsed by _parse_records()
+WIRE_FORMATS = ("text", "records")
+
+# "records" format: <len>:<header> then the app name and four fields per
+# row, each terminated by US, with the levels of a row joined by GS. The
+# header is ASCII only, so its length is the same in any encoding.
+_WIRE_MAGIC = "AML1"
+_US = "\x1f"
+_GS = "\x1d"
+
+# Prefix of the checkpoint lines logged by a streaming script
+_RS = "\x1e"
+
+
+# osascript error lines look like "83:95: execution error: ... (-1728)"
+_OSASCRIPT_ERROR = re.compile(r"^\d+:\d+: \w+ error:")
+
 
 class MenuExtractionError(Exception):
     """Raised when menu extraction fails."""
@@ -59,12 +104,65 @@ class AccessibilityError(MenuExtractionError):
     pass
 
 
-def decode_modifiers(mask: int) -> str:
-    """Decode AXMenuItemCmdModifiers bitmask.
+class ExtractionTimeoutError(MenuExtractionError):
+    """Raised when osascript does not finish within the timeout."""
 
-    bit 0 (1): Shift, bit 1 (2): Option, bit 2 (4): Control,
-    bit 3 (8): No Command key. Default (0) = Cmd only.
+    pass
+
+
+class AppMenus(NamedTuple):
+    """Result for one application of ``extract_apps()``.
+
+    ``bundle_id`` and ``version`` are empty when they could not be read.
+    """
+
+    app_name: str
+    items: List[MenuItem]
+    seconds: float
+    error: Optional[MenuExtractionError]
+    bundle_id: str = ""
+    version: str = ""
+
+
+class PartialMenus(NamedTuple):
+    """Result of ``extract_menus_partial()``.
+
+    ``completed`` lists the top-level menus walked to the end, in menu bar
+    order; ``items`` holds their rows, plus the rows of an unfinished menu
+    when ``complete`` is False.
+    """
+
+    app_name: str
+    items: List[MenuItem]
+    completed: List[str]
+    complete: bool
+
+
+class MenuFilter(NamedTuple):
+    """Pruning options applied inside the traversal script.
+
+    ``include`` and ``exclude`` select top-level menus by name, ``max_depth``
+    caps the number of levels per row (the top-level menu is level 1) and
+    ``skip`` lists ``*`` glob patterns of item titles whose submenus are not
+    walked. Pruned menus are never queried. ``shortcuts_only`` keeps only
+    rows with a key equivalent.
     """
+
+    include: Optional[Tuple[str, ...]] = None
+    exclude: Tuple[str, ...] = ()
+    max_depth: Optional[int] = None
+    skip: Tuple[str, ...] = ()
+    shortcuts_only: bool = False
+
+    def cache_suffix(self) -> str:
+        """Suffix distinguishing cache entries extracted with this filter."""
+        if self == MenuFilter():
+            return ""
+        digest = hashlib.sha1(repr(tuple(self)).encode("utf-8")).hexdigest()
+        return f"#{digest[:12]}"
+
+
+def _build_modifier(mask: int) -> str:
     parts: List[str] = []
     if not (mask & 8):
         parts.append("Cmd")
@@ -77,94 +175,632 @@ def decode_modifiers(mask: int) -> str:
     return "+".join(parts)
 
 
+# Only the low four bits are meaningful, so every mask is precomputed
+MODIFIER_TABLE: Tuple[str, ...] = tuple(_build_modifier(mask) for mask in range(16))
+
+# Raw osascript text -> decoded string, so the parser skips int() per row
+_MODIFIER_BY_RAW: Dict[str, str] = {
+    str(mask): name for mask, name in enumerate(MODIFIER_TABLE)
+}
+_GLYPH_BY_RAW: Dict[str, str] = {str(code): name for code, name in GLYPH_MAP.items()}
+
+
+def decode_modifiers(mask: int) -> str:
+    """Decode AXMenuItemCmdModifiers bitmask.
+
+    bit 0 (1): Shift, bit 1 (2): Option, bit 2 (4): Control,
+    bit 3 (8): No Command key. Default (0) = Cmd only.
+    """
+    return MODIFIER_TABLE[mask & 15]
+
+
 def decode_glyph(code: int) -> str:
     """Convert AXMenuItemCmdGlyph code to key name."""
     return GLYPH_MAP.get(code, f"Glyph({code})")
 
 
+def decode_columns(
+    mods: Sequence[str], chars: Sequence[str], glyphs: Sequence[str]
+) -> Tuple[List[str], List[str]]:
+    """Decode raw MOD/CHAR/GLYPH columns into modifier and key columns.
+
+    Takes the raw text fields as emitted by the traversal script and
+    returns them decoded in one pass with the precomputed tables. Rows
+    without a key equivalent decode to empty strings, as in ``_parse_output``.
+    """
+    modifiers: List[str] = []
+    keys: List[str] = []
+    mod_table = _MODIFIER_BY_RAW
+    glyph_table = _GLYPH_BY_RAW
+    for mod_raw, char_raw, glyph_raw in zip(mods, chars, glyphs):
+        if not (char_raw or glyph_raw):
+            modifiers.append("")
+            keys.append("")
+            continue
+        if mod_raw:
+            modifier = mod_table.get(mod_raw)
+            modifiers.append(
+                modifier if modifier is not None else decode_modifiers(int(mod_raw))
+            )
+        else:
+            modifiers.append("")
+        if char_raw:
+            keys.append(char_raw)
+        else:
+            key = glyph_table.get(glyph_raw)
+            keys.append(key if key is not None else decode_glyph(int(glyph_raw)))
+    return modifiers, keys
+
+
+class HelperClient:
+    """Client of the resident helper (``menu_helper.py``) on a Unix socket.
+
+    ``request()`` returns None whenever the helper cannot answer, so
+    callers fall back to running osascript themselves. With ``autostart``
+    a missing helper is started in the background for later calls; it
+    exits by itself after ``idle`` seconds without requests.
+    """
+
+    def __init__(
+        self, socket_path: str, autostart: bool = False, idle: float = 300
+    ) -> None:
+        self.socket_path = socket_path
+        self.autostart = autostart
+        self.idle = idle
+        self._started = False
+
+    def request(
+        self, payload: Dict[str, Any], timeout: float = 60
+    ) -> Optional[Dict[str, Any]]:
+        """Send one request and return the helper's response."""
+        # Imported here: only runs that use the helper pay for socket
+        import socket
+
+        data = json.dumps(dict(payload, timeout=timeout)).encode("ascii") + b"\n"
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                # The helper enforces the timeout itself; this covers a hung helper
+                sock.settimeout(timeout + 5)
+                sock.connect(self.socket_path)
+                sock.sendall(data)
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+        except (FileNotFoundError, ConnectionRefusedError):
+            self.start()
+            return None
+        except OSError:
+            return None
+        try:
+            response = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(response, dict) or "error" in response:
+            return None
+        return response
+
+    def start(self) -> None:
+        """Start the helper in the background, once per client."""
+        if not self.autostart or self._started:
+            return
+        self._started = True
+        helper = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "menu_helper.py"
+        )
+        try:
+            subprocess.Popen(
+                [sys.executable, helper, self.socket_path, "--idle", str(self.idle)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError:
+            pass
+
+
+# Helper used for one-shot scripts; None (the default) spawns osascript
+_helper: Optional[HelperClient] = None
+
+
+def use_helper(client: Optional[HelperClient]) -> None:
+    """Route one-shot scripts through ``client``, or stop with None."""
+    global _helper
+    _helper = client
+
+
+def helper_request(
+    payload: Dict[str, Any], timeout: float = 60
+) -> Optional[Dict[str, Any]]:
+    """Send a request to the helper in use; None if there is none or it fails."""
+    client = _helper
+    if client is None:
+        return None
+    return client.request(payload, timeout)
+
+
+def _run_helper(
+    payload: Dict[str, Any], timeout: float
+) -> "Optional[subprocess.CompletedProcess[str]]":
+    """Run a script through the helper as if by ``subprocess.run``.
+
+    Returns None when the helper is not available or busy with another
+    caller's script, and raises ``subprocess.TimeoutExpired`` when the
+    script timed out.
+    """
+    response = helper_request(payload, timeout)
+    if response is not None and response.get("busy"):
+        timing.count("helper_busy")
+        return None
+    if response is None or not ("timeout" in response or "returncode" in response):
+        return None
+    timing.count("helper_calls")
+    if response.get("timeout"):
+        raise subprocess.TimeoutExpired("menu_helper", timeout)
+    return subprocess.CompletedProcess(
+        ["menu_helper"],
+        int(response["returncode"]),
+        str(response.get("stdout", "")),
+        str(response.get("stderr", "")),
+    )
+
+
 def get_frontmost_app() -> str:
     """Get the name of the frontmost application."""
-    result = subprocess.run(
-        [
-            "osascript",
-            "-e",
-            'tell application "System Events" to return name of first '
-            "application process whose frontmost is true",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=5,
-    )
+    result = _run_helper({"op": "frontmost"}, 5)
+    if result is None:
+        result = subprocess.run(
+            script_cache.osascript_args(_FRONTMOST_APP_SCRIPT),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
     if result.returncode != 0:
         raise MenuExtractionError(result.stderr.strip())
     return result.stdout.strip()
 
 
-def extract_menus() -> Tuple[str, List[MenuItem]]:
-    """Extract all menu items from the frontmost application.
+def get_app_identity(app_name: Optional[str] = None) -> Tuple[str, str, str]:
+    """Get (name, bundle identifier, version) of the frontmost (or a named) application."""
+    script = _APP_IDENTITY_SCRIPT
+    if app_name is not None:
+        script = script.replace(
+            "first application process whose frontmost is true",
+            f"application process {_applescript_string(app_name)}",
+        )
+    lines = _run_osascript(script, timeout=5).rstrip("\n").split("\n")
+    if not lines[0].strip():
+        raise MenuExtractionError("アプリ情報を取得できませんでした")
+    name, bundle_id, version = (lines + ["", ""])[:3]
+    return name.strip(), bundle_id.strip() or name.strip(), version.strip()
+
+
+def extract_menus(
+    traversal: str = "item",
+    cache: Optional["MenuCache"] = None,
+    force_refresh: bool = False,
+    wire: str = "text",
+    app_name: Optional[str] = None,
+    menu_filter: Optional[MenuFilter] = None,
+    identity: Optional[Tuple[str, str, str]] = None,
+) -> Tuple[str, List[MenuItem]]:
+    """Extract all menu items from the frontmost (or a named) application.
+
+    Args:
+        traversal: ``"item"`` (one query per menu item) or ``"bulk"``
+            (one query per attribute per menu).
+        cache: If given, results are looked up and stored by bundle
+            identifier and version before spawning the traversal.
+        force_refresh: Skip the cache lookup but still store the result.
+        wire: ``"text"`` (TAB/LF lines) or ``"records"`` (unit/record
+            separators, safe for titles containing tabs or newlines).
+        app_name: Process name to read instead of the frontmost app. The
+            cache is only consulted for the frontmost app.
+        menu_filter: Menus to prune from the traversal; filtered results
+            are cached under their own key.
+        identity: ``get_app_identity()`` of the frontmost app when the
+            caller has already read it; the cache lookup reads it otherwise.
 
     Returns:
         (app_name, items) where each item is (modifier, key, levels).
     """
-    script = _build_applescript()
-    try:
-        result = subprocess.run(
-            ["osascript", "-e", script],
-            capture_output=True,
-            text=True,
-            timeout=60,
+    parse = _parse_records if wire == "records" else _parse_output
+    menu_filter = menu_filter or MenuFilter()
+    if cache is None or app_name is not None:
+        script = _build_applescript(
+            traversal=traversal,
+            wire=wire,
+            app_name=app_name,
+            **_filter_options(menu_filter),
+        )
+        raw = _run_osascript(script)
+        with timing.span("parse"):
+            return parse(raw)
+
+    with timing.span("cache"):
+        name, bundle_id, version = identity or get_app_identity()
+        key = cache.make_key(bundle_id, version) + menu_filter.cache_suffix()
+        cached = None if force_refresh else cache.get(key)
+    if cached is not None:
+        timing.count("cache_hits")
+        return cached
+
+    script = _build_applescript(
+        traversal=traversal, app_name=name, wire=wire, **_filter_options(menu_filter)
+    )
+    raw = _run_osascript(script)
+    with timing.span("parse"):
+        app_name, items = parse(raw)
+    cache.put(key, app_name, items)
+    return app_name, items
+
+
+def extract_menus_parallel(
+    max_workers: int = 4, traversal: str = "item"
+) -> Tuple[str, List[MenuItem]]:
+    """Extract menu items with one osascript traversal per top-level menu.
+
+    The menu bar item names are listed first, then each top-level menu is
+    walked by its own osascript process on a bounded worker pool. Results
+    are merged back in menu bar order, identical to ``extract_menus()``.
+
+    Args:
+        max_workers: Maximum number of concurrent osascript processes.
+        traversal: ``"item"`` or ``"bulk"``, see ``extract_menus()``.
+
+    Returns:
+        (app_name, items) where each item is (modifier, key, levels).
+    """
+    # Imported here: concurrent.futures pulls in logging, which would add
+    # to the startup time of every workflow run.
+    from concurrent.futures import ThreadPoolExecutor
+
+    app_name, menu_names = list_menu_bar_items()
+    menu_names = list(dict.fromkeys(menu_names))
+
+    def _walk(menu_name: str) -> List[MenuItem]:
+        script = _build_applescript(
+            traversal=traversal, app_name=app_name, include=[menu_name]
         )
+        return _parse_output(_run_osascript(script))[1]
+
+    items: List[MenuItem] = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for menu_items in pool.map(_walk, menu_names):
+            items.extend(menu_items)
+    return app_name, items
+
+
+def extract_apps(
+    app_names: Optional[Sequence[str]] = None,
+    max_workers: int = 4,
+    traversal: str = "item",
+    menu_filter: Optional[MenuFilter] = None,
+) -> List[AppMenus]:
+    """Extract the menus of several applications concurrently.
+
+    Each application is read by its own osascript process on a bounded
+    worker pool, which also reads its bundle identifier and version. A
+    failure is recorded in its result instead of stopping the others.
+
+    Args:
+        app_names: Process names to read; ``None`` reads every running
+            application with a user interface (``list_running_apps()``).
+        max_workers: Maximum number of concurrent osascript processes.
+        traversal: ``"item"`` or ``"bulk"``, see ``extract_menus()``.
+        menu_filter: Menus to prune, applied to every application.
+
+    Returns:
+        One ``AppMenus`` per name, in the given order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if app_names is None:
+        app_names = list_running_apps()
+    names = list(dict.fromkeys(app_names))
+
+    def _extract(name: str) -> AppMenus:
+        start = time.perf_counter()
+        try:
+            app_name, items = extract_menus(
+                traversal=traversal, app_name=name, menu_filter=menu_filter
+            )
+        except MenuExtractionError as e:
+            return AppMenus(name, [], time.perf_counter() - start, e)
+        try:
+            _, bundle_id, version = get_app_identity(name)
+        except (MenuExtractionError, subprocess.SubprocessError, OSError):
+            bundle_id, version = "", ""
+        return AppMenus(
+            app_name, items, time.perf_counter() - start, None, bundle_id, version
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(_extract, names))
+
+
+def list_running_apps() -> List[str]:
+    """Names of the running application processes that have a user interface."""
+    raw = _run_osascript(_LIST_RUNNING_APPS_SCRIPT, timeout=10)
+    return [line.strip() for line in raw.split("\n") if line.strip()]
+
+
+def list_menu_bar_items() -> Tuple[str, List[str]]:
+    """Get the frontmost application name and its menu bar item names."""
+    raw = _run_osascript(_LIST_MENU_BAR_SCRIPT, timeout=10)
+    lines = raw.strip().split("\n")
+    if not lines or not lines[0].strip():
+        raise MenuExtractionError("AppleScript の出力が空です")
+    return lines[0].strip(), [line for line in lines[1:] if line.strip()]
+
+
+def _run_osascript(script: str, timeout: float = 60) -> str:
+    """Run an AppleScript source and return its stdout.
+
+    The resident helper runs it when one is in use and answering;
+    otherwise a new osascript process does.
+    """
+    try:
+        with timing.span("osascript"):
+            result = _run_helper({"op": "run", "source": script}, timeout)
+            if result is None:
+                result = subprocess.run(
+                    script_cache.osascript_args(script),
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                )
     except subprocess.TimeoutExpired:
-        raise MenuExtractionError("AppleScript がタイムアウトしました")
+        raise ExtractionTimeoutError("AppleScript がタイムアウトしました")
 
+    if timing.active() is not None:
+        timing.count("osascript_calls")
+        timing.count("osascript_bytes", len(result.stdout.encode("utf-8")))
     if result.returncode != 0:
-        stderr = result.stderr.strip()
-        stderr_lower = stderr.lower()
-        if "assistive" in stderr_lower or "accessibility" in stderr_lower:
-            raise AccessibilityError(stderr)
-        if "menu bar" in stderr_lower:
-            raise MenuBarNotFoundError(stderr)
-        raise MenuExtractionError(stderr)
+        raise _classify_error(result.stderr.strip())
+    return result.stdout
 
-    return _parse_output(result.stdout)
 
+def iter_menus(
+    timeout: float = 60,
+    traversal: str = "item",
+    menu_filter: Optional[MenuFilter] = None,
+    app_name: Optional[str] = None,
+    on_checkpoint: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, Iterator[MenuItem]]:
+    """Stream menu items from the frontmost (or a named) application.
 
-def _build_applescript() -> str:
-    """Build the AppleScript for recursive menu traversal."""
-    return """\
-on run
-    set LF to (ASCII character 10)
-    set TB to (ASCII character 9)
-    set outputText to ""
+    The traversal script logs each row as soon as it is visited, so items
+    are yielded while osascript is still walking the menu tree. Menus
+    selected by ``menu_filter`` are pruned as in ``extract_menus()``.
+    ``on_checkpoint`` is called with the name of each top-level menu once
+    all of its rows have been yielded.
 
-    tell application "System Events"
-        set frontApp to name of first application process whose frontmost is true
-        tell process frontApp
-            set mb to menu bar 1
-            repeat with mbi in (menu bar items of mb)
-                set mbiName to name of mbi
-                set outputText to outputText & ¬
-                    my processMenu(menu 1 of mbi, mbiName, TB, LF)
-            end repeat
-        end tell
+    Returns:
+        (app_name, iterator) where the iterator yields (modifier, key, levels).
+        Errors from osascript are raised when the iterator is exhausted.
+    """
+    script = _build_applescript(
+        stream=True,
+        traversal=traversal,
+        app_name=app_name,
+        checkpoint=on_checkpoint is not None,
+        **_filter_options(menu_filter or MenuFilter()),
+    )
+    proc = subprocess.Popen(
+        script_cache.osascript_args(script),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    expired = threading.Event()
+
+    def _expire() -> None:
+        expired.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, _expire)
+    timer.start()
+    assert proc.stderr is not None
+    stream = proc.stderr
+
+    def _stop() -> None:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+    def _finish(errors: List[str]) -> None:
+        _stop()
+        if expired.is_set():
+            raise ExtractionTimeoutError("AppleScript がタイムアウトしました")
+        if proc.returncode != 0:
+            raise _classify_error("\n".join(errors))
+
+    # osascript writes `log` output to stderr, so rows and error messages
+    # share one stream. Rows are the only lines with field separators.
+    first = stream.readline()
+    if not first.strip() or "\t" in first or _OSASCRIPT_ERROR.match(first):
+        _finish([first.strip(), stream.read().strip()])
+        raise MenuExtractionError("AppleScript の出力が空です")
+
+    def _rows() -> Iterator[MenuItem]:
+        errors: List[str] = []
+        try:
+            for line in stream:
+                item = _parse_line(line)
+                if item is not None:
+                    yield item
+                elif line.startswith(_RS) and on_checkpoint is not None:
+                    on_checkpoint(line[1:].rstrip("\n"))
+                elif line.strip():
+                    errors.append(line.strip())
+        except GeneratorExit:
+            _stop()
+            raise
+        _finish(errors)
+
+    return first.strip(), _rows()
+
+
+def extract_menus_partial(
+    timeout: float = 60,
+    traversal: str = "item",
+    menu_filter: Optional[MenuFilter] = None,
+    resume: Optional[PartialMenus] = None,
+) -> PartialMenus:
+    """Extract menus, keeping the rows that arrived before a timeout.
+
+    Rows are streamed as in ``iter_menus()`` and each top-level menu is
+    checkpointed once walked. When the timeout fires, the rows read so
+    far are returned with ``complete=False`` instead of being discarded.
+
+    Args:
+        timeout: Seconds before osascript is stopped.
+        traversal: ``"item"`` or ``"bulk"``, see ``extract_menus()``.
+        menu_filter: Menus to prune, see ``extract_menus()``.
+        resume: An earlier partial result. Only the top-level menus it did
+            not complete are walked, in the same application, and its
+            completed rows are kept in front of the new ones.
+
+    Returns:
+        The merged ``PartialMenus``.
+    """
+    menu_filter = menu_filter or MenuFilter()
+    completed: List[str] = []
+    items: List[MenuItem] = []
+    app_name = None
+    if resume is not None:
+        app_name = resume.app_name
+        completed = list(resume.completed)
+        done = set(completed)
+        items = [item for item in resume.items if item[2][:1] and item[2][0] in done]
+        menu_filter = menu_filter._replace(
+            exclude=menu_filter.exclude + tuple(completed)
+        )
+
+    app_name, rows = iter_menus(
+        timeout,
+        traversal,
+        menu_filter,
+        app_name=app_name,
+        on_checkpoint=completed.append,
+    )
+    try:
+        for item in rows:
+            items.append(item)
+    except ExtractionTimeoutError:
+        return PartialMenus(app_name, items, completed, False)
+    return PartialMenus(app_name, items, completed, True)
+
+
+def _filter_options(menu_filter: MenuFilter) -> Dict[str, Any]:
+    """``_build_applescript()`` keyword arguments for a filter."""
+    return {
+        "include": menu_filter.include,
+        "exclude": menu_filter.exclude,
+        "max_depth": menu_filter.max_depth,
+        "skip": menu_filter.skip,
+        "shortcuts_only": menu_filter.shortcuts_only,
+    }
+
+
+def _classify_error(stderr: str) -> MenuExtractionError:
+    """Map osascript stderr to the matching MenuExtractionError subclass."""
+    stderr_lower = stderr.lower()
+    if "assistive" in stderr_lower or "accessibility" in stderr_lower:
+        return AccessibilityError(stderr)
+    if "menu bar" in stderr_lower:
+        return MenuBarNotFoundError(stderr)
+    return MenuExtractionError(stderr)
+
+
+_FRONTMOST_APP_SCRIPT = (
+    'tell application "System Events" to return name of first '
+    "application process whose frontmost is true"
+)
+
+_APP_IDENTITY_SCRIPT = """\
+tell application "System Events"
+    set p to first application process whose frontmost is true
+    set appName to name of p
+    set bundleId to ""
+    try
+        set bundleId to bundle identifier of p as text
+    end try
+    set appVersion to ""
+    try
+        set appVersion to short version of (application file of p)
+    end try
+end tell
+return appName & (ASCII character 10) & bundleId & (ASCII character 10) & appVersion"""
+
+_LIST_MENU_BAR_SCRIPT = """\
+tell application "System Events"
+    set frontApp to name of first application process whose frontmost is true
+    tell process frontApp
+        set names to name of every menu bar item of menu bar 1
     end tell
+end tell
+set AppleScript's text item delimiters to (ASCII character 10)
+set outputText to frontApp & (ASCII character 10) & (names as text)
+set AppleScript's text item delimiters to ""
+return outputText"""
 
-    return frontApp & LF & outputText
-end run
+_LIST_RUNNING_APPS_SCRIPT = """\
+tell application "System Events"
+    set names to name of every application process whose background only is false
+end tell
+set AppleScript's text item delimiters to (ASCII character 10)
+set outputText to names as text
+set AppleScript's text item delimiters to ""
+return outputText"""
+
+# Logs RS and the name of a top-level menu once it has been walked.
+_CHECKPOINT_HANDLER = """
+
+on checkpointMenu(n)
+    log ((ASCII character 30) & n)
+end checkpointMenu"""
+
+# Parts of a glob with two or more ``*``: the first starts the name, the
+# last ends it and each middle part is found after the previous one
+_GLOB_HANDLER = """
 
-on processMenu(theMenu, pathSoFar, TB, LF)
-    set outputText to ""
+on globMatch(n, parts)
+    set remaining to n
+    set lastPart to count of parts
+    repeat with i from 1 to lastPart
+        set p to item i of parts
+        if i = lastPart then
+            return p is "" or remaining ends with p
+        end if
+        if p is not "" then
+            if i = 1 then
+                if remaining does not start with p then return false
+                set k to (length of p) + 1
+            else
+                set k to offset of p in remaining
+                if k = 0 then return false
+                set k to k + (length of p)
+            end if
+            if k > (length of remaining) then
+                set remaining to ""
+            else
+                set remaining to text k thru -1 of remaining
+            end if
+        end if
+    end repeat
+end globMatch"""
+
+# One Apple Event per attribute per menu item, plus a submenu probe.
+_ITEM_HANDLER = """\
+on processMenu(theMenu, pathSoFar, depth, TB)
     tell application "System Events"
         repeat with mi in (menu items of theMenu)
             set n to name of mi
             if n is not missing value then
-                set m to ""
                 set c to ""
                 set g to ""
-                try
-                    set raw to value of attribute "AXMenuItemCmdModifiers" of mi
-                    if raw is not missing value then set m to raw as text
-                end try
                 try
                     set raw to value of attribute "AXMenuItemCmdChar" of mi
                     if raw is not missing value then set c to raw
@@ -175,21 +811,248 @@ on processMenu(theMenu, pathSoFar, TB, LF)
                         set g to raw as text
                 end try
 
-                set thisPath to pathSoFar & TB & n
-                set outputText to outputText & ¬
-                    m & TB & c & TB & g & TB & thisPath & LF
+                set thisPath to pathSoFar & my LS & n
+                if my keepRow(c, g) then
+                    set m to ""
+                    try
+                        set raw to value of attribute "AXMenuItemCmdModifiers" of mi
+                        if raw is not missing value then set m to raw as text
+                    end try
+                    my emitRow(m & TB & c & TB & g & TB & thisPath)
+                end if
 
-                try
-                    set sub to menu 1 of mi
-                    set outputText to outputText & ¬
-                        my processMenu(sub, thisPath, TB, LF)
-                end try
+                if my withinDepth(depth) and not my skipSubtree(n) then
+                    try
+                        set sub to menu 1 of mi
+                        my processMenu(sub, thisPath, depth + 1, TB)
+                    end try
+                end if
             end if
         end repeat
     end tell
-    return outputText
 end processMenu"""
 
+# One Apple Event per attribute per menu; results are zipped by index.
+_BULK_HANDLER = """\
+on processMenu(theMenu, pathSoFar, depth, TB)
+    set descend to my withinDepth(depth)
+    tell application "System Events"
+        try
+            set names to name of every menu item of theMenu
+            set mods to value of attribute "AXMenuItemCmdModifiers" of every menu item of theMenu
+            set chars to value of attribute "AXMenuItemCmdChar" of every menu item of theMenu
+            set glyphs to value of attribute "AXMenuItemCmdGlyph" of every menu item of theMenu
+            if descend then set subs to menus of every menu item of theMenu
+        on error
+            my processMenuEach(theMenu, pathSoFar, depth, TB)
+            return
+        end try
+    end tell
+
+    repeat with i from 1 to count of names
+        set n to item i of names
+        if n is not missing value then
+            set m to ""
+            set c to ""
+            set g to ""
+            set raw to item i of mods
+            if raw is not missing value then set m to raw as text
+            set raw to item i of chars
+            if raw is not missing value then set c to raw
+            set raw to item i of glyphs
+            if raw is not missing value and raw is not 0 then set g to raw as text
+
+            set thisPath to pathSoFar & my LS & n
+            if my keepRow(c, g) then my emitRow(m & TB & c & TB & g & TB & thisPath)
+
+            if descend and not my skipSubtree(n) then
+                set sub to item i of subs
+                if sub is not {} then my processMenu(item 1 of sub, thisPath, depth + 1, TB)
+            end if
+        end if
+    end repeat
+end processMenu"""
+
+
+def _build_applescript(
+    stream: bool = False,
+    traversal: str = "item",
+    app_name: Optional[str] = None,
+    include: Optional[Sequence[str]] = None,
+    wire: str = "text",
+    exclude: Sequence[str] = (),
+    max_depth: Optional[int] = None,
+    skip: Sequence[str] = (),
+    shortcuts_only: bool = False,
+    checkpoint: bool = False,
+) -> str:
+    """Build the AppleScript for recursive menu traversal.
+
+    Rows are appended to a list and joined once with ``text item delimiters``
+    so the output is built in linear time. With ``stream=True`` every row
+    (and the app name first) is written with ``log`` as soon as it is visited
+    instead of being returned at the end.
+
+    ``traversal`` selects how attributes are fetched: ``"item"`` queries each
+    menu item separately, ``"bulk"`` fetches each attribute for every item of
+    a menu in one Apple Event and falls back to ``"item"`` for menus where a
+    bulk query fails. Both produce identical rows.
+
+    ``app_name`` targets a named process instead of the frontmost one.
+    ``include`` and ``exclude`` select top-level menus by name,
+    ``max_depth`` caps the number of levels per row (the top-level menu is
+    level 1) and ``skip`` lists ``*`` glob patterns of item titles whose
+    submenus are not walked. Pruned menus are never queried.
+    ``shortcuts_only`` drops rows without a key equivalent (their submenus
+    are still walked); in ``"item"`` mode their modifiers are not queried.
+
+    ``checkpoint`` (streaming only) logs RS (ASCII 30) followed by the
+    name of each top-level menu once it has been walked completely.
+
+    ``wire="records"`` terminates fields with US (ASCII 31) and joins levels
+    with GS (ASCII 29) behind a length-prefixed header holding the row
+    count; see ``_parse_records()``. It cannot be streamed.
+    """
+    if traversal not in TRAVERSAL_MODES:
+        raise ValueError(f"unknown traversal mode: {traversal}")
+    if max_depth is not None and max_depth < 2:
+        raise ValueError(f"max_depth must be at least 2: {max_depth}")
+    if wire not in WIRE_FORMATS:
+        raise ValueError(f"unknown wire format: {wire}")
+    if checkpoint and not stream:
+        raise ValueError("checkpoints require a streaming script")
+    if wire == "records":
+        if stream:
+            raise ValueError("records wire format cannot be streamed")
+        separators = "(ASCII character 31)", "(ASCII character 29)"
+        emit = "set end of my outRows to rowText & RT"
+        finish = """\
+    set AppleScript's text item delimiters to ""
+    set header to "AML1" & TB & (((count of outRows) - 1) as text)
+    set outputText to ((length of header) as text) & ":" & header & (outRows as text)"""
+    else:
+        separators = "(ASCII character 9)", "TB"
+        if stream:
+            emit = "log rowText"
+        else:
+            emit = "set end of my outRows to rowText"
+        finish = """\
+    set AppleScript's text item delimiters to (ASCII character 10)
+    set outputText to outRows as text
+    set AppleScript's text item delimiters to """ ""
+    if traversal == "bulk":
+        handlers = (
+            _BULK_HANDLER
+            + "\n\n"
+            + _ITEM_HANDLER.replace("on processMenu(", "on processMenuEach(").replace(
+                "end processMenu", "end processMenuEach"
+            )
+        )
+    else:
+        handlers = _ITEM_HANDLER
+    if app_name is None:
+        front = "name of first application process whose frontmost is true"
+    else:
+        front = _applescript_string(app_name)
+    visit = ["my processMenu(menu 1 of mbi, mbiName, 2, TB)"]
+    if checkpoint:
+        visit.append("my checkpointMenu(mbiName)")
+        handlers += _CHECKPOINT_HANDLER
+    conditions = []
+    if include is not None:
+        names = ", ".join(_applescript_string(n) for n in include)
+        conditions.append(f"{{{names}}} contains mbiName")
+    if exclude:
+        names = ", ".join(_applescript_string(n) for n in exclude)
+        conditions.append(f"{{{names}}} does not contain mbiName")
+    if conditions:
+        visit = (
+            [f"if {' and '.join(conditions)} then"]
+            + [f"    {line}" for line in visit]
+            + ["end if"]
+        )
+    visit_lines = "\n                ".join(visit)
+    within = "true" if max_depth is None else f"depth < {max_depth}"
+    patterns = [_glob_condition("n", pattern) for pattern in skip]
+    skipped = " or ".join(patterns) if patterns else "false"
+    if "my globMatch(" in skipped:
+        handlers += _GLOB_HANDLER
+    keep = 'c is not "" or g is not ""' if shortcuts_only else "true"
+    return f"""\
+property outRows : {{}}
+property LS : ""
+property RT : ""
+
+on run
+    set TB to {separators[0]}
+    set LS to {separators[1]}
+    set RT to TB
+    set outRows to {{}}
+
+    tell application "System Events"
+        set frontApp to {front}
+        my emitRow(frontApp)
+        tell process frontApp
+            set mb to menu bar 1
+            repeat with mbi in (menu bar items of mb)
+                set mbiName to name of mbi
+                {visit_lines}
+            end repeat
+        end tell
+    end tell
+
+{finish}
+    return outputText
+end run
+
+on emitRow(rowText)
+    {emit}
+end emitRow
+
+on withinDepth(depth)
+    return {within}
+end withinDepth
+
+on skipSubtree(n)
+    return {skipped}
+end skipSubtree
+
+on keepRow(c, g)
+    return {keep}
+end keepRow
+
+{handlers}"""
+
+
+def _glob_condition(var: str, pattern: str) -> str:
+    """Translate a ``*`` glob into an AppleScript test on ``var``.
+
+    A single ``*`` becomes ``starts with`` and ``ends with`` tests; more
+    call ``globMatch`` (``_GLOB_HANDLER``), which finds the parts in order
+    without overlapping. Comparisons follow AppleScript and ignore case.
+    """
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return f"{var} is {_applescript_string(pattern)}"
+    if any(parts[1:-1]):
+        names = ", ".join(_applescript_string(part) for part in parts)
+        return f"my globMatch({var}, {{{names}}})"
+    tests = []
+    if parts[0]:
+        tests.append(f"{var} starts with {_applescript_string(parts[0])}")
+    if parts[-1]:
+        tests.append(f"{var} ends with {_applescript_string(parts[-1])}")
+    if len(tests) == 2:
+        # "ab*b" must not match "ab"
+        tests.append(f"length of {var} >= {len(parts[0]) + len(parts[-1])}")
+    return "(" + " and ".join(tests) + ")" if tests else "true"
+
+
+def _applescript_string(value: str) -> str:
+    """Quote a Python string as an AppleScript string literal."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
 
 def _parse_output(raw: str) -> Tuple[str, List[MenuItem]]:
     """Parse tab-delimited output from AppleScript.
@@ -205,27 +1068,68 @@ def _parse_output(raw: str) -> Tuple[str, List[MenuItem]]:
     items: List[MenuItem] = []
 
     for line in lines[1:]:
-        if not line.strip():
-            continue
-        parts = line.split("\t")
-        if len(parts) < 4:
-            continue
+        item = _parse_line(line)
+        if item is not None:
+            items.append(item)
 
-        mod_raw, char_raw, glyph_raw = parts[0], parts[1], parts[2]
-        levels = parts[3:]
+    return app_name, items
 
-        has_shortcut = bool(char_raw) or bool(glyph_raw)
 
-        modifier = ""
-        key = ""
-        if has_shortcut:
-            if mod_raw:
-                modifier = decode_modifiers(int(mod_raw))
-            if char_raw:
-                key = char_raw
-            elif glyph_raw:
-                key = decode_glyph(int(glyph_raw))
+def _parse_records(raw: str) -> Tuple[str, List[MenuItem]]:
+    """Parse ``wire="records"`` output from AppleScript.
 
-        items.append((modifier, key, levels))
+    Format: ``<len>:AML1<US><rows>``, then ``APP<US>`` and one
+    ``MOD<US>CHAR<US>GLYPH<US>LEVEL1<GS>LEVEL2...<US>`` per row. Every row
+    has exactly four fields, so after one split of the body the columns
+    are plain slices; fields are taken verbatim, so titles may contain
+    tabs, newlines and surrounding spaces.
+    """
+    colon = raw.find(":")
+    if colon <= 0:
+        raise MenuExtractionError("AppleScript の出力が空です")
+    try:
+        header_start = colon + 1
+        header_end = header_start + int(raw[:colon])
+    except ValueError:
+        raise MenuExtractionError("AppleScript の出力形式が不正です")
+    header = raw[header_start:header_end].split(_US)
+    if header[0] != _WIRE_MAGIC or len(header) != 2 or not header[1].isdigit():
+        raise MenuExtractionError("AppleScript の出力形式が不正です")
 
-    return app_name, items
+    fields = raw[header_end:].split(_US)
+    # App name, four fields per row, then osascript's trailing newline
+    if len(fields) != 4 * int(header[1]) + 2 or fields[-1].strip():
+        raise MenuExtractionError("AppleScript の出力が途中で切れています")
+
+    modifiers, keys = decode_columns(fields[1:-1:4], fields[2:-1:4], fields[3:-1:4])
+    paths = [path.split(_GS) for path in fields[4:-1:4]]
+    return fields[0], list(zip(modifiers, keys, paths))
+
+
+def _parse_line(line: str) -> Optional[MenuItem]:
+    """Parse one MOD\\tCHAR\\tGLYPH\\tLEVEL1... row, or None if it is not a row."""
+    line = line.rstrip("\n")
+    if not line.strip():
+        return None
+    parts = line.split("\t")
+    if len(parts) < 4:
+        return None
+
+    mod_raw, char_raw, glyph_raw = parts[0], parts[1], parts[2]
+    levels = parts[3:]
+
+    has_shortcut = bool(char_raw) or bool(glyph_raw)
+
+    modifier = ""
+    key = ""
+    if has_shortcut:
+        if mod_raw:
+            found = _MODIFIER_BY_RAW.get(mod_raw)
+            modifier = found if found is not None else decode_modifiers(int(mod_raw))
+        if char_raw:
+            key = char_raw
+        elif glyph_raw:
+            found = _GLYPH_BY_RAW.get(glyph_raw)
+            key = found if found is not None else decode_glyph(int(glyph_raw))
+
+    return (modifier, key, levels)
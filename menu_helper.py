@@ -0,0 +1,280 @@
+"""Resident helper that runs AppleScripts without spawning osascript per call.
+
+The helper listens on a Unix socket. Each connection carries one request
+and one response, both a single JSON line:
+
+    {"op": "run", "source": "...", "timeout": 60}
+        -> {"returncode": 0, "stdout": "...", "stderr": ""}
+    {"op": "frontmost"}                      -> same as "run"
+    {"op": "notify", "message": "...", "title": "..."}  -> same as "run"
+    {"op": "ping"}                           -> {"ok": true}
+
+A script that does not finish within its timeout is answered with
+``{"timeout": true}``. While the runner is executing another request, a
+script request is answered with ``{"busy": true}`` at once instead of
+waiting, so concurrent callers (worker pools) run osascript themselves
+rather than queueing behind each other. Scripts are executed by one resident runner process
+(JXA ``osascript`` using ``NSAppleScript``) that keeps every compiled
+script in memory, so repeated calls skip both the process spawn and the
+compilation. The helper exits after ``idle`` seconds without requests.
+
+Usage: python menu_helper.py SOCKET [--idle SECONDS] [--runner CMD ...]
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Sequence
+
+DEFAULT_IDLE = 300
+
+# Reads one JSON request per line ({"source": ...}) from stdin and writes
+# one JSON response per line; requests are ASCII-only (ensure_ascii), so
+# decoding a partial read cannot split a character.
+RUNNER_JS = """\
+ObjC.import("Foundation");
+function run() {
+    var input = $.NSFileHandle.fileHandleWithStandardInput;
+    var output = $.NSFileHandle.fileHandleWithStandardOutput;
+    var compiled = {};
+    var pending = "";
+    for (;;) {
+        var data = input.availableData;
+        if (data.length === 0) return;
+        pending += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+        var end;
+        while ((end = pending.indexOf("\\n")) >= 0) {
+            var request = JSON.parse(pending.slice(0, end));
+            pending = pending.slice(end + 1);
+            var script = compiled[request.source];
+            if (script === undefined) {
+                script = $.NSAppleScript.alloc.initWithSource($(request.source));
+                compiled[request.source] = script;
+            }
+            var error = Ref();
+            var result = script.executeAndReturnError(error);
+            var response;
+            if (result.isNil()) {
+                var info = ObjC.deepUnwrap(error[0]) || {};
+                response = {
+                    returncode: 1,
+                    stdout: "",
+                    stderr: (info.NSAppleScriptErrorMessage || "AppleScript error") +
+                        " (" + info.NSAppleScriptErrorNumber + ")"
+                };
+            } else {
+                var text = result.stringValue;
+                response = {returncode: 0, stdout: (text.isNil() ? "" : text.js) + "\\n", stderr: ""};
+            }
+            output.writeData($(JSON.stringify(response) + "\\n").dataUsingEncoding($.NSUTF8StringEncoding));
+        }
+    }
+}
+"""
+
+RUNNER = ("osascript", "-l", "JavaScript", "-e", RUNNER_JS)
+
+FRONTMOST_SCRIPT = (
+    'tell application "System Events" to return name of first '
+    "application process whose frontmost is true"
+)
+
+
+class Runner:
+    """One resident runner process; requests are served one at a time.
+
+    A request arriving while another one runs is refused with
+    ``{"busy": true}``. The process is started on first use and replaced
+    after a timeout or a crash.
+    """
+
+    def __init__(self, command: Sequence[str] = RUNNER) -> None:
+        self.command = list(command)
+        self._proc: Optional["subprocess.Popen[str]"] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def run(self, source: str, timeout: float) -> Dict[str, Any]:
+        # Waiting here would count against the caller's timeout, and a
+        # caller that gave up would still have its script run later
+        if not self._lock.acquire(blocking=False):
+            return {"busy": True}
+        try:
+            return self._run(source, timeout)
+        finally:
+            self._lock.release()
+
+    def _run(self, source: str, timeout: float) -> Dict[str, Any]:
+        proc = self._ensure()
+        assert proc.stdin is not None
+        try:
+            proc.stdin.write(json.dumps({"source": source}) + "\n")
+            proc.stdin.flush()
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self.stop()
+            return {"timeout": True}
+        except OSError:
+            line = None
+        if line is None:
+            self.stop()
+            return {"returncode": 1, "stdout": "", "stderr": "helper runner exited"}
+        response: Dict[str, Any] = json.loads(line)
+        return response
+
+    def stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    def _ensure(self) -> "subprocess.Popen[str]":
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        self._lines = queue.Queue()
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        assert self._proc.stdout is not None
+        threading.Thread(
+            target=_pump, args=(self._proc.stdout, self._lines), daemon=True
+        ).start()
+        return self._proc
+
+
+def _pump(stream: IO[str], lines: "queue.Queue[Optional[str]]") -> None:
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+class HelperServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Socket server answering helper requests; see the module docstring."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, socket_path: str, runner: Runner, idle: float = DEFAULT_IDLE
+    ) -> None:
+        self.runner = runner
+        self.idle = idle
+        self.last_request = time.monotonic()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.last_request = time.monotonic()
+        op = request.get("op")
+        timeout = float(request.get("timeout", 60))
+        if op == "ping":
+            return {"ok": True}
+        if op == "run":
+            return self.runner.run(str(request["source"]), timeout)
+        if op == "frontmost":
+            return self.runner.run(FRONTMOST_SCRIPT, timeout)
+        if op == "notify":
+            source = (
+                f"display notification {_quote(str(request['message']))}"
+                f" with title {_quote(str(request.get('title', '')))}"
+            )
+            return self.runner.run(source, timeout)
+        return {"error": f"unknown op: {op}"}
+
+    def serve_until_idle(self) -> None:
+        """Serve requests until ``idle`` seconds pass without one."""
+        watchdog = threading.Thread(target=self._watch_idle, daemon=True)
+        watchdog.start()
+        try:
+            self.serve_forever(poll_interval=0.2)
+        finally:
+            self.runner.stop()
+            self.server_close()
+            try:
+                os.remove(self.server_address)  # type: ignore[arg-type]
+            except OSError:
+                pass
+
+    def _watch_idle(self) -> None:
+        while True:
+            remaining = self.last_request + self.idle - time.monotonic()
+            if remaining <= 0:
+                self.shutdown()
+                return
+            time.sleep(min(remaining, 1.0))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: HelperServer
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return  # is_running() probe
+        try:
+            response = self.server.dispatch(json.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            response = {"error": str(e)}
+        # A long script counts as activity until it finishes
+        self.server.last_request = time.monotonic()
+        try:
+            self.wfile.write(
+                json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+            )
+        except OSError:
+            pass  # the client gave up waiting
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def is_running(socket_path: str) -> bool:
+    """Whether a helper answers on ``socket_path``."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(socket_path)
+            return True
+    except OSError:
+        return False
+
+
+def serve(
+    socket_path: str, runner: Sequence[str] = RUNNER, idle: float = DEFAULT_IDLE
+) -> None:
+    """Run a helper on ``socket_path`` unless one is already running there."""
+    if is_running(socket_path):
+        return
+    try:
+        os.remove(socket_path)  # left behind by a helper that crashed
+    except OSError:
+        pass
+    server = HelperServer(socket_path, Runner(runner), idle)
+    server.serve_until_idle()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("socket")
+    parser.add_argument("--idle", type=float, default=DEFAULT_IDLE)
+    parser.add_argument("--runner", nargs="+", default=list(RUNNER))
+    args = parser.parse_args(argv)
+    serve(args.socket, args.runner, args.idle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Local history of extractions stored as content-addressed menu chunks."""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from atomic_file import write_bytes, write_json
+from menu_diff import MenuDiff, diff_items
+from menu_extractor import MenuItem
+
+INDEX_FILE = "index.json"
+CHUNK_DIR = "chunks"
+
+
+class Snapshot(NamedTuple):
+    """One stored extraction; ``chunks`` are the hashes of its top-level menus."""
+
+    id: str
+    app_name: str
+    created: float
+    bundle_id: str
+    version: str
+    items: int
+    chunks: List[str]
+
+
+class SnapshotStore:
+    """History of ``(app_name, items)`` extractions with shared chunks.
+
+    Each run of rows under one top-level menu is a chunk: compact JSON,
+    compressed with zlib and stored under ``chunks/`` by the SHA-256 of its
+    contents, so a menu that did not change between runs, app versions or
+    even apps is stored once. ``index.json`` lists the snapshots in the
+    order they were taken with their app, time and chunk hashes; listing
+    and comparing snapshots reads only the index.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        # hash -> rows, for chunks read by this instance
+        self._chunks: Dict[str, List[MenuItem]] = {}
+
+    def put(
+        self,
+        app_name: str,
+        items: List[MenuItem],
+        bundle_id: str = "",
+        version: str = "",
+        created: Optional[float] = None,
+    ) -> Snapshot:
+        """Store a snapshot, writing only the chunks not stored yet.
+
+        When the app's latest snapshot has the same chunks, bundle id and
+        version, nothing is added and that snapshot is returned, so
+        unchanged runs do not push earlier versions out of ``prune()``.
+        """
+        created = time.time() if created is None else created
+        hashes = []
+        for rows in _split(items):
+            data = json.dumps(
+                [list(item) for item in rows], ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:32]
+            path = self._chunk_path(digest)
+            if not os.path.exists(path):
+                write_bytes(path, zlib.compress(data, 9))
+            hashes.append(digest)
+
+        index = self._load_index()
+        for entry in reversed(index):
+            if entry["app_name"] == app_name:
+                latest = Snapshot(**entry)
+                if (latest.chunks, latest.bundle_id, latest.version) == (
+                    hashes,
+                    bundle_id,
+                    version,
+                ):
+                    return latest
+                break
+
+        key = json.dumps([app_name, created, hashes], ensure_ascii=False).encode(
+            "utf-8"
+        )
+        snapshot = Snapshot(
+            hashlib.sha256(key).hexdigest()[:16],
+            app_name,
+            created,
+            bundle_id,
+            version,
+            len(items),
+            hashes,
+        )
+        index.append(snapshot._asdict())
+        self._save_index(index)
+        return snapshot
+
+    def list(self, app_name: Optional[str] = None) -> List[Snapshot]:
+        """Snapshots of ``app_name`` (or of every app), oldest first."""
+        return [
+            s for s in self._snapshots() if app_name is None or s.app_name == app_name
+        ]
+
+    def apps(self) -> List[str]:
+        """Apps with at least one snapshot, in order of their first one."""
+        return list(dict.fromkeys(s.app_name for s in self._snapshots()))
+
+    def latest(self, app_name: str) -> Optional[Snapshot]:
+        snapshots = self.list(app_name)
+        return snapshots[-1] if snapshots else None
+
+    def find(self, snapshot_id: str) -> Snapshot:
+        """Snapshot by id or unique id prefix; KeyError if there is none."""
+        matches = [s for s in self._snapshots() if s.id.startswith(snapshot_id)]
+        if len(matches) != 1 or not snapshot_id:
+            raise KeyError(snapshot_id)
+        return matches[0]
+
+    def items(self, snapshot: Snapshot) -> List[MenuItem]:
+        """Rows of a snapshot, in the order they were extracted."""
+        items: List[MenuItem] = []
+        for digest in snapshot.chunks:
+            items.extend(self._read_chunk(digest))
+        return items
+
+    def diff(self, old: Snapshot, new: Snapshot) -> MenuDiff:
+        """Keyed diff from ``old`` to ``new``, as ``menu_diff.diff_items()``.
+
+        Snapshots with the same chunks are equal without reading them.
+        """
+        if old.chunks == new.chunks:
+            return MenuDiff([], [], [], True)
+        return diff_items(self.items(old), self.items(new))
+
+    def prune(self, keep: int) -> int:
+        """Keep the ``keep`` newest snapshots per app and drop unused chunks.
+
+        Returns:
+            Number of chunk files removed.
+        """
+        index = self._load_index()
+        counts: Dict[str, int] = {}
+        kept: List[Dict[str, Any]] = []
+        for entry in reversed(index):
+            n = counts.get(entry["app_name"], 0)
+            if n < keep:
+                kept.append(entry)
+            counts[entry["app_name"]] = n + 1
+        if len(kept) == len(index):
+            return 0
+        kept.reverse()
+        self._save_index(kept)
+
+        used = {digest for entry in kept for digest in entry["chunks"]}
+        removed = 0
+        for digest, path in self._chunk_files():
+            if digest not in used:
+                os.remove(path)
+                self._chunks.pop(digest, None)
+                removed += 1
+        return removed
+
+    def disk_usage(self) -> int:
+        """Bytes used by the chunks and the index."""
+        total = sum(os.path.getsize(path) for _, path in self._chunk_files())
+        index = os.path.join(self.directory, INDEX_FILE)
+        return total + (os.path.getsize(index) if os.path.exists(index) else 0)
+
+    def _read_chunk(self, digest: str) -> List[MenuItem]:
+        rows = self._chunks.get(digest)
+        if rows is None:
+            with open(self._chunk_path(digest), "rb") as f:
+                data = json.loads(zlib.decompress(f.read()))
+            rows = [(m, k, levels) for m, k, levels in data]
+            self._chunks[digest] = rows
+        return rows
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.directory, CHUNK_DIR, digest[:2], digest)
+
+    def _chunk_files(self) -> Iterator[Tuple[str, str]]:
+        root = os.path.join(self.directory, CHUNK_DIR)
+        if not os.path.isdir(root):
+            return
+        for prefix in os.listdir(root):
+            for name in os.listdir(os.path.join(root, prefix)):
+                if not name.endswith(".tmp"):
+                    yield name, os.path.join(root, prefix, name)
+
+    def _snapshots(self) -> List[Snapshot]:
+        return [Snapshot(**entry) for entry in self._load_index()]
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                index: List[Dict[str, Any]] = json.load(f)["snapshots"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+        return index
+
+    def _save_index(self, index: List[Dict[str, Any]]) -> None:
+        write_json(os.path.join(self.directory, INDEX_FILE), {"snapshots": index})
+
+
+def _split(items: List[MenuItem]) -> Iterator[List[MenuItem]]:
+    """Consecutive runs of items under the same top-level menu."""
+    rows: List[MenuItem] = []
+    top: Optional[str] = None
+    for item in items:
+        name = item[2][0] if item[2] else ""
+        if rows and name != top:
+            yield rows
+            rows = []
+        top = name
+        rows.append(item)
+    if rows:
+        yield rows
@@ -0,0 +1,126 @@
+"""Compact array-backed menu tree."""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+from menu_extractor import MODIFIER_TABLE, MenuItem
+
+# Decoded modifier string -> AXMenuItemCmdModifiers mask
+_MODIFIER_MASKS: Dict[str, int] = {
+    name: mask for mask, name in enumerate(MODIFIER_TABLE)
+}
+
+NO_SHORTCUT = -1
+
+
+class MenuTree:
+    """Menu tree storing each node once in parallel arrays.
+
+    Nodes are kept in traversal (depth-first) order. Per node the tree holds
+    the parent index, an index into the interned name table, the modifier
+    mask (``NO_SHORTCUT`` when there is no shortcut) and an index into the
+    interned key table. Top-level menus that are not rows themselves are
+    stored as structural nodes. ``iter_items()`` rebuilds the flat
+    ``MenuItem`` rows on demand.
+    """
+
+    __slots__ = (
+        "parent",
+        "name",
+        "modifier",
+        "key",
+        "is_row",
+        "names",
+        "keys",
+        "_ids",
+        "_key_ids",
+    )
+
+    def __init__(self) -> None:
+        self.parent = array("i")
+        self.name = array("I")
+        self.modifier = array("b")
+        self.key = array("I")
+        self.is_row = array("b")
+        self.names: List[str] = []
+        self.keys: List[str] = [""]
+        self._ids: Dict[str, int] = {}
+        self._key_ids: Dict[str, int] = {"": 0}
+
+    @classmethod
+    def from_items(cls, items: Iterable[MenuItem]) -> "MenuTree":
+        """Build a tree from flat rows in traversal order."""
+        tree = cls()
+        stack: List[int] = []
+        for modifier, key, levels in items:
+            *ancestors, leaf = levels
+            depth = 0
+            while (
+                depth < len(stack)
+                and depth < len(ancestors)
+                and tree.names[tree.name[stack[depth]]] == ancestors[depth]
+            ):
+                depth += 1
+            del stack[depth:]
+            for name in ancestors[depth:]:
+                stack.append(tree._add(stack[-1] if stack else -1, name, "", "", False))
+            stack.append(
+                tree._add(stack[-1] if stack else -1, leaf, modifier, key, True)
+            )
+        return tree
+
+    def __len__(self) -> int:
+        """Number of rows (structural nodes excluded)."""
+        return sum(self.is_row)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.parent)
+
+    def iter_items(self) -> Iterator[MenuItem]:
+        """Yield the flat (modifier, key, levels) rows in traversal order."""
+        names = self.names
+        keys = self.keys
+        path: List[str] = []
+        depths: List[int] = []
+        for i in range(len(self.parent)):
+            parent = self.parent[i]
+            depth = 0 if parent < 0 else depths[parent] + 1
+            depths.append(depth)
+            del path[depth:]
+            path.append(names[self.name[i]])
+            if self.is_row[i]:
+                mask = self.modifier[i]
+                modifier = "" if mask == NO_SHORTCUT else MODIFIER_TABLE[mask]
+                yield (modifier, keys[self.key[i]], list(path))
+
+    def max_depth(self) -> int:
+        """Number of levels of the deepest row."""
+        deepest = 0
+        depths: List[int] = []
+        for i in range(len(self.parent)):
+            parent = self.parent[i]
+            depth = 1 if parent < 0 else depths[parent] + 1
+            depths.append(depth)
+            if self.is_row[i] and depth > deepest:
+                deepest = depth
+        return deepest
+
+    def _add(
+        self, parent: int, name: str, modifier: str, key: str, is_row: bool
+    ) -> int:
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self.keys)
+            self.keys.append(key)
+
+        self.parent.append(parent)
+        self.name.append(name_id)
+        self.modifier.append(_MODIFIER_MASKS[modifier] if modifier else NO_SHORTCUT)
+        self.key.append(key_id)
+        self.is_row.append(is_row)
+        return len(self.parent) - 1
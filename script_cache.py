@@ -0,0 +1,163 @@
+"""Cache of compiled AppleScripts so osascript skips compiling on every run."""
+
+import hashlib
+import os
+import subprocess
+import threading
+from typing import List, Optional, Sequence
+
+import timing
+
+# Part of every key: bump to drop all compiled scripts at once
+CACHE_VERSION = "1"
+DEFAULT_MAX_ENTRIES = 64
+
+COMPILER = ("osacompile",)
+
+
+class ScriptCache:
+    """Compiled ``.scpt`` files keyed by a hash of their source.
+
+    Generated scripts embed every option (traversal, filters, wire format,
+    target app), so changing an option or the generator itself yields a
+    new key and stale files simply stop being used. They are evicted least
+    recently used first once more than ``max_entries`` are stored.
+
+    ``compiler`` is run as ``[*compiler, "-o", output, source_file]`` and
+    must exit with status 0 after writing ``output``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        compiler: Sequence[str] = COMPILER,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.directory = directory
+        self.compiler = list(compiler)
+        self.max_entries = max_entries
+        # Set once the compiler cannot be started, so later scripts do not retry
+        self.unavailable = False
+
+    @staticmethod
+    def make_key(source: str) -> str:
+        """Build the cache key for an AppleScript source."""
+        data = f"{CACHE_VERSION}\0{source}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def compiled(self, source: str) -> Optional[str]:
+        """Path of the compiled script for ``source``, compiling it if needed.
+
+        Returns None when the script cannot be compiled; callers then run
+        the source directly.
+        """
+        path = os.path.join(self.directory, self.make_key(source) + ".scpt")
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        else:
+            timing.count("script_cache_hits")
+            return path
+        if self.unavailable:
+            return None
+        with timing.span("compile"):
+            if not self._compile(source, path):
+                return None
+        self._evict()
+        return path
+
+    def args(self, source: str, *argv: str) -> List[str]:
+        """osascript command line running ``source`` with ``argv``."""
+        path = self.compiled(source)
+        if path is None:
+            return ["osascript", "-e", source, *argv]
+        return ["osascript", path, *argv]
+
+    def clear(self) -> None:
+        """Remove every compiled script."""
+        for name in self._entries():
+            _remove(os.path.join(self.directory, name))
+
+    def _compile(self, source: str, path: str) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        # Unique per thread: extract_apps() compiles from a worker pool
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp + ".applescript", "w", encoding="utf-8") as f:
+            f.write(source)
+        try:
+            result = subprocess.run(
+                self.compiler + ["-o", tmp + ".scpt", tmp + ".applescript"],
+                capture_output=True,
+                timeout=30,
+            )
+            if result.returncode != 0 or not os.path.exists(tmp + ".scpt"):
+                return False
+            os.replace(tmp + ".scpt", path)
+            return True
+        except FileNotFoundError:
+            self.unavailable = True
+            return False
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        finally:
+            _remove(tmp + ".applescript")
+            _remove(tmp + ".scpt")
+
+    def _entries(self) -> List[str]:
+        try:
+            return [n for n in os.listdir(self.directory) if n.endswith(".scpt")]
+        except OSError:
+            return []
+
+    def _evict(self) -> None:
+        names = self._entries()
+        if len(names) <= self.max_entries:
+            return
+        paths = [os.path.join(self.directory, n) for n in names]
+        paths.sort(key=_mtime)
+        for path in paths[: len(paths) - self.max_entries]:
+            _remove(path)
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Cache used by osascript_args(); None (the default) runs every source directly
+_active: Optional[ScriptCache] = None
+
+
+def enable(
+    directory: str,
+    compiler: Sequence[str] = COMPILER,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> ScriptCache:
+    """Run scripts from a cache in ``directory`` and return it."""
+    global _active
+    _active = ScriptCache(directory, compiler, max_entries)
+    return _active
+
+
+def disable() -> None:
+    """Go back to running every source directly."""
+    global _active
+    _active = None
+
+
+def osascript_args(source: str, *argv: str) -> List[str]:
+    """osascript command line for ``source``, compiled if caching is on."""
+    cache = _active
+    if cache is None:
+        return ["osascript", "-e", source, *argv]
+    return cache.args(source, *argv)
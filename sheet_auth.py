@@ -0,0 +1,84 @@
+"""Service account credentials with an on-disk access token cache."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from google.oauth2.service_account import Credentials
+
+import timing
+from atomic_file import read_json, write_json
+
+# Cached tokens this close to expiry are not reused
+REFRESH_MARGIN = timedelta(minutes=5)
+
+
+class CachedCredentials(Credentials):
+    """Service account credentials that persist each refreshed access token.
+
+    Refreshing stays lazy: google-auth refreshes only when the token is
+    missing or expired, and the authorized session retries once on 401.
+    """
+
+    token_cache_path: Optional[str] = None
+
+    def refresh(self, request: Any) -> None:
+        timing.count("token_refreshes")
+        super().refresh(request)
+        if self.token_cache_path and self.token and self.expiry:
+            _save_token(
+                self.token_cache_path, self._cache_key(), self.token, self.expiry
+            )
+
+    def _cache_key(self) -> str:
+        scopes = " ".join(sorted(self._scopes or []))
+        return f"{self.service_account_email} {scopes}"
+
+
+def load_credentials(
+    credentials_path: str,
+    scopes: Sequence[str],
+    token_cache_path: str,
+) -> CachedCredentials:
+    """Load service account credentials, reusing a cached access token.
+
+    Args:
+        credentials_path: Path to service account JSON key.
+        scopes: OAuth scopes to request.
+        token_cache_path: JSON file holding tokens from earlier runs.
+    """
+    creds: CachedCredentials = CachedCredentials.from_service_account_file(
+        credentials_path, scopes=list(scopes)
+    )
+    creds.token_cache_path = token_cache_path
+    cached = _load_token(token_cache_path, creds._cache_key())
+    if cached is not None:
+        creds.token, creds.expiry = cached
+    return creds
+
+
+def _load_token(path: str, key: str) -> Optional[Tuple[str, datetime]]:
+    entry = _load_cache(path).get(key)
+    if not entry:
+        return None
+    try:
+        # google-auth compares expiry as naive UTC
+        expiry = datetime.fromtimestamp(float(entry["expiry"]), timezone.utc)
+        token = str(entry["token"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if expiry - REFRESH_MARGIN <= datetime.now(timezone.utc):
+        return None
+    return token, expiry.replace(tzinfo=None)
+
+
+def _save_token(path: str, key: str, token: str, expiry: datetime) -> None:
+    cache = _load_cache(path)
+    epoch = expiry.replace(tzinfo=timezone.utc).timestamp()
+    cache[key] = {"token": token, "expiry": epoch}
+    # The access token is a bearer secret: keep it owner-readable only
+    write_json(path, cache, 0o600)
+
+
+def _load_cache(path: str) -> Dict[str, Any]:
+    cache = read_json(path)
+    return cache if isinstance(cache, dict) else {}
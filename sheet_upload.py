@@ -0,0 +1,151 @@
+"""Chunked, resumable upload of spreadsheet rows."""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import gspread
+import requests
+
+import timing
+from atomic_file import read_json, write_json
+
+# Sheets API limits requests to about 2 MB; stay well below it
+DEFAULT_CHUNK_ROWS = 5000
+DEFAULT_CHUNK_BYTES = 1_000_000
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+MAX_DELAY = 64.0
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def plan_chunks(
+    rows: Sequence[Any],
+    max_rows: int = DEFAULT_CHUNK_ROWS,
+    max_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> List[Tuple[int, int]]:
+    """Split rows into half-open [start, end) ranges bounded by count and size.
+
+    Any JSON values can be split the same way, such as the requests of a
+    ``batch_update``; sizes are those of their UTF-8 JSON text.
+    """
+    chunks: List[Tuple[int, int]] = []
+    start = 0
+    size = 0
+    for i, row in enumerate(rows):
+        row_bytes = len(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+        if i > start and (i - start >= max_rows or size + row_bytes > max_bytes):
+            chunks.append((start, i))
+            start = i
+            size = 0
+        size += row_bytes
+    if start < len(rows):
+        chunks.append((start, len(rows)))
+    return chunks
+
+
+def rows_digest(rows: List[List[str]]) -> str:
+    """Content hash of the rows, used to match a saved upload progress."""
+    data = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def resumable_spreadsheet(progress_path: str, rows: List[List[str]]) -> Optional[str]:
+    """Spreadsheet id of an interrupted upload of the same rows, if any."""
+    progress = read_json(progress_path)
+    if progress is None or progress.get("digest") != rows_digest(rows):
+        return None
+    spreadsheet_id: Optional[str] = progress.get("spreadsheet_id")
+    return spreadsheet_id
+
+
+def upload_rows(
+    sh: gspread.Spreadsheet,
+    rows: List[List[str]],
+    progress_path: Optional[str] = None,
+    max_rows: int = DEFAULT_CHUNK_ROWS,
+    max_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Write rows to the first worksheet in chunks via ``values_batch_update``.
+
+    Failed chunks are retried with exponential backoff; 429 responses wait
+    for ``Retry-After`` when the server sends it. After each chunk the
+    number of committed chunks is saved to ``progress_path``, so a later
+    call with the same spreadsheet and rows skips them. The progress file
+    is removed once every chunk is written.
+
+    Returns:
+        Number of chunks sent by this call.
+    """
+    chunks = plan_chunks(rows, max_rows, max_bytes)
+    digest = rows_digest(rows)
+    committed = 0
+    if progress_path is not None:
+        progress = read_json(progress_path)
+        if (
+            progress is not None
+            and progress.get("digest") == digest
+            and progress.get("spreadsheet_id") == sh.id
+        ):
+            committed = int(progress.get("committed", 0))
+
+    title = sh.sheet1.title
+    sent = 0
+    for n, (start, end) in enumerate(chunks):
+        if n < committed:
+            continue
+        body = {
+            "valueInputOption": "RAW",
+            "data": [{"range": f"'{title}'!A{start + 1}", "values": rows[start:end]}],
+        }
+        _with_retry(
+            lambda: sh.values_batch_update(body), max_retries, base_delay, sleep
+        )
+        sent += 1
+        if progress_path is not None:
+            write_json(
+                progress_path,
+                {"spreadsheet_id": sh.id, "digest": digest, "committed": n + 1},
+            )
+
+    if progress_path is not None and os.path.exists(progress_path):
+        os.remove(progress_path)
+    return sent
+
+
+def _with_retry(
+    send: Callable[[], Any],
+    max_retries: int,
+    base_delay: float,
+    sleep: Callable[[float], None],
+) -> Any:
+    for attempt in range(max_retries + 1):
+        timing.count("api_calls")
+        try:
+            return send()
+        except gspread.exceptions.APIError as e:
+            status = e.response.status_code
+            if status not in RETRY_STATUSES or attempt == max_retries:
+                raise
+            delay = _retry_after(e.response) if status == 429 else None
+        except requests.exceptions.ConnectionError:
+            if attempt == max_retries:
+                raise
+            delay = None
+        if delay is None:
+            delay = base_delay * 2**attempt
+        sleep(min(delay, MAX_DELAY))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
@@ -2,12 +2,19 @@
 
 import os
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
 
 import gspread
 from google.oauth2.service_account import Credentials
 
+import timing
+from atomic_file import read_json, write_json
+from menu_diff import MenuDiff, diff_items
+from menu_export import build_header, build_shortcut_rows
 from menu_extractor import MenuItem
+from sheet_auth import load_credentials
+from sheet_upload import plan_chunks, resumable_spreadsheet, upload_rows
 
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
@@ -19,6 +26,11 @@ def write_to_spreadsheet(
     app_name: str,
     items: List[MenuItem],
     credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    progress_path: Optional[str] = None,
+    shortcuts: bool = False,
+    master_key: Optional[str] = None,
+    sheet_ids_path: Optional[str] = None,
 ) -> str:
     """Write menu items to a new Google Spreadsheet.
 
@@ -26,35 +38,446 @@ def write_to_spreadsheet(
         app_name: Name of the application.
         items: List of (modifier, key, [levels]).
         credentials_path: Path to service account JSON key.
+        token_cache_path: If given, access tokens are cached in this file
+            and reused by later runs until shortly before they expire.
+        progress_path: If given, the upload is chunked and its progress
+            saved here; an interrupted upload of the same items resumes in
+            the same spreadsheet instead of creating a new one (unless that
+            spreadsheet was deleted or unshared since).
+        shortcuts: Write the compact shortcut sheet (one row per distinct
+            shortcut) instead of one row per menu item.
+        master_key: If given, replace the worksheet of ``app_name`` in this
+            existing spreadsheet (see ``write_master()``) instead of
+            creating a new one; ``progress_path`` is then not used.
+        sheet_ids_path: Cache of worksheet ids for ``write_master()``.
+
+    Returns:
+        URL of the created spreadsheet, or of the worksheet with
+        ``master_key``.
+    """
+    with timing.span("auth"):
+        gc = authorize(credentials_path, token_cache_path)
+    if master_key is not None:
+        with timing.span("upload"):
+            return write_master(
+                gc,
+                master_key,
+                [(app_name, _build_rows(items, shortcuts))],
+                sheet_ids_path,
+            )
+    resume_id = None
+    if progress_path is not None:
+        resume_id = resumable_spreadsheet(progress_path, _build_rows(items, shortcuts))
+    with timing.span("create"):
+        timing.count("api_calls")
+        sh = None if resume_id is None else open_existing(gc, resume_id)
+        if sh is None:
+            # Progress is tied to the spreadsheet id, so the upload restarts
+            sh = create_spreadsheet(gc, app_name)
+    with timing.span("upload"):
+        return write_rows(sh, items, progress_path, shortcuts)
+
+
+def write_incremental(
+    app_name: str,
+    items: List[MenuItem],
+    credentials_path: str,
+    state_dir: str,
+    token_cache_path: Optional[str] = None,
+) -> Tuple[str, MenuDiff]:
+    """Update the spreadsheet of the last export with only the changed rows.
+
+    The previous export (spreadsheet id and items) is kept in ``state_dir``.
+    Rows are matched by their ``levels`` path; removed rows are deleted,
+    added rows inserted in place and changed rows rewritten, using one
+    ``batch_update`` and one ``values_batch_update`` request. Without a
+    previous export, or when its spreadsheet was deleted or is no longer
+    shared, a new spreadsheet is created as in ``write_to_spreadsheet()``.
+
+    Returns:
+        (url, diff) of the updated spreadsheet.
+    """
+    with timing.span("auth"):
+        gc = authorize(credentials_path, token_cache_path)
+    state_path = os.path.join(state_dir, quote(app_name, safe="") + ".json")
+    state = read_json(state_path)
+
+    sh = None if state is None else open_existing(gc, state["spreadsheet_id"])
+    if state is None or sh is None:
+        sh = create_spreadsheet(gc, app_name)
+        write_rows(sh, items)
+        diff = diff_items([], items)
+    else:
+        old: List[MenuItem] = [(m, k, levels) for m, k, levels in state["items"]]
+        diff = diff_items(old, items)
+        ws = sh.sheet1
+        if not diff.in_order:
+            ws.clear()
+            ws.update(_build_rows(items), "A1")
+        elif not diff.is_empty():
+            _apply_diff(sh, ws, old, items, diff)
+
+    write_json(state_path, {"spreadsheet_id": sh.id, "items": [list(i) for i in items]})
+    return sh.url, diff
+
+
+def write_batch(
+    results: Sequence[Tuple[str, List[MenuItem]]],
+    credentials_path: str,
+    token_cache_path: Optional[str] = None,
+    master_key: Optional[str] = None,
+    sheet_ids_path: Optional[str] = None,
+) -> str:
+    """Write the menus of several apps to one new spreadsheet.
+
+    Every app gets its own worksheet, titled with the app name. Worksheets
+    and their rows are created with ``batch_update``: the default sheet
+    (id 0) is renamed and resized for the first app, one ``addSheet`` is
+    added per other app, and each sheet is filled by ``updateCells``. The
+    requests are sent in as few calls as the request size limit allows.
+
+    Args:
+        results: (app_name, items) per app, in worksheet order.
+        master_key: If given, replace the apps' worksheets in this existing
+            spreadsheet instead (see ``write_master()``).
+        sheet_ids_path: Cache of worksheet ids for ``write_master()``.
 
     Returns:
         URL of the created spreadsheet.
     """
+    if not results:
+        raise ValueError("no menus to write")
+    with timing.span("auth"):
+        gc = authorize(credentials_path, token_cache_path)
+    if master_key is not None:
+        sheets = [(app_name, _build_rows(items)) for app_name, items in results]
+        with timing.span("upload"):
+            return write_master(gc, master_key, sheets, sheet_ids_path)
+    with timing.span("create"):
+        sh = create_spreadsheet(gc, "menus")
+    timing.count("api_calls")
+    with timing.span("upload"):
+        _batch_update(sh, _batch_requests(results))
+    url: str = sh.url
+    return url
+
+
+def write_master(
+    gc: gspread.Client,
+    spreadsheet_key: str,
+    sheets: Sequence[Tuple[str, List[List[str]]]],
+    sheet_ids_path: Optional[str] = None,
+) -> str:
+    """Replace the worksheets of some apps in an existing spreadsheet.
+
+    Each app has a worksheet titled with its name. Worksheet ids are cached
+    per spreadsheet in ``sheet_ids_path``, so a run with known worksheets
+    opens the spreadsheet and sends ``batch_update`` requests that resize,
+    clear and fill every worksheet (one call unless they exceed the request
+    size limit). Otherwise the worksheets are listed first (one more call),
+    and missing ones are added by the same requests. A cached id that no
+    longer exists is refreshed the same way.
+
+    Args:
+        sheets: (app_name, rows) per app, rows including the header.
+
+    Returns:
+        URL of the first app's worksheet.
+    """
+    titles = _sheet_titles([app_name for app_name, _ in sheets])
+    cache: Dict[str, Any] = (
+        read_json(sheet_ids_path) if sheet_ids_path else None
+    ) or {}
+    sheet_ids: Dict[str, int] = cache.get(spreadsheet_key, {})
+    sh = gc.open_by_key(spreadsheet_key)
+    timing.count("api_calls")
+
+    written = False
+    if all(title in sheet_ids for title in titles):
+        try:
+            _replace_worksheets(sh, [sheet_ids[t] for t in titles], sheets)
+            written = True
+        except gspread.exceptions.APIError as e:
+            # 400: a worksheet was deleted since its id was cached
+            if e.response.status_code != 400:
+                raise
+    if not written:
+        timing.count("api_calls")
+        sheet_ids = {ws.title: ws.id for ws in sh.worksheets()}
+        requests: List[Dict[str, Any]] = []
+        for title in titles:
+            if title not in sheet_ids:
+                sheet_ids[title] = max(sheet_ids.values(), default=0) + 1
+                requests.append(
+                    {
+                        "addSheet": {
+                            "properties": {"sheetId": sheet_ids[title], "title": title}
+                        }
+                    }
+                )
+        _replace_worksheets(sh, [sheet_ids[t] for t in titles], sheets, requests)
+        if sheet_ids_path is not None:
+            cache[spreadsheet_key] = sheet_ids
+            write_json(sheet_ids_path, cache)
+
+    return f"{sh.url}#gid={sheet_ids[titles[0]]}"
+
+
+def _replace_worksheets(
+    sh: gspread.Spreadsheet,
+    ids: List[int],
+    sheets: Sequence[Tuple[str, List[List[str]]]],
+    requests: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """Resize, clear and fill worksheets with ``batch_update``."""
+    requests = list(requests or [])
+    for sheet_id, (_, rows) in zip(ids, sheets):
+        requests.append(
+            {
+                "updateSheetProperties": {
+                    "properties": {
+                        "sheetId": sheet_id,
+                        "gridProperties": {
+                            "rowCount": len(rows),
+                            "columnCount": len(rows[0]),
+                        },
+                    },
+                    "fields": "gridProperties.rowCount,gridProperties.columnCount",
+                }
+            }
+        )
+        requests.append(
+            {
+                "updateCells": {
+                    "range": {"sheetId": sheet_id},
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+        requests.extend(_update_cells(sheet_id, rows))
+    _batch_update(sh, requests)
+
+
+def authorize(
+    credentials_path: str, token_cache_path: Optional[str] = None
+) -> gspread.Client:
+    """Build an authorized gspread client from a service account key."""
     if not os.path.exists(credentials_path):
         raise FileNotFoundError(
             f"credentials.json が見つかりません: {credentials_path}"
         )
 
-    creds = Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
-    gc = gspread.authorize(creds)
+    if token_cache_path is not None:
+        creds = load_credentials(credentials_path, SCOPES, token_cache_path)
+    else:
+        creds = Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
+    return gspread.authorize(creds)
+
 
+def open_existing(
+    gc: gspread.Client, spreadsheet_id: str
+) -> Optional[gspread.Spreadsheet]:
+    """Open a spreadsheet written earlier, or None if it is gone.
+
+    Deleted spreadsheets (404) and ones no longer shared with the service
+    account (403) return None; other errors are raised.
+    """
+    try:
+        return gc.open_by_key(spreadsheet_id)
+    except gspread.exceptions.SpreadsheetNotFound:
+        return None
+    except gspread.exceptions.APIError as e:
+        if e.response.status_code in (403, 404):
+            return None
+        raise
+
+
+def create_spreadsheet(gc: gspread.Client, app_name: str) -> gspread.Spreadsheet:
+    """Create an empty spreadsheet titled ``{app_name}_{timestamp}``."""
     now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     title = f"{app_name}_{now}"
-    sh = gc.create(title)
+    return gc.create(title)
+
+
+def write_rows(
+    sh: gspread.Spreadsheet,
+    items: List[MenuItem],
+    progress_path: Optional[str] = None,
+    shortcuts: bool = False,
+) -> str:
+    """Write the header and one row per item to the first worksheet.
+
+    Rows that fit in one request are sent with a single ``update``; larger
+    payloads, or any upload with ``progress_path``, go through the chunked
+    uploader in ``sheet_upload``. With ``shortcuts`` the compact shortcut
+    layout of ``build_shortcut_rows()`` is written instead.
+
+    Returns:
+        URL of the spreadsheet.
+    """
+    rows = _build_rows(items, shortcuts)
+    if progress_path is None and len(plan_chunks(rows)) <= 1:
+        timing.count("api_calls")
+        sh.sheet1.update(rows, "A1")
+    else:
+        upload_rows(sh, rows, progress_path)
+    url: str = sh.url
+    return url
+
+
+def _build_header(items: List[MenuItem]) -> List[str]:
+    return build_header(max((len(item[2]) for item in items), default=1))
+
 
-    max_depth = max((len(item[2]) for item in items), default=1)
+def _build_row(item: MenuItem, width: int) -> List[str]:
+    modifier, key, levels = item
+    row = [modifier, key] + levels
+    row.extend([""] * (width - len(row)))
+    return row
 
-    header = ["修飾キー", "キー"]
-    for i in range(1, max_depth + 1):
-        header.append(f"Level {i}")
 
+def _build_rows(items: List[MenuItem], shortcuts: bool = False) -> List[List[str]]:
+    if shortcuts:
+        return build_shortcut_rows(items)
+    header = _build_header(items)
     rows = [header]
-    for modifier, key, levels in items:
-        row = [modifier, key] + levels
-        row.extend([""] * (len(header) - len(row)))
-        rows.append(row)
+    for item in items:
+        rows.append(_build_row(item, len(header)))
+    return rows
+
+
+def _batch_requests(
+    results: Sequence[Tuple[str, List[MenuItem]]],
+) -> List[Dict[str, Any]]:
+    requests: List[Dict[str, Any]] = []
+    titles = _sheet_titles([app_name for app_name, _ in results])
+    for sheet_id, (title, (_, items)) in enumerate(zip(titles, results)):
+        rows = _build_rows(items)
+        properties = {
+            "sheetId": sheet_id,
+            "title": title,
+            "gridProperties": {"rowCount": len(rows), "columnCount": len(rows[0])},
+        }
+        if sheet_id == 0:
+            requests.append(
+                {
+                    "updateSheetProperties": {
+                        "properties": properties,
+                        "fields": "title,gridProperties.rowCount,gridProperties.columnCount",
+                    }
+                }
+            )
+        else:
+            requests.append({"addSheet": {"properties": properties}})
+        requests.extend(_update_cells(sheet_id, rows))
+    return requests
+
+
+def _update_cells(sheet_id: int, rows: List[List[str]]) -> List[Dict[str, Any]]:
+    """``updateCells`` requests writing rows from A1 as plain strings.
+
+    Rows are split as by ``plan_chunks()``, so no request is larger than
+    one upload chunk.
+    """
+    cells = [
+        {"values": [{"userEnteredValue": {"stringValue": v}} if v else {} for v in row]}
+        for row in rows
+    ]
+    return [
+        {
+            "updateCells": {
+                "start": {"sheetId": sheet_id, "rowIndex": start, "columnIndex": 0},
+                "rows": cells[start:end],
+                "fields": "userEnteredValue",
+            }
+        }
+        for start, end in plan_chunks(cells)
+    ]
+
+
+def _batch_update(sh: gspread.Spreadsheet, requests: List[Dict[str, Any]]) -> None:
+    """Send requests in order, split into ``batch_update`` calls by size."""
+    for start, end in plan_chunks(requests):
+        timing.count("api_calls")
+        sh.batch_update({"requests": requests[start:end]})
+
+
+def _sheet_titles(app_names: List[str]) -> List[str]:
+    """Worksheet titles: app names cut to 100 characters and made unique."""
+    titles: List[str] = []
+    seen = set()
+    for name in app_names:
+        base = name[:100] or "Sheet"
+        title = base
+        n = 2
+        while title in seen:
+            suffix = f" ({n})"
+            title = base[: 100 - len(suffix)] + suffix
+            n += 1
+        seen.add(title)
+        titles.append(title)
+    return titles
+
+
+def _apply_diff(
+    sh: gspread.Spreadsheet,
+    ws: gspread.Worksheet,
+    old: List[MenuItem],
+    new: List[MenuItem],
+    diff: MenuDiff,
+) -> None:
+    """Delete, insert and rewrite rows in place (row 1 is the header)."""
+    requests: List[Dict[str, Any]] = []
+    # Deletes go bottom-up so earlier indices stay valid; inserts go
+    # top-down at their final position among the surviving rows.
+    for start, end in reversed(_runs(diff.removed)):
+        requests.append(
+            _dimension_request("deleteDimension", ws.id, start + 1, end + 1)
+        )
+    for start, end in _runs(diff.added):
+        requests.append(
+            _dimension_request("insertDimension", ws.id, start + 1, end + 1)
+        )
+    if requests:
+        sh.batch_update({"requests": requests})
+
+    header = _build_header(new)
+    old_width = len(_build_header(old))
+    width = len(header)
+    data = []
+    if header != _build_header(old):
+        header.extend([""] * (old_width - width))
+        data.append({"range": f"'{ws.title}'!A1", "values": [header]})
+    for i in sorted(diff.added + diff.changed):
+        data.append(
+            {"range": f"'{ws.title}'!A{i + 2}", "values": [_build_row(new[i], width)]}
+        )
+    if data:
+        sh.values_batch_update({"valueInputOption": "RAW", "data": data})
+
+
+def _runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted indices into half-open [start, end) runs."""
+    runs: List[Tuple[int, int]] = []
+    for i in indices:
+        if runs and runs[-1][1] == i:
+            runs[-1] = (runs[-1][0], i + 1)
+        else:
+            runs.append((i, i + 1))
+    return runs
 
-    ws = sh.sheet1
-    ws.update(rows, "A1")
 
-    return sh.url
+def _dimension_request(
+    kind: str, sheet_id: int, start: int, end: int
+) -> Dict[str, Any]:
+    request: Dict[str, Any] = {
+        "range": {
+            "sheetId": sheet_id,
+            "dimension": "ROWS",
+            "startIndex": start,
+            "endIndex": end,
+        }
+    }
+    if kind == "insertDimension":
+        request["inheritFromBefore"] = False
+    return {kind: request}
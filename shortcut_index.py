@@ -0,0 +1,310 @@
+"""Local SQLite index of extracted menu items and an Alfred Script Filter over it.
+
+Usage (Script Filter): python shortcut_index.py [--db PATH] QUERY...
+
+A query is either a shortcut (``cmd+shift+k``, ``⇧⌘K``) optionally
+followed by words, or words matched against app names and menu paths.
+Results are printed as Alfred Script Filter JSON.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Not imported at run time: the Script Filter should start in milliseconds
+    from menu_extractor import MenuItem
+
+DB_FILE = "shortcuts.db"
+DEFAULT_LIMIT = 50
+
+# Order of modifier names in decoded shortcuts (menu_extractor._build_modifier)
+MODIFIER_ORDER = ("Cmd", "Ctrl", "Shift", "Opt")
+
+# Query spellings of each modifier, lower-cased
+MODIFIER_ALIASES: Dict[str, str] = {
+    "cmd": "Cmd",
+    "command": "Cmd",
+    "⌘": "Cmd",
+    "ctrl": "Ctrl",
+    "control": "Ctrl",
+    "⌃": "Ctrl",
+    "shift": "Shift",
+    "⇧": "Shift",
+    "opt": "Opt",
+    "option": "Opt",
+    "alt": "Opt",
+    "⌥": "Opt",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    app TEXT NOT NULL,
+    modifier TEXT NOT NULL,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    levels TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_app ON items (app);
+CREATE INDEX IF NOT EXISTS items_shortcut ON items (modifier, key COLLATE NOCASE);
+"""
+
+# Trigram tokenizer: substring matches, which also work for Japanese
+# titles that the default tokenizer would treat as one word
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    app, path, content='items', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, app, path) VALUES (new.id, new.app, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, app, path) VALUES ('delete', old.id, old.app, old.path);
+END;
+"""
+
+
+class Hit(NamedTuple):
+    """One indexed menu item."""
+
+    app_name: str
+    modifier: str
+    key: str
+    levels: List[str]
+
+    @property
+    def shortcut(self) -> str:
+        if not self.key:
+            return ""
+        return f"{self.modifier}+{self.key}" if self.modifier else self.key
+
+
+class ShortcutIndex:
+    """Menu items of every extracted app, searchable by shortcut and path.
+
+    ``update()`` replaces the rows of one app, and does nothing when the
+    items are the same as last time. Paths are searched with FTS5 (trigram
+    tokenizer) where SQLite provides it; words shorter than three
+    characters, and every word on an SQLite without FTS5 trigrams, fall
+    back to ``LIKE``. Shortcuts are looked up through an index on
+    ``(modifier, key)``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "ShortcutIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def update(self, app_name: str, items: List["MenuItem"]) -> bool:
+        """Replace the rows of ``app_name``; False if they were unchanged."""
+        data = json.dumps(
+            [list(item) for item in items], ensure_ascii=False, separators=(",", ":")
+        )
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        row = self._db.execute(
+            "SELECT digest FROM apps WHERE name = ?", (app_name,)
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            return False
+        with self._db:
+            self._db.execute("DELETE FROM items WHERE app = ?", (app_name,))
+            self._db.executemany(
+                "INSERT INTO items (app, modifier, key, path, levels) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        app_name,
+                        m,
+                        k,
+                        " > ".join(levels),
+                        json.dumps(levels, ensure_ascii=False),
+                    )
+                    for m, k, levels in items
+                ],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO apps (name, digest, updated) VALUES (?, ?, ?)",
+                (app_name, digest, time.time()),
+            )
+        return True
+
+    def remove(self, app_name: str) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM items WHERE app = ?", (app_name,))
+            self._db.execute("DELETE FROM apps WHERE name = ?", (app_name,))
+
+    def apps(self) -> List[str]:
+        return [
+            name for name, in self._db.execute("SELECT name FROM apps ORDER BY name")
+        ]
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Hit]:
+        """Items matching a query; see the module docstring."""
+        words = query.split()
+        shortcut = parse_shortcut(words[0]) if words else None
+        if shortcut is None and len(words) >= 2:
+            # "cmd shift k" as separate words
+            shortcut = parse_shortcut("+".join(words))
+            if shortcut is not None:
+                words = []
+        elif shortcut is not None:
+            words = words[1:]
+
+        where: List[str] = []
+        params: List[Any] = []
+        source = "items"
+        if shortcut is not None:
+            where.append("items.modifier = ? AND items.key = ? COLLATE NOCASE")
+            params.extend(shortcut)
+        fts_words = [w for w in words if self.fts and len(w) >= 3]
+        if fts_words:
+            source = "items_fts JOIN items ON items.id = items_fts.rowid"
+            where.append("items_fts MATCH ?")
+            params.append(
+                " AND ".join('"' + w.replace('"', '""') + '"' for w in fts_words)
+            )
+        for w in words:
+            if w not in fts_words:
+                where.append("(items.app || ' ' || items.path) LIKE ? ESCAPE '\\'")
+                params.append(
+                    "%"
+                    + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                    + "%"
+                )
+        if not where:
+            return []
+
+        # Unordered, so the scan stops after ``limit`` matches; ranking every
+        # match of a common word costs more than the lookup itself
+        sql = (
+            f"SELECT items.app, items.modifier, items.key, items.levels FROM {source}"
+            f" WHERE {' AND '.join(where)} LIMIT ?"
+        )
+        rows = self._db.execute(sql, (*params, limit)).fetchall()
+        return [Hit(app, m, k, json.loads(levels)) for app, m, k, levels in rows]
+
+
+def parse_shortcut(text: str) -> Optional[Tuple[str, str]]:
+    """(modifier, key) for ``cmd+shift+k`` or ``⇧⌘K``, or None if not a shortcut.
+
+    The modifier is spelled as decoded by ``menu_extractor`` (``Cmd+Shift``);
+    a shortcut needs at least one modifier and exactly one key. A trailing
+    ``+`` is the ``+`` key itself (``cmd++``, ``cmd+``, ``⌘+``).
+    """
+    if len(text) > 1 and text.endswith("+"):
+        key = "+"
+        body = text[:-1]
+        if body.endswith("+"):
+            body = body[:-1]
+        mods = _split_modifiers(body)
+    elif "+" in text:
+        *mods, key = text.split("+")
+    else:
+        # Symbol form: modifier glyphs followed by the key
+        i = 0
+        while i < len(text) and text[i] in MODIFIER_ALIASES:
+            i += 1
+        mods, key = list(text[:i]), text[i:]
+    names = set()
+    for mod in mods:
+        name = MODIFIER_ALIASES.get(mod.lower())
+        if name is None:
+            return None
+        names.add(name)
+    if not names or not key or key.lower() in MODIFIER_ALIASES:
+        return None
+    # Without Cmd the extractor still spells the remaining modifiers
+    modifier = "+".join(m for m in MODIFIER_ORDER if m in names)
+    return modifier, key.upper() if len(key) == 1 else key
+
+
+def _split_modifiers(text: str) -> List[str]:
+    """Modifier names of ``cmd+shift``, ``cmd`` or ``⇧⌘``."""
+    if "+" in text or text.lower() in MODIFIER_ALIASES:
+        return text.split("+")
+    return list(text)
+
+
+def alfred_items(hits: List[Hit]) -> Dict[str, Any]:
+    """Alfred Script Filter JSON for search results."""
+    items = []
+    for hit in hits:
+        path = " > ".join(hit.levels)
+        subtitle = f"{hit.app_name}  {hit.shortcut}" if hit.shortcut else hit.app_name
+        items.append(
+            {
+                "uid": f"{hit.app_name}/{path}",
+                "title": path,
+                "subtitle": subtitle,
+                "arg": hit.shortcut or path,
+                "text": {
+                    "copy": f"{hit.app_name}: {path} {hit.shortcut}".rstrip(),
+                    "largetype": hit.shortcut or path,
+                },
+            }
+        )
+    return {"items": items}
+
+
+def _message(title: str, subtitle: str = "") -> Dict[str, Any]:
+    return {"items": [{"title": title, "subtitle": subtitle, "valid": False}]}
+
+
+def default_path() -> str:
+    """Index file in the workflow data directory (see ``main.workflow_data_dir()``)."""
+    data_dir = os.environ.get("alfred_workflow_data") or os.path.expanduser(
+        "~/Library/Application Support/Alfred/Workflow Data/com.hirshim.alfred-menu-list"
+    )
+    return os.path.join(data_dir, DB_FILE)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("query", nargs="*")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+    path = args.db or default_path()
+    query = " ".join(args.query).strip()
+
+    if not os.path.exists(path):
+        result = _message("インデックスがありません", "先にメニューを取得してください")
+    elif not query:
+        result = _message(
+            "ショートカットまたはメニュー名で検索", "例: cmd+shift+k / ⇧⌘K / 書き出す"
+        )
+    else:
+        with ShortcutIndex(path) as index:
+            hits = index.search(query, args.limit)
+        result = alfred_items(hits) if hits else _message("見つかりません", query)
+    json.dump(result, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Tests for atomic_file module."""
+
+import os
+import stat
+from pathlib import Path
+
+from atomic_file import read_json, write_bytes, write_json
+
+
+class TestWriteJson:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "a" / "b" / "state.json")
+        write_json(path, {"app": "メモ", "items": [1, 2]})
+
+        assert read_json(path) == {"app": "メモ", "items": [1, 2]}
+        assert Path(path).read_text(encoding="utf-8") == '{"app":"メモ","items":[1,2]}'
+        assert os.listdir(tmp_path / "a" / "b") == ["state.json"]
+
+    def test_replaces_existing_file(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "state.json")
+        write_json(path, [1])
+        write_json(path, [2])
+        assert read_json(path) == [2]
+
+    def test_mode(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "token.json")
+        write_json(path, {}, 0o600)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+class TestWriteBytes:
+    def test_creates_directories(self, tmp_path: Path) -> None:
+        path = tmp_path / "chunks" / "ab" / "abcdef"
+        write_bytes(str(path), b"\x00data")
+        assert path.read_bytes() == b"\x00data"
+        assert not (tmp_path / "chunks" / "ab" / "abcdef.tmp").exists()
+
+
+class TestReadJson:
+    def test_missing_or_broken(self, tmp_path: Path) -> None:
+        assert read_json(str(tmp_path / "missing.json")) is None
+        (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+        assert read_json(str(tmp_path / "broken.json")) is None
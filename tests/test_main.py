@@ -1,14 +1,35 @@
 """Tests for main module."""
 
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
 from unittest.mock import MagicMock, patch
 
+import pytest
+
+from menu_diff import MenuDiff
 from menu_extractor import (
     AccessibilityError,
+    AppMenus,
+    ExtractionTimeoutError,
     MenuBarNotFoundError,
     MenuExtractionError,
+    MenuFilter,
+    MenuItem,
+    PartialMenus,
 )
 
 
+@pytest.fixture(autouse=True)
+def _workflow_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep files written by a run (such as snapshots) out of the real data directory."""
+    monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+
+
 class TestMain:
     @patch("main.notify")
     @patch("main.os.path.exists", return_value=False)
@@ -41,6 +62,82 @@ class TestMain:
             "Safari のメニューをスプレッドシートに書き込みました"
         )
 
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet", return_value="https://example.com")
+    @patch("main.extract_menus", return_value=("Safari", [("Cmd", "N", ["ファイル"])]))
+    @patch("main.os.path.exists", return_value=True)
+    def test_cache_variables(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("cache_ttl", "3600")
+        monkeypatch.setenv("force_refresh", "1")
+        main()
+
+        kwargs = mock_extract.call_args.kwargs
+        assert kwargs["force_refresh"] is True
+        assert mock_write.call_args[0][3] == str(tmp_path / "token_cache.json")
+        assert mock_write.call_args[0][4] == str(tmp_path / "uploads" / "Safari.json")
+        assert kwargs["cache"].ttl == 3600
+        assert kwargs["cache"].directory == str(tmp_path / "menu_cache")
+
+    @patch("main.notify")
+    @patch("main.write_incremental")
+    @patch("main.extract_menus", return_value=("Safari", [("Cmd", "N", ["ファイル"])]))
+    @patch("main.os.path.exists", return_value=True)
+    def test_incremental(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("incremental", "1")
+        mock_write.return_value = (
+            "https://example.com",
+            MenuDiff([0], [1, 2], [], True),
+        )
+        main()
+
+        assert mock_write.call_args[0][3] == str(tmp_path / "exports")
+        mock_notify.assert_called_once_with(
+            "Safari のメニューを更新しました（追加 1 / 削除 2 / 変更 0）"
+        )
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet", return_value="https://example.com")
+    @patch("main.extract_menus", return_value=("Safari", [("Cmd", "N", ["ファイル"])]))
+    @patch("main.os.path.exists", return_value=True)
+    def test_cache_disabled(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("menu_cache", "0")
+        monkeypatch.setenv("token_cache", "0")
+        main()
+
+        assert mock_extract.call_args.kwargs["cache"] is None
+        assert mock_write.call_args[0][3] is None
+
     @patch("main.notify")
     @patch(
         "main.extract_menus",
@@ -104,9 +201,7 @@ class TestMain:
         from main import main
 
         main()
-        mock_notify.assert_called_once_with(
-            "アクセシビリティ権限を許可してください"
-        )
+        mock_notify.assert_called_once_with("アクセシビリティ権限を許可してください")
 
     @patch("main.notify")
     @patch(
@@ -131,3 +226,867 @@ class TestMain:
         mock_notify.assert_called_once_with(
             "スプレッドシートへの書き込みに失敗しました"
         )
+
+
+class TestLocalExport:
+    @patch("main.notify")
+    @patch(
+        "main.iter_menus",
+        return_value=("Safari", iter([("Cmd", "N", ["ファイル", "新規"])])),
+    )
+    def test_keyword_argument(
+        self,
+        mock_iter: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        main(export_format="csv")
+        files = os.listdir(tmp_path / "menus")
+        assert len(files) == 1 and files[0].endswith(".csv")
+        mock_notify.assert_called_once_with(
+            f"Safari のメニューを {files[0]} に書き出しました"
+        )
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch(
+        "main.iter_menus", return_value=("Safari", iter([("Cmd", "N", ["ファイル"])]))
+    )
+    @patch("main.os.path.exists", return_value=False)
+    def test_workflow_variable_skips_credentials(
+        self,
+        mock_exists: MagicMock,
+        mock_iter: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("export_format", "XLSX")
+        main()
+        assert os.listdir(tmp_path / "menus")[0].endswith(".xlsx")
+        mock_write.assert_not_called()
+
+    @patch("main.notify")
+    @patch("main.iter_menus", return_value=("Safari", iter([])))
+    def test_no_items(
+        self,
+        mock_iter: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        main(export_format="tsv")
+        assert os.listdir(tmp_path / "menus") == []
+        mock_notify.assert_called_once_with("メニュー項目が見つかりません: Safari")
+
+    @patch("main.notify")
+    @patch("main.iter_menus")
+    def test_unknown_format(self, mock_iter: MagicMock, mock_notify: MagicMock) -> None:
+        from main import main
+
+        main(export_format="pdf")
+        mock_iter.assert_not_called()
+        mock_notify.assert_called_once_with("未対応の書き出し形式です: pdf")
+
+    @patch("main.notify")
+    @patch(
+        "main.iter_menus",
+        side_effect=AccessibilityError("not allowed assistive access"),
+    )
+    def test_extraction_error(
+        self, mock_iter: MagicMock, mock_notify: MagicMock
+    ) -> None:
+        from main import main
+
+        main(export_format="csv")
+        mock_notify.assert_called_once_with("アクセシビリティ権限を許可してください")
+
+    @patch("main.notify")
+    @patch("main.export_items", side_effect=PermissionError("read-only"))
+    @patch("main.iter_menus", return_value=("Safari", iter([])))
+    def test_write_error(
+        self, mock_iter: MagicMock, mock_export: MagicMock, mock_notify: MagicMock
+    ) -> None:
+        from main import main
+
+        main(export_format="csv")
+        mock_notify.assert_called_once_with("ファイルの書き出しに失敗しました")
+
+
+class TestBatch:
+    @patch("main.notify")
+    @patch("main.write_batch", return_value="https://example.com")
+    @patch("main.extract_apps")
+    @patch("main.os.path.exists", return_value=True)
+    def test_writes_successful_apps(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        items: list = [("Cmd", "N", ["ファイル"])]
+        mock_extract.return_value = [
+            AppMenus("Safari", items, 1.25, None),
+            AppMenus("Finder", [], 0.5, MenuBarNotFoundError("no menu bar")),
+            AppMenus("Dock", [], 0.1, None),
+        ]
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("batch_apps", "Safari, Finder\nDock")
+        monkeypatch.setenv("batch_workers", "2")
+        main()
+
+        mock_extract.assert_called_once_with(
+            ["Safari", "Finder", "Dock"], max_workers=2, menu_filter=MenuFilter()
+        )
+        assert mock_write.call_args[0][0] == [("Safari", items)]
+        mock_notify.assert_called_once_with(
+            "1 個のアプリのメニューを書き込みました（失敗 1）"
+        )
+        report = json.loads(
+            (tmp_path / "batch_report.json").read_text(encoding="utf-8")
+        )
+        assert report["spreadsheet"] == "https://example.com"
+        assert report["failed"] == 1
+        assert report["apps"][0] == {
+            "app": "Safari",
+            "items": 1,
+            "seconds": 1.25,
+            "error": None,
+        }
+        assert report["apps"][1]["error"] == "no menu bar"
+
+    @patch("main.notify")
+    @patch("main.write_batch")
+    @patch(
+        "main.extract_apps",
+        return_value=[AppMenus("Finder", [], 0.5, MenuExtractionError("x"))],
+    )
+    @patch("main.os.path.exists", return_value=True)
+    def test_all_running_apps_failed(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("batch_apps", "all")
+        main()
+
+        assert mock_extract.call_args[0][0] is None
+        mock_write.assert_not_called()
+        mock_notify.assert_called_once_with(
+            "メニューを取得できたアプリがありません（失敗 1）"
+        )
+
+
+class TestMenuFilter:
+    def test_defaults(self) -> None:
+        from main import menu_filter
+
+        assert menu_filter() == MenuFilter()
+
+    def test_variables(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from main import menu_filter
+
+        monkeypatch.setenv("include_menus", "ファイル, 編集")
+        monkeypatch.setenv("exclude_menus", "ヘルプ")
+        monkeypatch.setenv("skip_menus", "最近*\nServices")
+        monkeypatch.setenv("max_depth", "3")
+        monkeypatch.setenv("shortcuts_only", "1")
+        assert menu_filter() == MenuFilter(
+            include=("ファイル", "編集"),
+            exclude=("ヘルプ",),
+            max_depth=3,
+            skip=("最近*", "Services"),
+            shortcuts_only=True,
+        )
+
+    @pytest.mark.parametrize("value, expected", [("0", None), ("1", 2), ("x", None)])
+    def test_max_depth(
+        self, monkeypatch: pytest.MonkeyPatch, value: str, expected: object
+    ) -> None:
+        from main import menu_filter
+
+        monkeypatch.setenv("max_depth", value)
+        assert menu_filter().max_depth == expected
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.extract_menus", return_value=("Safari", [("Cmd", "N", ["ファイル"])]))
+    @patch("main.os.path.exists", return_value=True)
+    def test_passed_to_extract_menus(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("exclude_menus", "ヘルプ")
+        main()
+        assert mock_extract.call_args.kwargs["menu_filter"] == MenuFilter(
+            exclude=("ヘルプ",)
+        )
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.extract_menus", return_value=("Safari", [("Cmd", "N", ["ファイル"])]))
+    @patch("main.os.path.exists", return_value=True)
+    def test_shortcut_sheet(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("shortcuts_only", "1")
+        main()
+        assert mock_extract.call_args.kwargs["menu_filter"].shortcuts_only is True
+        assert mock_write.call_args[0][5] is True
+
+    @patch("main.notify")
+    @patch(
+        "main.iter_menus", return_value=("Safari", iter([("Cmd", "N", ["ファイル"])]))
+    )
+    def test_passed_to_local_export(
+        self,
+        mock_iter: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("max_depth", "2")
+        main(export_format="csv")
+        mock_iter.assert_called_once_with(menu_filter=MenuFilter(max_depth=2))
+
+
+class TestPartialExtraction:
+    ITEMS: list = [("Cmd", "N", ["ファイル", "新規"]), ("", "", ["表示", "ツールバー"])]
+
+    @pytest.fixture(autouse=True)
+    def _env(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        monkeypatch.setenv("partial_extraction", "1")
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.extract_menus_partial")
+    @patch("main.os.path.exists", return_value=True)
+    def test_timeout_writes_and_saves_partial(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("extract_timeout", "30")
+        mock_extract.return_value = PartialMenus(
+            "Safari", self.ITEMS, ["ファイル"], False
+        )
+        main()
+
+        assert mock_extract.call_args[0][0] == 30
+        assert mock_extract.call_args.kwargs["resume"] is None
+        assert mock_write.call_args[0][1] == self.ITEMS
+        mock_notify.assert_called_once_with(
+            "Safari のメニューを途中まで書き込みました（完了 1 メニュー、再実行で続きを取得します）"
+        )
+        saved = json.loads((tmp_path / "partial.json").read_text(encoding="utf-8"))
+        assert saved["completed"] == ["ファイル"]
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.get_frontmost_app", return_value="Safari")
+    @patch("main.extract_menus_partial")
+    def test_resumes_same_app(
+        self,
+        mock_extract: MagicMock,
+        mock_front: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        from main import extract_partial, menu_filter, save_partial
+
+        earlier = PartialMenus("Safari", self.ITEMS, ["ファイル"], False)
+        save_partial(str(tmp_path / "partial.json"), earlier)
+        mock_extract.return_value = PartialMenus(
+            "Safari", self.ITEMS, ["ファイル", "表示"], True
+        )
+
+        assert extract_partial(menu_filter()).complete
+        assert mock_extract.call_args.kwargs["resume"] == earlier
+        assert not (tmp_path / "partial.json").exists()
+
+    @patch("main.get_frontmost_app", return_value="Finder")
+    @patch("main.extract_menus_partial")
+    def test_other_app_starts_over(
+        self, mock_extract: MagicMock, mock_front: MagicMock, tmp_path: Path
+    ) -> None:
+        from main import extract_partial, menu_filter, save_partial
+
+        save_partial(
+            str(tmp_path / "partial.json"), PartialMenus("Safari", [], [], False)
+        )
+        mock_extract.return_value = PartialMenus("Finder", [], [], True)
+        extract_partial(menu_filter())
+        assert mock_extract.call_args.kwargs["resume"] is None
+
+    def test_corrupt_file_is_ignored(self, tmp_path: Path) -> None:
+        from main import load_partial
+
+        (tmp_path / "partial.json").write_text("{")
+        assert load_partial(str(tmp_path / "partial.json")) is None
+
+    @patch("main.notify")
+    @patch("main.extract_menus", side_effect=ExtractionTimeoutError("timeout"))
+    @patch("main.os.path.exists", return_value=True)
+    def test_timeout_without_partial(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_notify: MagicMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.delenv("partial_extraction")
+        main()
+        mock_notify.assert_called_once_with("メニュー取得がタイムアウトしました")
+
+
+class TestSnapshots:
+    ITEMS: list = [("Cmd", "N", ["ファイル", "新規"]), ("", "", ["表示", "ツールバー"])]
+
+    @patch("main.get_app_identity", return_value=("Safari", "com.apple.Safari", "18.0"))
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.extract_menus")
+    def test_saved_after_extraction(
+        self,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        mock_identity: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import run, snapshot_store
+
+        monkeypatch.setenv("snapshot_keep", "2")
+        (tmp_path / "credentials.json").touch()
+        mock_extract.side_effect = [
+            ("Safari", self.ITEMS[:1]),
+            ("Safari", self.ITEMS),
+            ("Safari", self.ITEMS),
+        ]
+        with patch("main.os.path.abspath", return_value=str(tmp_path / "main.py")):
+            for _ in range(3):
+                run()
+
+        store = snapshot_store()
+        assert store is not None
+        snapshots = store.list("Safari")
+        # The unchanged third run adds nothing
+        assert len(snapshots) == 2
+        assert store.items(snapshots[0]) == self.ITEMS[:1]
+        assert store.items(snapshots[-1]) == self.ITEMS
+        assert (snapshots[-1].bundle_id, snapshots[-1].version) == (
+            "com.apple.Safari",
+            "18.0",
+        )
+        # One identity lookup per run, shared with the menu cache
+        assert mock_identity.call_count == 3
+        assert mock_extract.call_args.kwargs["identity"] == (
+            "Safari",
+            "com.apple.Safari",
+            "18.0",
+        )
+
+    def test_saved_without_identity(self) -> None:
+        from main import save_snapshot, snapshot_store
+
+        save_snapshot("Safari", self.ITEMS)
+
+        store = snapshot_store()
+        assert store is not None
+        snapshot = store.list("Safari")[0]
+        assert (snapshot.bundle_id, snapshot.version) == ("", "")
+
+    @patch("main.extract_menus_partial")
+    @patch("main.get_frontmost_app", return_value="Safari")
+    def test_incomplete_result_is_not_saved(
+        self, mock_front: MagicMock, mock_extract: MagicMock, tmp_path: Path
+    ) -> None:
+        from main import extract_partial, menu_filter, save_snapshot, snapshot_store
+
+        mock_extract.return_value = PartialMenus(
+            "Safari", self.ITEMS, ["ファイル"], False
+        )
+        extract_partial(menu_filter())
+        save_snapshot("Finder", [])
+
+        store = snapshot_store()
+        assert store is not None and store.list() == []
+
+    @patch("main.write_batch", return_value="https://example.com")
+    @patch("main.extract_apps")
+    def test_batch_saves_each_app(
+        self, mock_extract: MagicMock, mock_write: MagicMock, tmp_path: Path
+    ) -> None:
+        from main import export_batch, snapshot_store
+
+        mock_extract.return_value = [
+            AppMenus("Safari", self.ITEMS, 1.0, None, "com.apple.Safari", "18.0"),
+            AppMenus("Finder", [], 0.5, MenuBarNotFoundError("no menu bar")),
+        ]
+        export_batch(["Safari", "Finder"], "credentials.json")
+
+        store = snapshot_store()
+        assert store is not None and store.apps() == ["Safari"]
+        assert store.list()[0].version == "18.0"
+
+    def test_disabled(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from main import save_snapshot, snapshot_store
+
+        monkeypatch.setenv("snapshots", "0")
+        assert snapshot_store() is None
+        save_snapshot("Safari", self.ITEMS)
+
+    @patch("main.SnapshotStore.put", side_effect=OSError("disk full"))
+    def test_write_error_is_ignored(self, mock_put: MagicMock) -> None:
+        from main import save_snapshot
+
+        save_snapshot("Safari", self.ITEMS)
+        mock_put.assert_called_once()
+
+
+class TestMasterSpreadsheet:
+    ITEMS: list = [("Cmd", "N", ["ファイル", "新規"])]
+
+    @patch("main.notify")
+    @patch("main.write_incremental")
+    @patch("main.write_to_spreadsheet", return_value="https://example.com#gid=1")
+    @patch("main.extract_menus")
+    @patch("main.os.path.exists", return_value=True)
+    def test_passes_key_and_skips_progress(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_incremental: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import main
+
+        monkeypatch.setenv("master_spreadsheet", " abc123 ")
+        monkeypatch.setenv("incremental", "1")
+        mock_extract.return_value = ("Safari", self.ITEMS)
+        main()
+
+        mock_incremental.assert_not_called()
+        args = mock_write.call_args[0]
+        assert args[4] is None
+        assert args[6:] == ("abc123", str(tmp_path / "master_sheets.json"))
+
+    @patch("main.write_batch", return_value="https://example.com")
+    @patch("main.extract_apps")
+    def test_batch(
+        self,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        from main import export_batch
+
+        monkeypatch.setenv("master_spreadsheet", "abc123")
+        mock_extract.return_value = [AppMenus("Safari", self.ITEMS, 1.0, None)]
+        export_batch(["Safari"], "credentials.json")
+
+        assert mock_write.call_args[0][3:] == (
+            "abc123",
+            str(tmp_path / "master_sheets.json"),
+        )
+
+    def test_unset(self) -> None:
+        from main import master_spreadsheet
+
+        assert master_spreadsheet() is None
+
+
+class TestShortcutIndex:
+    ITEMS: list = [("Cmd", "N", ["ファイル", "新規"]), ("", "", ["表示", "ツールバー"])]
+
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet")
+    @patch("main.extract_menus")
+    @patch("main.os.path.exists", return_value=True)
+    def test_updated_after_extraction(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        from main import main
+        from shortcut_index import ShortcutIndex
+
+        mock_extract.return_value = ("Safari", self.ITEMS)
+        main()
+
+        with ShortcutIndex(str(tmp_path / "shortcuts.db")) as index:
+            assert index.search("cmd+n")[0].levels == ["ファイル", "新規"]
+
+    @pytest.mark.parametrize(
+        "selection, indexed",
+        [
+            (MenuFilter(), True),
+            (MenuFilter(shortcuts_only=True), False),
+            (MenuFilter(exclude=("ヘルプ",)), False),
+            (MenuFilter(max_depth=2), False),
+        ],
+    )
+    def test_filtered_extractions_are_not_indexed(
+        self, tmp_path: Path, selection: MenuFilter, indexed: bool
+    ) -> None:
+        from main import update_shortcut_index
+
+        update_shortcut_index("Safari", self.ITEMS, selection)
+        assert (tmp_path / "shortcuts.db").exists() is indexed
+
+    def test_disabled(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        from main import update_shortcut_index
+
+        monkeypatch.setenv("shortcut_index", "0")
+        update_shortcut_index("Safari", self.ITEMS)
+        assert not (tmp_path / "shortcuts.db").exists()
+
+    def test_errors_are_ignored(self, tmp_path: Path) -> None:
+        from main import update_shortcut_index
+
+        (tmp_path / "shortcuts.db").write_text("not a database")
+        update_shortcut_index("Safari", self.ITEMS)
+
+
+class TestScriptCache:
+    @patch("main.subprocess.run")
+    def test_notify_passes_message_as_arguments(self, mock_run: MagicMock) -> None:
+        from main import NOTIFY_SCRIPT, notify
+
+        notify('"引用" \\ 付き', title="タイトル")
+        mock_run.assert_called_once_with(
+            ["osascript", "-e", NOTIFY_SCRIPT, '"引用" \\ 付き', "タイトル"], timeout=10
+        )
+
+    @pytest.mark.parametrize("value, enabled", [("", True), ("0", False)])
+    def test_enabled_during_run(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path, value: str, enabled: bool
+    ) -> None:
+        import script_cache
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_cache", str(tmp_path))
+        monkeypatch.setenv("script_cache", value)
+        seen = []
+        with patch("main.run", side_effect=lambda _: seen.append(script_cache._active)):
+            main()
+        if enabled:
+            assert seen[0] is not None and seen[0].directory == str(
+                tmp_path / "scripts"
+            )
+        else:
+            assert seen == [None]
+        assert script_cache._active is None
+
+
+class TestHelper:
+    def test_enabled_during_run(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        import menu_extractor
+        from main import BUNDLE_ID, main
+
+        monkeypatch.setenv("helper", "1")
+        monkeypatch.setenv("helper_idle", "60")
+        monkeypatch.setenv("TMPDIR", str(tmp_path))
+        seen = []
+        with patch(
+            "main.run", side_effect=lambda _: seen.append(menu_extractor._helper)
+        ):
+            main()
+        client = seen[0]
+        assert client.socket_path == str(tmp_path / f"{BUNDLE_ID}.helper.sock")
+        assert client.autostart and client.idle == 60
+        assert menu_extractor._helper is None
+
+    @patch("main.subprocess.run")
+    @patch(
+        "main.helper_request",
+        return_value={"returncode": 0, "stdout": "", "stderr": ""},
+    )
+    def test_notify_through_helper(
+        self, mock_request: MagicMock, mock_run: MagicMock
+    ) -> None:
+        from main import notify
+
+        notify("完了")
+        mock_request.assert_called_once_with(
+            {"op": "notify", "message": "完了", "title": "alfred-menu-list"}, 10
+        )
+        mock_run.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            None,
+            {"busy": True},
+            {"timeout": True},
+            {"returncode": 1, "stdout": "", "stderr": "error"},
+        ],
+    )
+    @patch("main.subprocess.run")
+    def test_notify_falls_back(
+        self, mock_run: MagicMock, response: Optional[Dict[str, Any]]
+    ) -> None:
+        import script_cache
+        from main import NOTIFY_SCRIPT, notify
+
+        with patch("main.helper_request", return_value=response):
+            notify("完了")
+        mock_run.assert_called_once_with(
+            script_cache.osascript_args(NOTIFY_SCRIPT, "完了", "alfred-menu-list"),
+            timeout=10,
+        )
+
+
+class TestProfile:
+    @patch("main.get_app_identity", return_value=("Safari", "com.apple.Safari", "18.0"))
+    @patch("main.notify")
+    @patch("main.write_to_spreadsheet", return_value="https://example.com")
+    @patch(
+        "main.extract_menus",
+        return_value=("Safari", [("Cmd", "N", ["ファイル", "新規"])]),
+    )
+    @patch("main.os.path.exists", return_value=True)
+    def test_report_and_summary(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+        mock_identity: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        import timing
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        monkeypatch.setenv("menu_cache", "0")
+        monkeypatch.setenv("profile", "1")
+        main()
+
+        assert timing.active() is None
+        message = mock_notify.call_args[0][0]
+        assert message.startswith(
+            "Safari のメニューをスプレッドシートに書き込みました\n合計 "
+        )
+        report = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+        assert set(report["spans"]) == {
+            "identity",
+            "extract",
+            "index",
+            "snapshot",
+            "write",
+        }
+        assert report["counters"] == {"items": 1, "max_depth": 2}
+
+    @patch("main.notify")
+    @patch("main.extract_menus", side_effect=MenuExtractionError("x"))
+    @patch("main.os.path.exists", return_value=True)
+    def test_errors_are_not_profiled(
+        self,
+        mock_exists: MagicMock,
+        mock_extract: MagicMock,
+        mock_notify: MagicMock,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        import timing
+        from main import main
+
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        main(profile=True)
+
+        assert timing.active() is None
+        mock_notify.assert_called_once_with("メニュー取得に失敗しました")
+        assert not (tmp_path / "profile.json").exists()
+
+
+class TestLazyWriterImport:
+    def test_import_main_does_not_load_gspread(self) -> None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, main; print('gspread' in sys.modules, 'sheet_writer' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            cwd=root,
+            check=True,
+        )
+        assert result.stdout.split() == ["False", "False"]
+
+    def test_preload_writer(self) -> None:
+        from main import preload_writer
+
+        preload_writer().join()
+        assert "sheet_writer" in sys.modules
+
+
+class TestPipelined:
+    ITEMS = [("Cmd", "N", ["ファイル", "新規"])]
+
+    @pytest.fixture(autouse=True)
+    def _env(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        monkeypatch.setenv("pipeline", "1")
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+
+    @patch("main.notify")
+    @patch("sheet_writer.write_rows")
+    @patch("sheet_writer.create_spreadsheet")
+    @patch("sheet_writer.authorize")
+    @patch("main.os.path.exists", return_value=True)
+    def test_auth_overlaps_extraction(
+        self,
+        mock_exists: MagicMock,
+        mock_auth: MagicMock,
+        mock_create: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+    ) -> None:
+        from main import main
+
+        authorized = threading.Event()
+        mock_auth.side_effect = lambda *args: authorized.set() or MagicMock()
+
+        def rows() -> Iterator[MenuItem]:
+            # The traversal is still running when authorization completes
+            assert authorized.wait(timeout=5)
+            yield from self.ITEMS
+
+        with patch("main.iter_menus", return_value=("Safari", rows())):
+            main()
+
+        assert mock_create.call_args[0][1] == "Safari"
+        mock_write.assert_called_once_with(
+            mock_create.return_value, self.ITEMS, shortcuts=False
+        )
+        mock_notify.assert_called_once_with(
+            "Safari のメニューをスプレッドシートに書き込みました"
+        )
+
+    @patch("main.notify")
+    @patch("sheet_writer.write_rows")
+    @patch("sheet_writer.create_spreadsheet")
+    @patch("sheet_writer.authorize")
+    @patch("main.os.path.exists", return_value=True)
+    def test_extraction_error_discards_sheet(
+        self,
+        mock_exists: MagicMock,
+        mock_auth: MagicMock,
+        mock_create: MagicMock,
+        mock_write: MagicMock,
+        mock_notify: MagicMock,
+    ) -> None:
+        from main import main
+
+        def rows() -> Iterator[MenuItem]:
+            raise MenuBarNotFoundError("no menu bar")
+            yield
+
+        with patch("main.iter_menus", return_value=("Safari", rows())):
+            main()
+
+        mock_notify.assert_called_once_with("メニューバーが見つかりません")
+        mock_auth.return_value.del_spreadsheet.assert_called_once_with(
+            mock_create.return_value.id
+        )
+        mock_write.assert_not_called()
+
+    @patch("main.notify")
+    @patch("sheet_writer.authorize", side_effect=Exception("auth failed"))
+    @patch("main.os.path.exists", return_value=True)
+    def test_auth_error(
+        self, mock_exists: MagicMock, mock_auth: MagicMock, mock_notify: MagicMock
+    ) -> None:
+        from main import main
+
+        with patch("main.iter_menus", return_value=("Safari", iter(self.ITEMS))):
+            main()
+
+        mock_notify.assert_called_once_with(
+            "スプレッドシートへの書き込みに失敗しました"
+        )
+
+    @patch("main.notify")
+    @patch("sheet_writer.create_spreadsheet")
+    @patch("sheet_writer.authorize")
+    @patch("main.os.path.exists", return_value=True)
+    def test_no_items(
+        self,
+        mock_exists: MagicMock,
+        mock_auth: MagicMock,
+        mock_create: MagicMock,
+        mock_notify: MagicMock,
+    ) -> None:
+        from main import main
+
+        with patch("main.iter_menus", return_value=("App", iter([]))):
+            main()
+
+        mock_notify.assert_called_once_with("メニュー項目が見つかりません: App")
+        mock_auth.return_value.del_spreadsheet.assert_called_once()
@@ -0,0 +1,149 @@
+"""Tests for menu_cache module."""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from menu_cache import INDEX_FILE, MenuCache
+from menu_extractor import MenuFilter, extract_menus
+
+ITEMS = [("Cmd", "N", ["ファイル", "新規"]), ("", "", ["表示", "ツールバーを表示"])]
+
+
+class TestMenuCache:
+    def test_roundtrip(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        key = MenuCache.make_key("com.apple.Safari", "17.0")
+        cache.put(key, "Safari", ITEMS)
+        assert cache.get(key) == ("Safari", ITEMS)
+
+    def test_key_includes_version(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put(MenuCache.make_key("com.apple.Safari", "17.0"), "Safari", ITEMS)
+        assert cache.get(MenuCache.make_key("com.apple.Safari", "17.1")) is None
+
+    def test_missing_directory(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path / "nonexistent"))
+        assert cache.get("x@1") is None
+
+    def test_ttl_expiry(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path), ttl=60)
+        with patch("menu_cache.time.time", return_value=1000.0):
+            cache.put("a@1", "A", ITEMS)
+        with patch("menu_cache.time.time", return_value=1059.0):
+            assert cache.get("a@1") == ("A", ITEMS)
+        with patch("menu_cache.time.time", return_value=1061.0):
+            assert cache.get("a@1") is None
+        assert list(tmp_path.glob("*.json")) == [tmp_path / INDEX_FILE]
+
+    def test_zero_ttl_never_expires(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path), ttl=0)
+        with patch("menu_cache.time.time", return_value=0.0):
+            cache.put("a@1", "A", ITEMS)
+        assert cache.get("a@1") == ("A", ITEMS)
+
+    def test_lru_eviction(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path), ttl=0, max_entries=2)
+        with patch("menu_cache.time.time", return_value=1.0):
+            cache.put("a@1", "A", ITEMS)
+        with patch("menu_cache.time.time", return_value=2.0):
+            cache.put("b@1", "B", ITEMS)
+        with patch("menu_cache.time.time", return_value=3.0):
+            cache.get("a@1")
+        with patch("menu_cache.time.time", return_value=4.0):
+            cache.put("c@1", "C", ITEMS)
+
+        assert cache.get("b@1") is None
+        assert cache.get("a@1") is not None
+        assert cache.get("c@1") is not None
+
+    def test_compact_json(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("a@1", "A", ITEMS)
+        entry = json.loads((tmp_path / INDEX_FILE).read_text())["a@1"]
+        text = (tmp_path / entry["file"]).read_text(encoding="utf-8")
+        assert " " not in text.replace("ツールバーを表示", "")
+        assert "ファイル" in text
+
+    def test_corrupt_entry_is_dropped(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("a@1", "A", ITEMS)
+        entry = json.loads((tmp_path / INDEX_FILE).read_text())["a@1"]
+        (tmp_path / entry["file"]).write_text("{")
+        assert cache.get("a@1") is None
+
+    def test_clear(self, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("a@1", "A", ITEMS)
+        cache.clear()
+        assert cache.get("a@1") is None
+
+
+class TestExtractMenusWithCache:
+    IDENTITY = MagicMock(
+        returncode=0, stdout="Safari\ncom.apple.Safari\n17.0\n", stderr=""
+    )
+    MENUS = MagicMock(
+        returncode=0, stdout="Safari\n0\tN\t\tファイル\t新規\n", stderr=""
+    )
+
+    @patch("menu_extractor.subprocess.run")
+    def test_miss_then_hit(self, mock_run: MagicMock, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        mock_run.side_effect = [self.IDENTITY, self.MENUS, self.IDENTITY]
+
+        first = extract_menus(cache=cache)
+        second = extract_menus(cache=cache)
+
+        assert first == second == ("Safari", [("Cmd", "N", ["ファイル", "新規"])])
+        # identity, traversal, identity: the second call never walks the menus
+        assert mock_run.call_count == 3
+
+    @patch("menu_extractor.subprocess.run")
+    def test_known_identity_is_not_read_again(
+        self, mock_run: MagicMock, tmp_path: Path
+    ) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("com.apple.Safari@17.0", "Safari", ITEMS)
+
+        assert extract_menus(
+            cache=cache, identity=("Safari", "com.apple.Safari", "17.0")
+        ) == ("Safari", ITEMS)
+        mock_run.assert_not_called()
+
+    @patch("menu_extractor.subprocess.run")
+    def test_force_refresh(self, mock_run: MagicMock, tmp_path: Path) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("com.apple.Safari@17.0", "Safari", [])
+        mock_run.side_effect = [self.IDENTITY, self.MENUS]
+
+        _, items = extract_menus(cache=cache, force_refresh=True)
+
+        assert items == [("Cmd", "N", ["ファイル", "新規"])]
+        assert cache.get("com.apple.Safari@17.0") == ("Safari", items)
+
+    @patch("menu_extractor.subprocess.run")
+    def test_traversal_targets_identified_app(
+        self, mock_run: MagicMock, tmp_path: Path
+    ) -> None:
+        mock_run.side_effect = [self.IDENTITY, self.MENUS]
+        extract_menus(cache=MenuCache(str(tmp_path)))
+        script = mock_run.call_args_list[1][0][0][2]
+        assert 'set frontApp to "Safari"' in script
+
+    @patch("menu_extractor.subprocess.run")
+    def test_filtered_result_has_own_key(
+        self, mock_run: MagicMock, tmp_path: Path
+    ) -> None:
+        cache = MenuCache(str(tmp_path))
+        cache.put("com.apple.Safari@17.0", "Safari", ITEMS)
+        mock_run.side_effect = [self.IDENTITY, self.MENUS, self.IDENTITY]
+        menu_filter = MenuFilter(max_depth=2)
+
+        first = extract_menus(cache=cache, menu_filter=menu_filter)
+        second = extract_menus(cache=cache, menu_filter=menu_filter)
+
+        assert first == second == ("Safari", [("Cmd", "N", ["ファイル", "新規"])])
+        assert cache.get("com.apple.Safari@17.0") == ("Safari", ITEMS)
+        assert MenuFilter().cache_suffix() == ""
+        assert menu_filter.cache_suffix() != MenuFilter(max_depth=3).cache_suffix()
@@ -0,0 +1,44 @@
+"""Tests for menu_diff module."""
+
+from menu_diff import diff_items, item_keys
+
+OLD = [
+    ("Cmd", "N", ["ファイル", "新規"]),
+    ("Cmd", "O", ["ファイル", "開く"]),
+    ("", "", ["編集", "コピー"]),
+]
+
+
+class TestDiffItems:
+    def test_identical(self) -> None:
+        diff = diff_items(OLD, list(OLD))
+        assert diff.is_empty()
+        assert diff.in_order
+
+    def test_added_removed_changed(self) -> None:
+        new = [
+            ("Cmd", "N", ["ファイル", "新規"]),
+            ("Cmd+Shift", "O", ["ファイル", "開く"]),
+            ("Cmd", "P", ["ファイル", "プリント"]),
+        ]
+        diff = diff_items(OLD, new)
+        assert diff.added == [2]
+        assert diff.removed == [2]
+        assert diff.changed == [1]
+        assert diff.summary() == {"added": 1, "removed": 1, "changed": 1}
+        assert diff.in_order
+
+    def test_reorder_detected(self) -> None:
+        diff = diff_items(OLD, list(reversed(OLD)))
+        assert diff.is_empty()
+        assert not diff.in_order
+
+    def test_from_empty(self) -> None:
+        diff = diff_items([], OLD)
+        assert diff.added == [0, 1, 2]
+
+    def test_duplicate_paths_are_distinct(self) -> None:
+        items = [("", "", ["表示", "-"]), ("", "", ["表示", "-"])]
+        assert item_keys(items) == [(("表示", "-"), 0), (("表示", "-"), 1)]
+        diff = diff_items(items[:1], items)
+        assert diff.added == [1]
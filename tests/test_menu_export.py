@@ -0,0 +1,168 @@
+"""Tests for menu_export module."""
+
+import csv
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Iterator, List
+from unittest.mock import MagicMock, patch
+from xml.etree import ElementTree
+
+import pytest
+
+from menu_export import EXPORT_FORMATS, build_header, build_shortcut_rows, export_items
+from menu_extractor import MenuItem
+
+ITEMS: List[MenuItem] = [
+    ("Cmd", "N", ["ファイル", "新規"]),
+    ("", "", ["ファイル", "書き出す", "PDF"]),
+    ("Cmd+Shift", "Z", ["編集", "やり直す"]),
+]
+
+ROWS = [
+    ["修飾キー", "キー", "Level 1", "Level 2", "Level 3"],
+    ["Cmd", "N", "ファイル", "新規", ""],
+    ["", "", "ファイル", "書き出す", "PDF"],
+    ["Cmd+Shift", "Z", "編集", "やり直す", ""],
+]
+
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _read_xlsx(path: str) -> List[List[str]]:
+    with zipfile.ZipFile(path) as zf:
+        root = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    return [
+        ["".join(c.itertext()) for c in row.findall("x:c", NS)]
+        for row in root.iter(f"{{{NS['x']}}}row")
+    ]
+
+
+class TestBuildHeader:
+    def test_levels(self) -> None:
+        assert build_header(2) == ["修飾キー", "キー", "Level 1", "Level 2"]
+
+    def test_at_least_one_level(self) -> None:
+        assert build_header(0) == ["修飾キー", "キー", "Level 1"]
+
+
+class TestBuildShortcutRows:
+    def test_drops_items_without_key(self) -> None:
+        assert build_shortcut_rows(ITEMS) == [
+            ["修飾キー", "キー", "メニュー"],
+            ["Cmd", "N", "ファイル > 新規"],
+            ["Cmd+Shift", "Z", "編集 > やり直す"],
+        ]
+
+    def test_merges_duplicate_shortcuts(self) -> None:
+        items: List[MenuItem] = [
+            ("Cmd", "W", ["ファイル", "閉じる"]),
+            ("Cmd", "N", ["ファイル", "新規"]),
+            ("Cmd", "W", ["ウインドウ", "閉じる"]),
+            ("Cmd", "W", ["ファイル", "閉じる"]),
+            ("", "W", ["ファイル", "閉じる"]),
+        ]
+        assert build_shortcut_rows(items)[1:] == [
+            ["Cmd", "W", "ファイル > 閉じる\nウインドウ > 閉じる"],
+            ["Cmd", "N", "ファイル > 新規"],
+            ["", "W", "ファイル > 閉じる"],
+        ]
+
+
+class TestExportItems:
+    def test_csv(self, tmp_path: Path) -> None:
+        path, count = export_items("Safari", ITEMS, str(tmp_path), "csv")
+        assert count == 3
+        assert os.path.basename(path).startswith("Safari_")
+        assert path.endswith(".csv")
+        with open(path, encoding="utf-8", newline="") as f:
+            assert list(csv.reader(f)) == ROWS
+
+    def test_tsv(self, tmp_path: Path) -> None:
+        path, _ = export_items("Safari", ITEMS, str(tmp_path), "tsv")
+        with open(path, encoding="utf-8", newline="") as f:
+            assert list(csv.reader(f, dialect="excel-tab")) == ROWS
+
+    def test_jsonl(self, tmp_path: Path) -> None:
+        path, _ = export_items("Safari", ITEMS, str(tmp_path), "jsonl")
+        with open(path, encoding="utf-8") as f:
+            assert [json.loads(line) for line in f] == ROWS
+
+    def test_xlsx(self, tmp_path: Path) -> None:
+        path, _ = export_items("Safari", ITEMS, str(tmp_path), "xlsx")
+        assert _read_xlsx(path) == ROWS
+        with zipfile.ZipFile(path) as zf:
+            assert 'name="Safari"' in zf.read("xl/workbook.xml").decode()
+
+    def test_xlsx_escapes_text(self, tmp_path: Path) -> None:
+        items: List[MenuItem] = [("", "", ["<表示>", 'A & "B"\x01'])]
+        path, _ = export_items("a/b: [c]", items, str(tmp_path), "xlsx")
+        assert _read_xlsx(path)[1] == ["", "", "<表示>", 'A & "B"']
+        with zipfile.ZipFile(path) as zf:
+            assert 'name="a_b_ _c_"' in zf.read("xl/workbook.xml").decode()
+
+    def test_csv_keeps_tabs_and_newlines(self, tmp_path: Path) -> None:
+        items: List[MenuItem] = [("", "", ["A\tB", "line1\nline2"])]
+        path, _ = export_items("App", items, str(tmp_path), "csv")
+        with open(path, encoding="utf-8", newline="") as f:
+            assert list(csv.reader(f))[1] == ["", "", "A\tB", "line1\nline2"]
+
+    def test_consumes_iterator_once(self, tmp_path: Path) -> None:
+        consumed = []
+
+        def _rows() -> Iterator[MenuItem]:
+            for item in ITEMS:
+                consumed.append(item)
+                yield item
+
+        path, count = export_items("Safari", _rows(), str(tmp_path), "jsonl")
+        assert count == 3
+        assert consumed == ITEMS
+
+    def test_empty(self, tmp_path: Path) -> None:
+        path, count = export_items("Safari", [], str(tmp_path), "csv")
+        assert count == 0
+        with open(path, encoding="utf-8", newline="") as f:
+            assert list(csv.reader(f)) == [["修飾キー", "キー", "Level 1"]]
+
+    def test_creates_directory(self, tmp_path: Path) -> None:
+        directory = tmp_path / "a" / "b"
+        path, _ = export_items("Safari", ITEMS, str(directory), "csv")
+        assert os.path.dirname(path) == str(directory)
+
+    def test_failed_write_leaves_no_file(self, tmp_path: Path) -> None:
+        def _rows() -> Iterator[MenuItem]:
+            yield ITEMS[0]
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            export_items("Safari", _rows(), str(tmp_path), "csv")
+        assert os.listdir(tmp_path) == []
+
+    @patch("menu_export.datetime")
+    def test_same_second_does_not_overwrite(
+        self, mock_datetime: MagicMock, tmp_path: Path
+    ) -> None:
+        mock_datetime.now.return_value.strftime.return_value = "2026-01-01_00-00-00"
+        paths = [
+            export_items("Safari", ITEMS[:n], str(tmp_path), "csv") for n in (1, 2, 3)
+        ]
+
+        assert [os.path.basename(p) for p, _ in paths] == [
+            "Safari_2026-01-01_00-00-00.csv",
+            "Safari_2026-01-01_00-00-00_2.csv",
+            "Safari_2026-01-01_00-00-00_3.csv",
+        ]
+        for path, count in paths:
+            with open(path, encoding="utf-8") as f:
+                assert len(f.readlines()) == count + 1
+
+    def test_unknown_format(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError):
+            export_items("Safari", ITEMS, str(tmp_path), "parquet")
+
+    @pytest.mark.parametrize("fmt", EXPORT_FORMATS)
+    def test_every_format_is_written(self, tmp_path: Path, fmt: str) -> None:
+        path, _ = export_items("Safari", ITEMS, str(tmp_path), fmt)
+        assert os.listdir(tmp_path) == [os.path.basename(path)]
@@ -1,18 +1,42 @@
 """Tests for menu_extractor module."""
 
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import textwrap
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from menu_extractor import (
     AccessibilityError,
+    ExtractionTimeoutError,
+    HelperClient,
     MenuBarNotFoundError,
     MenuExtractionError,
+    MenuFilter,
+    PartialMenus,
+    _build_applescript,
+    MODIFIER_TABLE,
     _parse_output,
+    _parse_records,
+    decode_columns,
     decode_glyph,
     decode_modifiers,
+    extract_apps,
     extract_menus,
+    extract_menus_parallel,
+    extract_menus_partial,
+    get_app_identity,
     get_frontmost_app,
+    helper_request,
+    iter_menus,
+    use_helper,
 )
 
 
@@ -51,6 +75,34 @@ class TestDecodeModifiers:
     def test_opt_only_no_cmd(self) -> None:
         assert decode_modifiers(10) == "Opt"
 
+    def test_table_covers_all_masks(self) -> None:
+        assert len(MODIFIER_TABLE) == 16
+        assert MODIFIER_TABLE[9] == "Shift"
+
+    def test_high_bits_ignored(self) -> None:
+        assert decode_modifiers(16 + 1) == "Cmd+Shift"
+
+
+class TestDecodeColumns:
+    def test_decodes_columns(self) -> None:
+        modifiers, keys = decode_columns(
+            ["0", "1", "", "9", "0", "3"],
+            ["N", "N", "", "", "", ""],
+            ["", "", "", "111", "999", ""],
+        )
+        assert modifiers == ["Cmd", "Cmd+Shift", "", "Shift", "Cmd", ""]
+        assert keys == ["N", "N", "", "F1", "Glyph(999)", ""]
+
+    def test_unknown_mask_text(self) -> None:
+        modifiers, _ = decode_columns(["17"], ["A"], [""])
+        assert modifiers == ["Cmd+Shift"]
+
+    def test_matches_parse_output(self) -> None:
+        raw = "App\n0\tN\t\tA\tB\n8\t\t23\tA\tC\n2\t\t\tA\tD\n"
+        _, items = _parse_output(raw)
+        modifiers, keys = decode_columns(["0", "8", "2"], ["N", "", ""], ["", "23", ""])
+        assert [(m, k) for m, k, _ in items] == list(zip(modifiers, keys))
+
 
 class TestDecodeGlyph:
     def test_known_glyph(self) -> None:
@@ -124,23 +176,229 @@ class TestParseOutput:
         assert items == []
 
 
+def _records(app_name: str, rows: list) -> str:
+    """Build ``wire="records"`` output as emitted by osascript."""
+    body = (
+        app_name
+        + "\x1f"
+        + "".join(
+            "\x1f".join(row[:3] + ["\x1d".join(row[3:])]) + "\x1f" for row in rows
+        )
+    )
+    header = f"AML1\x1f{len(rows)}"
+    return f"{len(header)}:{header}{body}\n"
+
+
+class TestParseRecords:
+    def test_basic(self) -> None:
+        raw = _records(
+            "Safari", [["0", "N", "", "ファイル", "新規"], ["", "", "", "表示"]]
+        )
+        app_name, items = _parse_records(raw)
+        assert app_name == "Safari"
+        assert items == [("Cmd", "N", ["ファイル", "新規"]), ("", "", ["表示"])]
+
+    def test_matches_text_format(self) -> None:
+        rows = [["1", "S", "", "ファイル", "保存"], ["8", "", "100", "移動", "戻る"]]
+        text = "App\n" + "\n".join("\t".join(r) for r in rows) + "\n"
+        assert _parse_records(_records("App", rows)) == _parse_output(text)
+
+    def test_titles_keep_tabs_and_newlines(self) -> None:
+        raw = _records(" App ", [["", "", "", "A\tB", "line1\nline2 "]])
+        app_name, items = _parse_records(raw)
+        assert app_name == " App "
+        assert items == [("", "", ["A\tB", "line1\nline2 "])]
+
+    def test_app_name_only(self) -> None:
+        assert _parse_records(_records("Safari", [])) == ("Safari", [])
+
+    def test_truncated_output_raises(self) -> None:
+        raw = _records("Safari", [["0", "N", "", "ファイル", "新規"]])
+        with pytest.raises(MenuExtractionError):
+            _parse_records(raw[:-6])
+
+    def test_row_count_mismatch_raises(self) -> None:
+        raw = _records("Safari", [["0", "N", "", "ファイル"]]).replace(
+            "AML1\x1f1", "AML1\x1f2"
+        )
+        with pytest.raises(MenuExtractionError):
+            _parse_records(raw)
+
+    def test_not_records_format_raises(self) -> None:
+        with pytest.raises(MenuExtractionError):
+            _parse_records("Safari\n0\tN\t\tファイル\t新規\n")
+        with pytest.raises(MenuExtractionError):
+            _parse_records("")
+
+
+class TestBuildAppleScript:
+    def test_accumulates_rows_in_list(self) -> None:
+        script = _build_applescript()
+        assert "set end of my outRows to rowText" in script
+        assert "text item delimiters" in script
+        assert "outputText & " not in script
+
+    def test_bulk_fetches_attributes_per_menu(self) -> None:
+        script = _build_applescript(traversal="bulk")
+        assert "name of every menu item of theMenu" in script
+        assert (
+            'value of attribute "AXMenuItemCmdChar" of every menu item of theMenu'
+            in script
+        )
+        # Per-item handler is kept as a fallback for menus where bulk fails
+        assert "on processMenuEach(theMenu, pathSoFar, depth, TB)" in script
+        assert "my processMenuEach(theMenu, pathSoFar, depth, TB)" in script
+
+    def test_item_mode_has_no_bulk_queries(self) -> None:
+        script = _build_applescript(traversal="item")
+        assert "every menu item" not in script
+        assert "processMenuEach" not in script
+
+    def test_unknown_traversal(self) -> None:
+        with pytest.raises(ValueError):
+            _build_applescript(traversal="fast")
+
+    def test_stream_logs_rows(self) -> None:
+        script = _build_applescript(stream=True)
+        assert "log rowText" in script
+        assert "set end of my outRows" not in script
+
+    def test_records_wire(self) -> None:
+        script = _build_applescript(wire="records")
+        assert "set TB to (ASCII character 31)" in script
+        assert "set LS to (ASCII character 29)" in script
+        assert "set end of my outRows to rowText & RT" in script
+        assert '"AML1" & TB' in script
+
+    def test_records_wire_cannot_stream(self) -> None:
+        with pytest.raises(ValueError):
+            _build_applescript(stream=True, wire="records")
+
+    def test_unknown_wire(self) -> None:
+        with pytest.raises(ValueError):
+            _build_applescript(wire="json")
+
+    def test_no_filter_walks_everything(self) -> None:
+        script = _build_applescript()
+        assert "my processMenu(menu 1 of mbi, mbiName, 2, TB)" in script
+        assert "on withinDepth(depth)\n    return true" in script
+        assert "on skipSubtree(n)\n    return false" in script
+        assert "does not contain mbiName" not in script
+
+    def test_exclude_top_level_menus(self) -> None:
+        script = _build_applescript(exclude=["ウインドウ", "ヘルプ"])
+        assert '{"ウインドウ", "ヘルプ"} does not contain mbiName' in script
+
+    def test_include_and_exclude(self) -> None:
+        script = _build_applescript(include=["File"], exclude=["Help"])
+        assert '{"File"} contains mbiName' in script
+        assert '{"Help"} does not contain mbiName' in script
+
+    @pytest.mark.parametrize("traversal", ["item", "bulk"])
+    def test_max_depth(self, traversal: str) -> None:
+        script = _build_applescript(traversal=traversal, max_depth=3)
+        assert "return depth < 3" in script
+        assert "depth + 1, TB)" in script
+
+    def test_bulk_skips_submenu_fetch_at_max_depth(self) -> None:
+        script = _build_applescript(traversal="bulk", max_depth=2)
+        assert (
+            "if descend then set subs to menus of every menu item of theMenu" in script
+        )
+
+    def test_max_depth_below_two(self) -> None:
+        with pytest.raises(ValueError):
+            _build_applescript(max_depth=1)
+
+    def test_skip_patterns(self) -> None:
+        script = _build_applescript(skip=["Open Recent", "最近*", "*Services", "ab*b"])
+        assert (
+            'return n is "Open Recent" or (n starts with "最近") or (n ends with "Services")'
+            ' or (n starts with "ab" and n ends with "b" and length of n >= 3)'
+        ) in script
+        assert "not my skipSubtree(n)" in script
+        assert "on globMatch(" not in script
+
+    def test_skip_patterns_with_parts_in_order(self) -> None:
+        script = _build_applescript(skip=["A*b*c", "*a*b*"])
+        assert (
+            'return my globMatch(n, {"A", "b", "c"}) or my globMatch(n, {"", "a", "b", ""})'
+            in script
+        )
+        assert script.count("on globMatch(n, parts)") == 1
+        # Each middle part is searched after the previous one
+        assert "set k to offset of p in remaining" in script
+
+    def test_keeps_every_row_by_default(self) -> None:
+        assert "on keepRow(c, g)\n    return true" in _build_applescript()
+
+    @pytest.mark.parametrize("traversal", ["item", "bulk"])
+    def test_shortcuts_only(self, traversal: str) -> None:
+        script = _build_applescript(traversal=traversal, shortcuts_only=True)
+        assert 'on keepRow(c, g)\n    return c is not "" or g is not ""' in script
+        # Items without a shortcut are still descended into
+        assert "depth + 1, TB)" in script
+        assert script.count("my emitRow(m & TB") == script.count("my keepRow(c, g)")
+
+    def test_shortcuts_only_queries_modifiers_of_kept_rows(self) -> None:
+        script = _build_applescript(traversal="item", shortcuts_only=True)
+        keep = script.index("if my keepRow(c, g) then")
+        assert script.index('"AXMenuItemCmdModifiers" of mi') > keep
+        assert script.index('"AXMenuItemCmdChar" of mi') < keep
+
+    def test_checkpoint(self) -> None:
+        script = _build_applescript(stream=True, checkpoint=True, exclude=["ヘルプ"])
+        assert (
+            '                if {"ヘルプ"} does not contain mbiName then\n'
+            "                    my processMenu(menu 1 of mbi, mbiName, 2, TB)\n"
+            "                    my checkpointMenu(mbiName)\n"
+            "                end if\n"
+        ) in script
+        assert "log ((ASCII character 30) & n)" in script
+        assert "checkpointMenu" not in _build_applescript(stream=True)
+
+    def test_checkpoint_requires_stream(self) -> None:
+        with pytest.raises(ValueError):
+            _build_applescript(checkpoint=True)
+
+    def test_skip_pattern_is_escaped(self) -> None:
+        script = _build_applescript(skip=['Say "Hi"*'])
+        assert '(n starts with "Say \\"Hi\\"")' in script
+
+
 class TestGetFrontmostApp:
     @patch("menu_extractor.subprocess.run")
     def test_success(self, mock_run: MagicMock) -> None:
-        mock_run.return_value = MagicMock(
-            returncode=0, stdout="Safari\n", stderr=""
-        )
+        mock_run.return_value = MagicMock(returncode=0, stdout="Safari\n", stderr="")
         assert get_frontmost_app() == "Safari"
 
     @patch("menu_extractor.subprocess.run")
     def test_failure(self, mock_run: MagicMock) -> None:
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="error"
-        )
+        mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="error")
         with pytest.raises(MenuExtractionError):
             get_frontmost_app()
 
 
+class TestGetAppIdentity:
+    @patch("menu_extractor.subprocess.run")
+    def test_frontmost(self, mock_run: MagicMock) -> None:
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Safari\ncom.apple.Safari\n18.0\n", stderr=""
+        )
+        assert get_app_identity() == ("Safari", "com.apple.Safari", "18.0")
+        assert "whose frontmost is true" in mock_run.call_args[0][0][2]
+
+    @patch("menu_extractor.subprocess.run")
+    def test_named_app(self, mock_run: MagicMock) -> None:
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Safari\ncom.apple.Safari\n18.0\n", stderr=""
+        )
+        assert get_app_identity('My "App"') == ("Safari", "com.apple.Safari", "18.0")
+        script = mock_run.call_args[0][0][2]
+        assert "frontmost" not in script
+        assert 'application process "My \\"App\\""' in script
+
+
 class TestExtractMenus:
     @patch("menu_extractor.subprocess.run")
     def test_success(self, mock_run: MagicMock) -> None:
@@ -153,6 +411,61 @@ class TestExtractMenus:
         assert app_name == "Safari"
         assert len(items) == 1
 
+    @patch("menu_extractor.subprocess.run")
+    def test_bulk_traversal(self, mock_run: MagicMock) -> None:
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout="Safari\n0\tN\t\tファイル\t新規\n",
+            stderr="",
+        )
+        app_name, items = extract_menus(traversal="bulk")
+        assert (app_name, items) == ("Safari", [("Cmd", "N", ["ファイル", "新規"])])
+        script = mock_run.call_args[0][0][2]
+        assert "name of every menu item of theMenu" in script
+
+    @patch("menu_extractor.subprocess.run")
+    def test_profiling_counters(self, mock_run: MagicMock) -> None:
+        import timing
+
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Safari\n0\tN\t\tファイル\t新規\n", stderr=""
+        )
+        profiler = timing.enable()
+        try:
+            extract_menus()
+        finally:
+            timing.disable()
+        assert set(profiler.spans) == {"osascript", "parse"}
+        assert profiler.counters == {"osascript_calls": 1, "osascript_bytes": 32}
+
+    @patch("menu_extractor.subprocess.run")
+    def test_records_wire(self, mock_run: MagicMock) -> None:
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout=_records("Safari", [["0", "N", "", "ファイル", "新規\tウインドウ"]]),
+            stderr="",
+        )
+        app_name, items = extract_menus(wire="records")
+        assert (app_name, items) == (
+            "Safari",
+            [("Cmd", "N", ["ファイル", "新規\tウインドウ"])],
+        )
+        script = mock_run.call_args[0][0][2]
+        assert "(ASCII character 31)" in script
+
+    @patch("menu_extractor.subprocess.run")
+    def test_menu_filter(self, mock_run: MagicMock) -> None:
+        mock_run.return_value = MagicMock(returncode=0, stdout="Safari\n", stderr="")
+        extract_menus(
+            menu_filter=MenuFilter(
+                exclude=("ヘルプ",), max_depth=2, skip=("Open Recent",)
+            )
+        )
+        script = mock_run.call_args[0][0][2]
+        assert '{"ヘルプ"} does not contain mbiName' in script
+        assert "return depth < 2" in script
+        assert 'return n is "Open Recent"' in script
+
     @patch("menu_extractor.subprocess.run")
     def test_menu_bar_not_found(self, mock_run: MagicMock) -> None:
         mock_run.return_value = MagicMock(
@@ -165,9 +478,7 @@ class TestExtractMenus:
 
     @patch("menu_extractor.subprocess.run")
     def test_generic_error(self, mock_run: MagicMock) -> None:
-        mock_run.return_value = MagicMock(
-            returncode=1, stdout="", stderr="some error"
-        )
+        mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="some error")
         with pytest.raises(MenuExtractionError):
             extract_menus()
 
@@ -176,7 +487,7 @@ class TestExtractMenus:
         import subprocess
 
         mock_run.side_effect = subprocess.TimeoutExpired(cmd="osascript", timeout=60)
-        with pytest.raises(MenuExtractionError, match="タイムアウト"):
+        with pytest.raises(ExtractionTimeoutError, match="タイムアウト"):
             extract_menus()
 
     @patch("menu_extractor.subprocess.run")
@@ -198,3 +509,379 @@ class TestExtractMenus:
         )
         with pytest.raises(AccessibilityError):
             extract_menus()
+
+
+def _fake_popen(stderr: str, returncode: int = 0) -> MagicMock:
+    proc = MagicMock()
+    proc.stderr = io.StringIO(stderr)
+    proc.returncode = returncode
+    proc.poll.return_value = returncode
+    return proc
+
+
+class TestIterMenus:
+    @patch("menu_extractor.subprocess.Popen")
+    def test_yields_rows(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(
+            "Safari\n0\tN\t\tファイル\t新規\n\t\t\t表示\tツールバーを表示\n"
+        )
+        app_name, rows = iter_menus()
+        assert app_name == "Safari"
+        assert list(rows) == [
+            ("Cmd", "N", ["ファイル", "新規"]),
+            ("", "", ["表示", "ツールバーを表示"]),
+        ]
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_uses_streaming_script(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen("Safari\n")
+        iter_menus()
+        script = mock_popen.call_args[0][0][2]
+        assert "log rowText" in script
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_error_after_rows(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(
+            "Safari\n0\tN\t\tファイル\t新規\n1:2: execution error: boom (-1728)\n",
+            returncode=1,
+        )
+        _, rows = iter_menus()
+        it = iter(rows)
+        assert next(it) == ("Cmd", "N", ["ファイル", "新規"])
+        with pytest.raises(MenuExtractionError, match="boom"):
+            next(it)
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_menu_bar_not_found(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(
+            "83:95: execution error: Can't get menu bar 1 of process. (-1728)\n",
+            returncode=1,
+        )
+        with pytest.raises(MenuBarNotFoundError):
+            iter_menus()
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_empty_output_raises(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen("")
+        with pytest.raises(MenuExtractionError):
+            iter_menus()
+
+
+class _ExpiredTimer:
+    """threading.Timer stand-in whose timeout fires as soon as it starts."""
+
+    def __init__(self, interval: float, function: Callable[[], None]) -> None:
+        self.function = function
+
+    def start(self) -> None:
+        self.function()
+
+    def cancel(self) -> None:
+        pass
+
+
+class TestExtractMenusPartial:
+    OUTPUT = (
+        "Safari\n0\tN\t\tファイル\t新規\n\x1eファイル\n"
+        "\t\t\t表示\tツールバーを表示\n"
+    )
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_checkpoints_are_reported(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(self.OUTPUT + "\x1e表示\n")
+        completed: List[str] = []
+        _, rows = iter_menus(on_checkpoint=completed.append)
+        assert len(list(rows)) == 2
+        assert completed == ["ファイル", "表示"]
+        assert "my checkpointMenu(mbiName)" in mock_popen.call_args[0][0][2]
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_complete(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(self.OUTPUT + "\x1e表示\n")
+        result = extract_menus_partial()
+        assert result == PartialMenus(
+            "Safari",
+            [
+                ("Cmd", "N", ["ファイル", "新規"]),
+                ("", "", ["表示", "ツールバーを表示"]),
+            ],
+            ["ファイル", "表示"],
+            True,
+        )
+
+    @patch("menu_extractor.threading.Timer", _ExpiredTimer)
+    @patch("menu_extractor.subprocess.Popen")
+    def test_timeout_keeps_rows(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(self.OUTPUT, returncode=-9)
+        result = extract_menus_partial(timeout=1)
+        assert result.complete is False
+        assert result.completed == ["ファイル"]
+        assert len(result.items) == 2
+
+    @patch("menu_extractor.threading.Timer", _ExpiredTimer)
+    @patch("menu_extractor.subprocess.Popen")
+    def test_iter_menus_still_raises_on_timeout(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(self.OUTPUT, returncode=-9)
+        _, rows = iter_menus(timeout=1)
+        with pytest.raises(ExtractionTimeoutError):
+            list(rows)
+
+    @patch("menu_extractor.subprocess.Popen")
+    def test_resume_walks_unfinished_menus(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value = _fake_popen(
+            "Safari\n\t\t\t表示\tツールバーを表示\n\t\t\t表示\tサイドバー\n\x1e表示\n"
+        )
+        earlier = PartialMenus(
+            "Safari",
+            [
+                ("Cmd", "N", ["ファイル", "新規"]),
+                ("", "", ["表示", "ツールバーを表示"]),
+            ],
+            ["ファイル"],
+            False,
+        )
+        result = extract_menus_partial(
+            resume=earlier, menu_filter=MenuFilter(exclude=("ヘルプ",))
+        )
+
+        script = mock_popen.call_args[0][0][2]
+        assert 'set frontApp to "Safari"' in script
+        assert '{"ヘルプ", "ファイル"} does not contain mbiName' in script
+        assert result == PartialMenus(
+            "Safari",
+            [
+                ("Cmd", "N", ["ファイル", "新規"]),
+                ("", "", ["表示", "ツールバーを表示"]),
+                ("", "", ["表示", "サイドバー"]),
+            ],
+            ["ファイル", "表示"],
+            True,
+        )
+
+
+FAKE_OSASCRIPT = """\
+import re
+import sys
+import time
+
+script = sys.argv[2]
+if "every menu bar item" in script:
+    print("Safari\\nファイル\\n編集\\n表示")
+    sys.exit(0)
+menu = re.search(r'if {"(.*?)"} contains mbiName', script).group(1)
+rows = {
+    "ファイル": ["0\\tN\\t\\tファイル\\t新規", "\\t\\t\\tファイル\\t書き出す"],
+    "編集": ["0\\tC\\t\\t編集\\tコピー"],
+    "表示": ["\\t\\t\\t表示\\tツールバーを表示"],
+}[menu]
+# The first menu finishes last to check that results keep menu bar order
+time.sleep(0.3 if menu == "ファイル" else 0)
+print("\\n".join(["Safari"] + rows))
+"""
+
+
+@pytest.fixture
+def fake_osascript(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Put a fake osascript on PATH that emits canned per-menu output."""
+    exe = tmp_path / "osascript"
+    exe.write_text(f"#!{sys.executable}\n" + textwrap.dedent(FAKE_OSASCRIPT))
+    exe.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return exe
+
+
+class TestExtractMenusParallel:
+    def test_merges_in_menu_bar_order(self, fake_osascript: Path) -> None:
+        app_name, items = extract_menus_parallel(max_workers=3)
+        assert app_name == "Safari"
+        assert items == [
+            ("Cmd", "N", ["ファイル", "新規"]),
+            ("", "", ["ファイル", "書き出す"]),
+            ("Cmd", "C", ["編集", "コピー"]),
+            ("", "", ["表示", "ツールバーを表示"]),
+        ]
+
+    def test_single_worker(self, fake_osascript: Path) -> None:
+        _, items = extract_menus_parallel(max_workers=1)
+        assert [item[2][0] for item in items] == [
+            "ファイル",
+            "ファイル",
+            "編集",
+            "表示",
+        ]
+
+    @patch("menu_extractor.subprocess.run")
+    def test_worker_error_is_raised(self, mock_run: MagicMock) -> None:
+        mock_run.side_effect = [
+            MagicMock(returncode=0, stdout="Safari\nファイル\n", stderr=""),
+            MagicMock(
+                returncode=1, stdout="", stderr="is not allowed assistive access"
+            ),
+        ]
+        with pytest.raises(AccessibilityError):
+            extract_menus_parallel()
+
+
+def _run_by_app(cmd: list, **kwargs: object) -> MagicMock:
+    """subprocess.run stand-in answering per target process."""
+    script = cmd[2]
+    if "bundle identifier" in script:
+        app = script.split('application process "')[1].split('"')[0]
+        return MagicMock(
+            returncode=0, stdout=f"{app}\ncom.example.{app}\n1.0\n", stderr=""
+        )
+    if "background only is false" in script:
+        return MagicMock(returncode=0, stdout="Safari\nFinder\nXcode\n", stderr="")
+    if 'set frontApp to "Finder"' in script:
+        return MagicMock(returncode=1, stdout="", stderr="can't get menu bar 1")
+    app = "Safari" if 'set frontApp to "Safari"' in script else "Xcode"
+    return MagicMock(returncode=0, stdout=f"{app}\n0\tN\t\tファイル\t新規\n", stderr="")
+
+
+class TestExtractApps:
+    @patch("menu_extractor.subprocess.run", side_effect=_run_by_app)
+    def test_named_apps_keep_order(self, mock_run: MagicMock) -> None:
+        results = extract_apps(["Xcode", "Safari", "Xcode"], max_workers=2)
+        assert [r.app_name for r in results] == ["Xcode", "Safari"]
+        assert results[1].items == [("Cmd", "N", ["ファイル", "新規"])]
+        assert all(r.error is None and r.seconds >= 0 for r in results)
+        assert (results[1].bundle_id, results[1].version) == (
+            "com.example.Safari",
+            "1.0",
+        )
+
+    @patch("menu_extractor.subprocess.run", side_effect=_run_by_app)
+    def test_all_running_apps(self, mock_run: MagicMock) -> None:
+        results = extract_apps()
+        assert [r.app_name for r in results] == ["Safari", "Finder", "Xcode"]
+        assert results[1].items == []
+        assert isinstance(results[1].error, MenuBarNotFoundError)
+        assert results[2].error is None
+
+    @patch("menu_extractor.subprocess.run", side_effect=_run_by_app)
+    def test_menu_filter_applies_to_every_app(self, mock_run: MagicMock) -> None:
+        extract_apps(["Safari", "Xcode"], menu_filter=MenuFilter(max_depth=3))
+        scripts = [
+            c[0][0][2]
+            for c in mock_run.call_args_list
+            if "set frontApp to" in c[0][0][2]
+        ]
+        assert len(scripts) == 2 and all("return depth < 3" in s for s in scripts)
+
+    @patch("menu_extractor.subprocess.run", side_effect=_run_by_app)
+    def test_extract_menus_by_name(self, mock_run: MagicMock) -> None:
+        assert extract_menus(app_name="Safari")[0] == "Safari"
+        assert 'set frontApp to "Safari"' in mock_run.call_args[0][0][2]
+
+
+class _StandInHelper(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answers every helper request with the next canned response."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, responses: List[Dict[str, Any]]) -> None:
+        self.requests: List[Dict[str, Any]] = []
+        self.responses = responses
+        super().__init__(path, _StandInHandler)
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    server: _StandInHelper
+
+    def handle(self) -> None:
+        self.server.requests.append(json.loads(self.rfile.readline()))
+        self.wfile.write(json.dumps(self.server.responses.pop(0)).encode() + b"\n")
+
+
+class TestHelperClient:
+    @pytest.fixture
+    def helper(self, tmp_path: Path) -> Iterator[_StandInHelper]:
+        server = _StandInHelper(str(tmp_path / "h.sock"), [])
+        thread = threading.Thread(
+            target=server.serve_forever, args=(0.05,), daemon=True
+        )
+        thread.start()
+        use_helper(HelperClient(str(tmp_path / "h.sock")))
+        yield server
+        use_helper(None)
+        server.shutdown()
+        server.server_close()
+
+    @patch("menu_extractor.subprocess.run")
+    def test_extract_menus_through_helper(
+        self, mock_run: MagicMock, helper: _StandInHelper
+    ) -> None:
+        helper.responses.append(
+            {
+                "returncode": 0,
+                "stdout": "Safari\n0\tN\t\tファイル\t新規\n",
+                "stderr": "",
+            }
+        )
+        assert extract_menus() == ("Safari", [("Cmd", "N", ["ファイル", "新規"])])
+        mock_run.assert_not_called()
+        assert helper.requests[0]["op"] == "run"
+        assert helper.requests[0]["timeout"] == 60
+        assert "processMenu" in helper.requests[0]["source"]
+
+    def test_script_error(self, helper: _StandInHelper) -> None:
+        helper.responses.append(
+            {"returncode": 1, "stdout": "", "stderr": "is not allowed assistive access"}
+        )
+        with pytest.raises(AccessibilityError):
+            extract_menus()
+
+    def test_timeout(self, helper: _StandInHelper) -> None:
+        helper.responses.append({"timeout": True})
+        with pytest.raises(ExtractionTimeoutError):
+            extract_menus()
+
+    @patch("menu_extractor.subprocess.run")
+    def test_frontmost(self, mock_run: MagicMock, helper: _StandInHelper) -> None:
+        helper.responses.append({"returncode": 0, "stdout": "Safari\n", "stderr": ""})
+        assert get_frontmost_app() == "Safari"
+        assert helper.requests == [{"op": "frontmost", "timeout": 5}]
+        mock_run.assert_not_called()
+
+    @patch("menu_extractor.subprocess.run")
+    def test_busy_helper_falls_back(
+        self, mock_run: MagicMock, helper: _StandInHelper
+    ) -> None:
+        helper.responses.append({"busy": True})
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Safari\n0\tN\t\tファイル\t新規\n", stderr=""
+        )
+        assert extract_menus() == ("Safari", [("Cmd", "N", ["ファイル", "新規"])])
+        mock_run.assert_called_once()
+
+    @patch("menu_extractor.subprocess.run")
+    def test_error_response_falls_back(
+        self, mock_run: MagicMock, helper: _StandInHelper
+    ) -> None:
+        helper.responses.append({"error": "unknown op"})
+        mock_run.return_value = MagicMock(returncode=0, stdout="Safari\n", stderr="")
+        assert get_frontmost_app() == "Safari"
+        mock_run.assert_called_once()
+
+    @patch("menu_extractor.subprocess.Popen")
+    @patch("menu_extractor.subprocess.run")
+    def test_absent_helper_falls_back_and_starts_once(
+        self, mock_run: MagicMock, mock_popen: MagicMock, tmp_path: Path
+    ) -> None:
+        mock_run.return_value = MagicMock(returncode=0, stdout="Safari\n", stderr="")
+        use_helper(
+            HelperClient(str(tmp_path / "missing.sock"), autostart=True, idle=30)
+        )
+        try:
+            assert get_frontmost_app() == "Safari"
+            assert get_frontmost_app() == "Safari"
+        finally:
+            use_helper(None)
+        assert mock_run.call_count == 2
+        args = mock_popen.call_args[0][0]
+        assert args[1].endswith("menu_helper.py")
+        assert args[2:] == [str(tmp_path / "missing.sock"), "--idle", "30"]
+        assert mock_popen.call_count == 1
+
+    def test_not_in_use(self) -> None:
+        assert helper_request({"op": "ping"}) is None
@@ -0,0 +1,178 @@
+"""Tests for menu_helper module."""
+
+import json
+import os
+import socket
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from menu_helper import HelperServer, Runner, is_running, main
+
+# Stand-in for the JXA runner: answers each {"source": ...} line with the
+# source echoed on stdout; "sleep" hangs, "crash" exits and "fail" errors.
+STUB_RUNNER = """\
+import json
+import os
+import sys
+import time
+
+for line in sys.stdin:
+    source = json.loads(line)["source"]
+    if source == "sleep":
+        time.sleep(30)
+    if source == "slow":
+        time.sleep(1)
+    if source == "crash":
+        sys.exit(1)
+    if source == "fail":
+        response = {"returncode": 1, "stdout": "", "stderr": "boom (-1728)"}
+    else:
+        response = {"returncode": 0, "stdout": f"{os.getpid()}:{source}\\n", "stderr": ""}
+    print(json.dumps(response), flush=True)
+"""
+
+
+@pytest.fixture
+def runner_command(tmp_path: Path) -> List[str]:
+    stub = tmp_path / "runner.py"
+    stub.write_text(textwrap.dedent(STUB_RUNNER))
+    return [sys.executable, str(stub)]
+
+
+@pytest.fixture
+def server(tmp_path: Path, runner_command: List[str]) -> Iterator[HelperServer]:
+    server = HelperServer(str(tmp_path / "h.sock"), Runner(runner_command), idle=60)
+    thread = threading.Thread(target=server.serve_until_idle, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def _request(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            response: Dict[str, Any] = json.loads(f.readline())
+            return response
+
+
+def _stdout(response: Dict[str, Any]) -> str:
+    """Script source echoed by the stub runner, without its pid."""
+    text: str = response["stdout"]
+    return text.split(":", 1)[1]
+
+
+class TestHelperServer:
+    def test_ping(self, server: HelperServer) -> None:
+        assert _request(server.server_address, {"op": "ping"}) == {"ok": True}  # type: ignore[arg-type]
+
+    def test_run(self, server: HelperServer) -> None:
+        response = _request(server.server_address, {"op": "run", "source": "return 1"})  # type: ignore[arg-type]
+        assert response["returncode"] == 0
+        assert _stdout(response) == "return 1\n"
+
+    def test_runner_is_reused(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        first = _request(path, {"op": "run", "source": "a"})
+        second = _request(path, {"op": "run", "source": "b"})
+        assert first["stdout"].split(":")[0] == second["stdout"].split(":")[0]
+
+    def test_script_error(self, server: HelperServer) -> None:
+        response = _request(server.server_address, {"op": "run", "source": "fail"})  # type: ignore[arg-type]
+        assert response == {"returncode": 1, "stdout": "", "stderr": "boom (-1728)"}
+
+    def test_frontmost(self, server: HelperServer) -> None:
+        response = _request(server.server_address, {"op": "frontmost"})  # type: ignore[arg-type]
+        assert "frontmost is true" in _stdout(response)
+
+    def test_notify_quotes_text(self, server: HelperServer) -> None:
+        response = _request(
+            server.server_address,  # type: ignore[arg-type]
+            {"op": "notify", "message": 'say "hi" \\', "title": "タイトル"},
+        )
+        assert (
+            _stdout(response)
+            == 'display notification "say \\"hi\\" \\\\" with title "タイトル"\n'
+        )
+
+    def test_timeout_restarts_runner(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        before = _request(path, {"op": "run", "source": "a"})
+        assert _request(path, {"op": "run", "source": "sleep", "timeout": 0.2}) == {
+            "timeout": True
+        }
+        after = _request(path, {"op": "run", "source": "a"})
+        assert before["stdout"].split(":")[0] != after["stdout"].split(":")[0]
+
+    def test_crashed_runner(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        assert _request(path, {"op": "run", "source": "crash"})["returncode"] == 1
+        assert _stdout(_request(path, {"op": "run", "source": "a"})) == "a\n"
+
+    def test_concurrent_clients_are_not_queued(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        responses: List[Dict[str, Any]] = []
+
+        def _call() -> None:
+            responses.append(
+                _request(path, {"op": "run", "source": "slow", "timeout": 3})
+            )
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=_call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join(timeout=10)
+
+        # One caller runs its script, the others are refused at once and
+        # fall back to osascript; no script is left to run afterwards
+        assert sum(1 for r in responses if r.get("returncode") == 0) == 1
+        assert sum(1 for r in responses if r == {"busy": True}) == 3
+        assert time.monotonic() - started < 2.5
+        assert _stdout(_request(path, {"op": "run", "source": "a"})) == "a\n"
+
+    def test_bad_requests(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        assert "error" in _request(path, {"op": "shutdown"})
+        assert "error" in _request(path, {"op": "run"})
+
+    def test_socket_is_private(self, server: HelperServer) -> None:
+        mode = os.stat(server.server_address).st_mode & 0o777  # type: ignore[arg-type]
+        assert mode & 0o077 == 0
+
+
+class TestIdleExit:
+    def test_exits_and_removes_socket(
+        self, tmp_path: Path, runner_command: List[str]
+    ) -> None:
+        path = str(tmp_path / "h.sock")
+        thread = threading.Thread(
+            target=main,
+            args=([path, "--idle", "0.5", "--runner", *runner_command],),
+            daemon=True,
+        )
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not is_running(path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert is_running(path)
+
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert not os.path.exists(path)
+
+    def test_second_helper_leaves_first_running(self, server: HelperServer) -> None:
+        path: str = server.server_address  # type: ignore[assignment]
+        main([path, "--idle", "5"])  # returns at once
+        assert is_running(path)
@@ -0,0 +1,156 @@
+"""Tests for menu_snapshots module."""
+
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from menu_diff import diff_items
+from menu_extractor import MenuItem
+from menu_snapshots import SnapshotStore, _split
+
+ITEMS: List[MenuItem] = [
+    ("", "", ["Safari", "Safariについて"]),
+    ("⌘", "q", ["Safari", "Safariを終了"]),
+    ("⌘", "n", ["ファイル", "新規ウインドウ"]),
+    ("⇧⌘", "n", ["ファイル", "新規プライベートウインドウ"]),
+    ("⌘", "c", ["編集", "コピー"]),
+]
+
+
+def _chunk_count(tmp_path: Path) -> int:
+    return sum(len(files) for _, _, files in os.walk(tmp_path / "chunks"))
+
+
+class TestSplit:
+    def test_one_chunk_per_top_level_menu(self) -> None:
+        chunks = list(_split(ITEMS))
+        assert [len(c) for c in chunks] == [2, 2, 1]
+
+    def test_empty(self) -> None:
+        assert list(_split([])) == []
+
+
+class TestSnapshotStore:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        snapshot = store.put(
+            "Safari", ITEMS, bundle_id="com.apple.Safari", version="18.0", created=100.0
+        )
+
+        assert snapshot.items == len(ITEMS)
+        assert len(snapshot.chunks) == 3
+        assert store.list() == [snapshot]
+        # A new instance reads everything back from disk
+        reopened = SnapshotStore(str(tmp_path))
+        assert reopened.items(reopened.find(snapshot.id)) == ITEMS
+        assert reopened.find(snapshot.id[:6]) == snapshot
+
+    def test_identical_menus_are_stored_once(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        store.put("Safari", ITEMS, version="17.0", created=1.0)
+        store.put("Safari", ITEMS, version="18.0", created=2.0)
+        changed = ITEMS[:-1] + [("⌘", "v", ["編集", "ペースト"])]
+        store.put("Safari", changed, version="18.0", created=3.0)
+
+        assert len(store.list("Safari")) == 3
+        # Three top-level menus, plus the changed 編集 menu
+        assert _chunk_count(tmp_path) == 4
+
+    def test_unchanged_run_adds_no_snapshot(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        v1 = store.put("Safari", ITEMS[:2], version="17.0", created=0.0)
+        v2 = store.put("Safari", ITEMS, version="18.0", created=1.0)
+        for run in range(2, 27):
+            assert store.put("Safari", ITEMS, version="18.0", created=float(run)) == v2
+        store.put("Finder", ITEMS, created=30.0)
+
+        assert store.put("Safari", ITEMS, version="18.0", created=31.0) == v2
+        store.prune(20)
+        assert store.list("Safari") == [v1, v2]
+
+    def test_list_by_app(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        a = store.put("Safari", ITEMS, created=1.0)
+        b = store.put("Finder", ITEMS[2:], created=2.0)
+        c = store.put("Safari", ITEMS[:2], created=3.0)
+
+        assert store.list("Safari") == [a, c]
+        assert store.list("Finder") == [b]
+        assert store.apps() == ["Safari", "Finder"]
+        assert store.latest("Safari") == c
+        assert store.latest("Mail") is None
+
+    def test_diff(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        new_items = ITEMS[:4] + [("⌘", "x", ["編集", "コピー"])]
+        old = store.put("Safari", ITEMS, created=1.0)
+        new = store.put("Safari", new_items, created=2.0)
+
+        assert store.diff(old, new) == diff_items(ITEMS, new_items)
+        assert store.diff(old, new).changed == [4]
+
+    def test_diff_of_equal_snapshots_reads_no_chunks(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        old = store.put("Safari", ITEMS, version="17.0", created=1.0)
+        new = store.put("Safari", ITEMS, version="18.0", created=2.0)
+        for root, _, files in os.walk(tmp_path / "chunks"):
+            for name in files:
+                os.remove(os.path.join(root, name))
+
+        assert SnapshotStore(str(tmp_path)).diff(old, new).summary() == {
+            "added": 0,
+            "removed": 0,
+            "changed": 0,
+        }
+
+    def test_find_unknown_or_ambiguous(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        store.put("Safari", ITEMS, created=1.0)
+        with pytest.raises(KeyError):
+            store.find("zz")
+        with pytest.raises(KeyError):
+            store.find("")
+
+    def test_prune_removes_unused_chunks(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        store.put("Safari", ITEMS, created=1.0)
+        kept = store.put("Safari", ITEMS[2:], created=2.0)
+        finder = store.put("Finder", ITEMS[:2], created=3.0)
+
+        # The Safari menu chunk is still used by Finder's snapshot
+        assert store.prune(1) == 0
+        assert store.list() == [kept, finder]
+        store.prune(0)
+        assert store.list() == []
+        assert _chunk_count(tmp_path) == 0
+
+    def test_prune_without_changes_keeps_index(self, tmp_path: Path) -> None:
+        store = SnapshotStore(str(tmp_path))
+        snapshot = store.put("Safari", ITEMS, created=1.0)
+        assert store.prune(5) == 0
+        assert store.list() == [snapshot]
+
+    def test_broken_index_is_empty(self, tmp_path: Path) -> None:
+        (tmp_path / "index.json").write_text("{")
+        assert SnapshotStore(str(tmp_path)).list() == []
+
+    def test_history_stays_small(self, tmp_path: Path) -> None:
+        menus = [
+            ("⌘", str(i % 10), [f"Menu{m}", f"Item{i}"])
+            for m in range(10)
+            for i in range(50)
+        ]
+        store = SnapshotStore(str(tmp_path))
+        store.put("App", menus, created=0.0)
+        first = store.disk_usage()
+        for run in range(1, 20):
+            # Each run changes one item in one menu
+            items = list(menus)
+            items[run] = ("⌥", "x", items[run][2])
+            store.put("App", items, created=float(run))
+
+        # Only the changed menu is stored again: 20 runs cost far less than 20 copies
+        assert _chunk_count(tmp_path) == 10 + 19
+        assert store.disk_usage() < first * 20 / 3
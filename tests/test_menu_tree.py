@@ -0,0 +1,58 @@
+"""Tests for menu_tree module."""
+
+from menu_extractor import _parse_output
+from menu_tree import NO_SHORTCUT, MenuTree
+
+ITEMS = [
+    ("Cmd", "N", ["ファイル", "新規"]),
+    ("", "", ["ファイル", "書き出す"]),
+    ("", "", ["ファイル", "書き出す", "PDF"]),
+    ("Cmd+Shift", "E", ["ファイル", "書き出す", "PNG"]),
+    ("Cmd", "F1", ["ファイル", "ヘルプ"]),
+    ("Cmd", "C", ["編集", "コピー"]),
+    ("", "", ["編集", "コピー"]),
+]
+
+
+class TestMenuTree:
+    def test_roundtrip(self) -> None:
+        tree = MenuTree.from_items(ITEMS)
+        assert list(tree.iter_items()) == ITEMS
+
+    def test_len_counts_rows_only(self) -> None:
+        tree = MenuTree.from_items(ITEMS)
+        assert len(tree) == len(ITEMS)
+        # Top-level menus are structural nodes
+        assert tree.node_count == len(ITEMS) + 2
+
+    def test_names_are_interned(self) -> None:
+        tree = MenuTree.from_items(ITEMS)
+        assert tree.names.count("ファイル") == 1
+        assert tree.names.count("コピー") == 1
+
+    def test_packed_shortcuts(self) -> None:
+        tree = MenuTree.from_items(ITEMS)
+        rows = [i for i in range(tree.node_count) if tree.is_row[i]]
+        assert tree.modifier[rows[0]] == 0
+        assert tree.modifier[rows[1]] == NO_SHORTCUT
+        assert tree.modifier[rows[3]] == 1
+        assert tree.keys[tree.key[rows[4]]] == "F1"
+
+    def test_no_cmd_modifier(self) -> None:
+        items = [("", "Escape", ["表示", "閉じる"]), ("Shift", "A", ["表示", "全体"])]
+        assert list(MenuTree.from_items(items).iter_items()) == items
+
+    def test_max_depth(self) -> None:
+        assert MenuTree.from_items(ITEMS).max_depth() == 3
+        assert MenuTree.from_items([]).max_depth() == 0
+
+    def test_from_parser_output(self) -> None:
+        raw = (
+            "Finder\n"
+            "0\tN\t\tファイル\t新規Finderウィンドウ\n"
+            "\t\t\tファイル\t最近使った項目\n"
+            "\t\t\tファイル\t最近使った項目\tA\n"
+            "9\t\t111\t表示\tフルスクリーン\n"
+        )
+        _, items = _parse_output(raw)
+        assert list(MenuTree.from_items(items).iter_items()) == items
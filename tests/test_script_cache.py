@@ -0,0 +1,123 @@
+"""Tests for script_cache module."""
+
+import os
+import sys
+import textwrap
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import script_cache
+from script_cache import ScriptCache, osascript_args
+
+# Stub osacompile: "-o OUT SRC" writes the source prefixed with "compiled:"
+# and appends a line to calls.log next to the script; "fail" in the source
+# makes it exit with an error like a syntax error would.
+STUB_COMPILER = """\
+import os
+import sys
+
+out, src = sys.argv[2], sys.argv[3]
+with open(os.path.join(os.path.dirname(__file__), "calls.log"), "a") as f:
+    f.write("compile\\n")
+with open(src, encoding="utf-8") as f:
+    source = f.read()
+if "fail" in source:
+    sys.exit(1)
+with open(out, "w", encoding="utf-8") as f:
+    f.write("compiled:" + source)
+"""
+
+
+@pytest.fixture
+def compiler(tmp_path: Path) -> List[str]:
+    stub = tmp_path / "osacompile.py"
+    stub.write_text(textwrap.dedent(STUB_COMPILER))
+    return [sys.executable, str(stub)]
+
+
+def _compile_count(tmp_path: Path) -> int:
+    log = tmp_path / "calls.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+class TestScriptCache:
+    def test_compiles_once(self, tmp_path: Path, compiler: List[str]) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler)
+        first = cache.compiled('return "a"')
+        second = cache.compiled('return "a"')
+
+        assert first is not None and first == second
+        assert first.endswith(".scpt")
+        assert Path(first).read_text() == 'compiled:return "a"'
+        assert _compile_count(tmp_path) == 1
+        # No temporary source or output is left behind
+        assert os.listdir(tmp_path / "scripts") == [os.path.basename(first)]
+
+    def test_key_follows_source(self, tmp_path: Path, compiler: List[str]) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler)
+        assert cache.compiled('return "a"') != cache.compiled('return "b"')
+        assert ScriptCache.make_key("x") == ScriptCache.make_key("x")
+        assert ScriptCache.make_key("x") != ScriptCache.make_key("y")
+
+    def test_version_is_part_of_key(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        key = ScriptCache.make_key("x")
+        monkeypatch.setattr(script_cache, "CACHE_VERSION", "2")
+        assert ScriptCache.make_key("x") != key
+
+    def test_args(self, tmp_path: Path, compiler: List[str]) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler)
+        args = cache.args("on run argv\nend run", "hello", "title")
+        assert args[0] == "osascript"
+        assert args[1].endswith(".scpt")
+        assert args[2:] == ["hello", "title"]
+
+    def test_compile_error_runs_source(
+        self, tmp_path: Path, compiler: List[str]
+    ) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler)
+        assert cache.args("fail", "x") == ["osascript", "-e", "fail", "x"]
+        assert os.listdir(tmp_path / "scripts") == []
+        # Other scripts are still compiled
+        assert cache.compiled("ok") is not None
+
+    def test_missing_compiler_is_not_retried(self, tmp_path: Path) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), [str(tmp_path / "missing")])
+        assert cache.compiled("a") is None
+        assert cache.unavailable
+        assert cache.args("b") == ["osascript", "-e", "b"]
+
+    def test_lru_eviction(self, tmp_path: Path, compiler: List[str]) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler, max_entries=2)
+        a = cache.compiled("a")
+        b = cache.compiled("b")
+        assert a is not None and b is not None
+        os.utime(a, (1, 1))
+        os.utime(b, (2, 2))
+        cache.compiled("a")  # a hit refreshes its use time
+        cache.compiled("c")
+
+        assert os.path.exists(a)
+        assert not os.path.exists(b)
+        assert len(os.listdir(tmp_path / "scripts")) == 2
+
+    def test_clear(self, tmp_path: Path, compiler: List[str]) -> None:
+        cache = ScriptCache(str(tmp_path / "scripts"), compiler)
+        cache.compiled("a")
+        cache.clear()
+        assert os.listdir(tmp_path / "scripts") == []
+
+
+class TestOsascriptArgs:
+    def test_disabled_by_default(self) -> None:
+        assert osascript_args("return 1", "x") == ["osascript", "-e", "return 1", "x"]
+
+    def test_enabled(self, tmp_path: Path, compiler: List[str]) -> None:
+        script_cache.enable(str(tmp_path / "scripts"), compiler)
+        try:
+            args = osascript_args("return 1")
+        finally:
+            script_cache.disable()
+        assert args[1].startswith(str(tmp_path / "scripts"))
+        assert osascript_args("return 1") == ["osascript", "-e", "return 1"]
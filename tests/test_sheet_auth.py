@@ -0,0 +1,149 @@
+"""Tests for sheet_auth module against a local fake token endpoint."""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth.transport.requests import AuthorizedSession, Request
+
+from sheet_auth import load_credentials
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    """Token endpoint plus an API endpoint that only accepts the latest token."""
+
+    issued: List[str] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers["Content-Length"]))
+        token = f"token-{len(self.issued) + 1}"
+        self.issued.append(token)
+        self._reply(
+            200, {"access_token": token, "expires_in": 3600, "token_type": "Bearer"}
+        )
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.headers.get("Authorization") == f"Bearer {self.issued[-1]}":
+            self._reply(200, {"ok": True})
+        else:
+            self._reply(401, {"error": "invalid token"})
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[str]:
+    FakeGoogle.issued = []
+    httpd = HTTPServer(("127.0.0.1", 0), FakeGoogle)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(scope="module")
+def private_key() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture
+def credentials_file(tmp_path: Path, server: str, private_key: str) -> Path:
+    path = tmp_path / "credentials.json"
+    path.write_text(
+        json.dumps(
+            {
+                "type": "service_account",
+                "project_id": "test",
+                "private_key_id": "1",
+                "private_key": private_key,
+                "client_email": "writer@test.iam.gserviceaccount.com",
+                "client_id": "1",
+                "token_uri": f"{server}/token",
+            }
+        )
+    )
+    return path
+
+
+class TestLoadCredentials:
+    def test_token_reused_across_runs(
+        self, tmp_path: Path, credentials_file: Path, server: str
+    ) -> None:
+        cache = tmp_path / "data" / "token_cache.json"
+
+        first = load_credentials(str(credentials_file), SCOPES, str(cache))
+        assert AuthorizedSession(first).get(f"{server}/api").status_code == 200
+        assert FakeGoogle.issued == ["token-1"]
+        assert cache.stat().st_mode & 0o777 == 0o600
+
+        second = load_credentials(str(credentials_file), SCOPES, str(cache))
+        assert second.token == "token-1"
+        assert AuthorizedSession(second).get(f"{server}/api").status_code == 200
+        assert FakeGoogle.issued == ["token-1"]
+
+    def test_expiring_token_is_refreshed(
+        self, tmp_path: Path, credentials_file: Path, server: str
+    ) -> None:
+        cache = tmp_path / "token_cache.json"
+        creds = load_credentials(str(credentials_file), SCOPES, str(cache))
+        creds.refresh(Request())
+        data = json.loads(cache.read_text())
+        (entry,) = data.values()
+        entry["expiry"] = (datetime.now() + timedelta(minutes=1)).timestamp()
+        cache.write_text(json.dumps(data))
+
+        again = load_credentials(str(credentials_file), SCOPES, str(cache))
+        assert again.token is None
+        AuthorizedSession(again).get(f"{server}/api")
+        assert FakeGoogle.issued == ["token-1", "token-2"]
+
+    def test_refresh_on_401(
+        self, tmp_path: Path, credentials_file: Path, server: str
+    ) -> None:
+        cache = tmp_path / "token_cache.json"
+        load_credentials(str(credentials_file), SCOPES, str(cache)).refresh(Request())
+        # Token revoked server-side: the cached one is no longer accepted
+        FakeGoogle.issued.append("token-rotated")
+
+        creds = load_credentials(str(credentials_file), SCOPES, str(cache))
+        assert creds.token == "token-1"
+        response = AuthorizedSession(creds).get(f"{server}/api")
+
+        assert response.status_code == 200
+        assert creds.token == "token-3"
+        assert "token-3" in cache.read_text()
+
+    def test_cache_keyed_by_scopes(
+        self, tmp_path: Path, credentials_file: Path
+    ) -> None:
+        cache = tmp_path / "token_cache.json"
+        load_credentials(str(credentials_file), SCOPES, str(cache)).refresh(Request())
+        other = load_credentials(
+            str(credentials_file),
+            SCOPES + ["https://www.googleapis.com/auth/drive"],
+            str(cache),
+        )
+        assert other.token is None
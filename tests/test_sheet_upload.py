@@ -0,0 +1,195 @@
+"""Tests for sheet_upload module against a local fake Sheets server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import gspread
+import pytest
+import requests
+
+from sheet_upload import plan_chunks, resumable_spreadsheet, rows_digest, upload_rows
+
+SHEETS_API = "https://sheets.googleapis.com"
+
+
+class FakeSheets(BaseHTTPRequestHandler):
+    """Spreadsheet metadata and values:batchUpdate with scripted failures."""
+
+    cells: Dict[int, List[str]] = {}
+    batches: List[str] = []
+    # Status codes for the next batchUpdate calls (200 once exhausted)
+    statuses: List[int] = []
+
+    def do_GET(self) -> None:  # noqa: N802
+        key = self.path.split("?")[0].rsplit("/", 1)[-1]
+        self._reply(
+            200,
+            {
+                "spreadsheetId": key,
+                "properties": {"title": "Safari_2026-01-01"},
+                "sheets": [
+                    {
+                        "properties": {
+                            "sheetId": 0,
+                            "title": "Sheet1",
+                            "index": 0,
+                            "gridProperties": {"rowCount": 1000, "columnCount": 26},
+                        }
+                    }
+                ],
+            },
+        )
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            error = {"error": {"code": status, "message": "fail"}}
+            self._reply(status, error, {"Retry-After": "7"})
+            return
+        for entry in body["data"]:
+            self.batches.append(entry["range"])
+            first = int(entry["range"].split("!A")[1])
+            for offset, row in enumerate(entry["values"]):
+                self.cells[first + offset] = row
+        self._reply(200, {"totalUpdatedRows": 0})
+
+    def _reply(self, status: int, body: Any, headers: Dict[str, str] = {}) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class LocalSession(requests.Session):
+    """Route Sheets API requests to the local fake server."""
+
+    def __init__(self, base: str) -> None:
+        super().__init__()
+        self.base = base
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> Any:  # type: ignore[override]
+        return super().request(
+            method, url.replace(SHEETS_API, self.base), *args, **kwargs
+        )
+
+
+@pytest.fixture
+def sheet() -> Iterator[gspread.Spreadsheet]:
+    FakeSheets.cells = {}
+    FakeSheets.batches = []
+    FakeSheets.statuses = []
+    httpd = HTTPServer(("127.0.0.1", 0), FakeSheets)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    session = LocalSession(f"http://127.0.0.1:{httpd.server_port}")
+    gc = gspread.Client(auth=None, session=session)  # type: ignore[arg-type]
+    yield gc.open_by_key("sheet-key")
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _rows(n: int) -> List[List[str]]:
+    return [["修飾キー", "キー", "Level 1"]] + [
+        ["Cmd", str(i), f"メニュー {i}"] for i in range(n)
+    ]
+
+
+class TestPlanChunks:
+    def test_row_limit(self) -> None:
+        assert plan_chunks(_rows(9), max_rows=4) == [(0, 4), (4, 8), (8, 10)]
+
+    def test_byte_limit(self) -> None:
+        rows = [["x" * 100]] * 5
+        assert plan_chunks(rows, max_bytes=250) == [(0, 2), (2, 4), (4, 5)]
+
+    def test_oversized_row_gets_own_chunk(self) -> None:
+        rows = [["a"], ["x" * 1000], ["b"]]
+        assert plan_chunks(rows, max_bytes=100) == [(0, 1), (1, 2), (2, 3)]
+
+    def test_empty(self) -> None:
+        assert plan_chunks([]) == []
+
+
+class TestUploadRows:
+    def test_uploads_all_chunks(self, sheet: gspread.Spreadsheet) -> None:
+        rows = _rows(9)
+        sent = upload_rows(sheet, rows, max_rows=4)
+        assert sent == 3
+        assert FakeSheets.batches == ["'Sheet1'!A1", "'Sheet1'!A5", "'Sheet1'!A9"]
+        assert [FakeSheets.cells[i + 1] for i in range(len(rows))] == rows
+
+    def test_retries_with_backoff(self, sheet: gspread.Spreadsheet) -> None:
+        FakeSheets.statuses = [503, 500]
+        delays: List[float] = []
+        upload_rows(sheet, _rows(3), base_delay=0.5, sleep=delays.append)
+        assert delays == [0.5, 1.0]
+        assert len(FakeSheets.cells) == 4
+
+    def test_honors_retry_after_on_429(self, sheet: gspread.Spreadsheet) -> None:
+        FakeSheets.statuses = [429]
+        delays: List[float] = []
+        upload_rows(sheet, _rows(3), sleep=delays.append)
+        assert delays == [7.0]
+
+    def test_gives_up_after_max_retries(self, sheet: gspread.Spreadsheet) -> None:
+        FakeSheets.statuses = [503] * 3
+        with pytest.raises(gspread.exceptions.APIError):
+            upload_rows(sheet, _rows(3), max_retries=2, sleep=lambda _: None)
+
+    def test_client_error_is_not_retried(self, sheet: gspread.Spreadsheet) -> None:
+        FakeSheets.statuses = [400]
+        delays: List[float] = []
+        with pytest.raises(gspread.exceptions.APIError):
+            upload_rows(sheet, _rows(3), sleep=delays.append)
+        assert delays == []
+
+    def test_resume_after_interruption(
+        self, sheet: gspread.Spreadsheet, tmp_path: Path
+    ) -> None:
+        rows = _rows(9)
+        progress = tmp_path / "upload.json"
+        # The first chunk is committed, then the second keeps failing
+        FakeSheets.statuses = [200, 503, 503]
+        with pytest.raises(gspread.exceptions.APIError):
+            upload_rows(
+                sheet,
+                rows,
+                str(progress),
+                max_rows=4,
+                max_retries=1,
+                sleep=lambda _: None,
+            )
+        assert json.loads(progress.read_text())["committed"] == 1
+        assert resumable_spreadsheet(str(progress), rows) == "sheet-key"
+
+        FakeSheets.batches = []
+        sent = upload_rows(sheet, rows, str(progress), max_rows=4)
+
+        assert sent == 2
+        assert FakeSheets.batches == ["'Sheet1'!A5", "'Sheet1'!A9"]
+        assert [FakeSheets.cells[i + 1] for i in range(len(rows))] == rows
+        assert not progress.exists()
+
+    def test_progress_for_other_rows_is_ignored(
+        self, sheet: gspread.Spreadsheet, tmp_path: Path
+    ) -> None:
+        progress = tmp_path / "upload.json"
+        stale = {
+            "spreadsheet_id": "sheet-key",
+            "digest": rows_digest(_rows(1)),
+            "committed": 5,
+        }
+        progress.write_text(json.dumps(stale))
+        assert resumable_spreadsheet(str(progress), _rows(9)) is None
+        assert upload_rows(sheet, _rows(9), str(progress), max_rows=4) == 3
@@ -1,10 +1,24 @@
 """Tests for sheet_writer module."""
 
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from unittest.mock import MagicMock, patch
 
+import gspread
 import pytest
 
-from sheet_writer import write_to_spreadsheet
+from menu_diff import MenuDiff
+from menu_extractor import MenuItem
+from sheet_upload import DEFAULT_CHUNK_BYTES, rows_digest
+from sheet_writer import (
+    _batch_requests,
+    _build_rows,
+    write_batch,
+    write_incremental,
+    write_master,
+    write_to_spreadsheet,
+)
 
 
 class TestWriteToSpreadsheet:
@@ -60,6 +74,28 @@ class TestWriteToSpreadsheet:
         assert rows[2] == ["Cmd+Shift", "N", "ファイル", "新規ウィンドウ"]
         assert rows[3] == ["", "", "表示", "ツールバーを表示"]
 
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_shortcut_sheet(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: MagicMock
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        mock_sh = mock_auth.return_value.create.return_value
+
+        items = [
+            ("Cmd", "W", ["ファイル", "閉じる"]),
+            ("Cmd", "W", ["ウインドウ", "閉じる"]),
+            ("Cmd+Shift", "N", ["ファイル", "新規ウィンドウ"]),
+        ]
+        write_to_spreadsheet("Safari", items, str(creds_file), shortcuts=True)
+
+        assert mock_sh.sheet1.update.call_args[0][0] == [
+            ["修飾キー", "キー", "メニュー"],
+            ["Cmd", "W", "ファイル > 閉じる\nウインドウ > 閉じる"],
+            ["Cmd+Shift", "N", "ファイル > 新規ウィンドウ"],
+        ]
+
     @patch("sheet_writer.gspread.authorize")
     @patch("sheet_writer.Credentials.from_service_account_file")
     def test_pads_shorter_rows(
@@ -113,6 +149,529 @@ class TestWriteToSpreadsheet:
         assert rows[0] == ["修飾キー", "キー", "Level 1"]
         assert len(rows) == 1
 
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_large_payload_is_chunked(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: MagicMock
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+
+        mock_gc = MagicMock()
+        mock_auth.return_value = mock_gc
+        mock_sh = mock_gc.create.return_value
+        mock_sh.sheet1.title = "Sheet1"
+
+        items = [("", "", ["メニュー", str(i)]) for i in range(12000)]
+        write_to_spreadsheet("App", items, str(creds_file))
+
+        mock_sh.sheet1.update.assert_not_called()
+        ranges = [
+            c[0][0]["data"][0]["range"]
+            for c in mock_sh.values_batch_update.call_args_list
+        ]
+        assert ranges == ["'Sheet1'!A1", "'Sheet1'!A5001", "'Sheet1'!A10001"]
+
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_resumes_interrupted_upload(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: MagicMock
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        progress = tmp_path / "uploads" / "App.json"
+
+        mock_gc = MagicMock()
+        mock_auth.return_value = mock_gc
+        mock_sh = mock_gc.open_by_key.return_value
+        mock_sh.id = "half-written"
+        mock_sh.sheet1.title = "Sheet1"
+
+        items = [("Cmd", "N", ["ファイル", "新規"])]
+        progress.parent.mkdir()
+        progress.write_text(
+            json.dumps(
+                {
+                    "spreadsheet_id": "half-written",
+                    "digest": rows_digest(_build_rows(items)),
+                    "committed": 0,
+                }
+            )
+        )
+        write_to_spreadsheet("App", items, str(creds_file), progress_path=str(progress))
+
+        mock_gc.open_by_key.assert_called_once_with("half-written")
+        mock_gc.create.assert_not_called()
+        mock_sh.values_batch_update.assert_called_once()
+        assert not progress.exists()
+
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_deleted_resume_target_starts_over(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: MagicMock
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        progress = tmp_path / "uploads" / "App.json"
+
+        mock_gc = MagicMock()
+        mock_auth.return_value = mock_gc
+        mock_gc.open_by_key.side_effect = gspread.exceptions.SpreadsheetNotFound()
+        mock_sh = mock_gc.create.return_value
+        mock_sh.id = "fresh"
+        mock_sh.url = "https://example.com/fresh"
+        mock_sh.sheet1.title = "Sheet1"
+
+        items = [("Cmd", "N", ["ファイル", "新規"])]
+        progress.parent.mkdir()
+        progress.write_text(
+            json.dumps(
+                {
+                    "spreadsheet_id": "deleted",
+                    "digest": rows_digest(_build_rows(items)),
+                    "committed": 1,
+                }
+            )
+        )
+        url = write_to_spreadsheet(
+            "App", items, str(creds_file), progress_path=str(progress)
+        )
+
+        assert url == "https://example.com/fresh"
+        mock_gc.create.assert_called_once()
+        # Progress of the deleted spreadsheet is not applied to the new one
+        mock_sh.values_batch_update.assert_called_once()
+        assert not progress.exists()
+
     def test_missing_credentials(self) -> None:
         with pytest.raises(FileNotFoundError, match="credentials.json"):
             write_to_spreadsheet("App", [], "/nonexistent/credentials.json")
+
+
+class FakeSheet:
+    """In-memory spreadsheet that applies batch_update/values_batch_update."""
+
+    def __init__(self, rows: List[List[str]]) -> None:
+        self.rows = [list(r) for r in rows]
+        self.id = "sheet-key"
+        self.url = "https://example.com/sheet-key"
+        self.sheet1 = MagicMock(id=0, title="Sheet1")
+        self.sheet1.update.side_effect = self._update
+        self.sheet1.clear.side_effect = self.rows.clear
+        self.batch_update = MagicMock(side_effect=self._batch_update)
+        self.values_batch_update = MagicMock(side_effect=self._values_batch_update)
+
+    def _update(self, rows: List[List[str]], _: str) -> None:
+        self.rows[: len(rows)] = [list(r) for r in rows]
+
+    def _batch_update(self, body: Dict[str, Any]) -> None:
+        for request in body["requests"]:
+            ((kind, spec),) = request.items()
+            start, end = spec["range"]["startIndex"], spec["range"]["endIndex"]
+            if kind == "deleteDimension":
+                del self.rows[start:end]
+            else:
+                self.rows[start:start] = [[] for _ in range(end - start)]
+
+    def _values_batch_update(self, body: Dict[str, Any]) -> None:
+        for entry in body["data"]:
+            row = int(entry["range"].split("!A")[1]) - 1
+            self.rows[row] = list(entry["values"][0])
+
+    def values(self) -> List[List[str]]:
+        return [_trim(r) for r in self.rows]
+
+
+def _trim(row: List[str]) -> List[str]:
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+OLD_ITEMS = [
+    ("Cmd", "N", ["ファイル", "新規"]),
+    ("Cmd", "O", ["ファイル", "開く"]),
+    ("", "", ["ファイル", "書き出す", "PDF"]),
+    ("Cmd", "C", ["編集", "コピー"]),
+    ("Cmd", "V", ["編集", "ペースト"]),
+]
+
+
+class TestWriteIncremental:
+    def _run(
+        self, tmp_path: Path, old: List[MenuItem], new: List[MenuItem]
+    ) -> Tuple[FakeSheet, MenuDiff, MagicMock]:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        state_dir = tmp_path / "exports"
+        sheet = FakeSheet([])
+        gc = MagicMock()
+        gc.create.return_value = sheet
+        gc.open_by_key.return_value = sheet
+        with patch("sheet_writer.Credentials.from_service_account_file"), patch(
+            "sheet_writer.gspread.authorize", return_value=gc
+        ):
+            write_incremental("Safari", old, str(creds_file), str(state_dir))
+            sheet.batch_update.reset_mock()
+            sheet.values_batch_update.reset_mock()
+            _, diff = write_incremental("Safari", new, str(creds_file), str(state_dir))
+        return sheet, diff, gc
+
+    def test_first_run_creates_spreadsheet(self, tmp_path: Path) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        sheet = FakeSheet([])
+        gc = MagicMock()
+        gc.create.return_value = sheet
+        with patch("sheet_writer.Credentials.from_service_account_file"), patch(
+            "sheet_writer.gspread.authorize", return_value=gc
+        ):
+            url, diff = write_incremental(
+                "Safari", OLD_ITEMS, str(creds_file), str(tmp_path / "exports")
+            )
+        assert url == sheet.url
+        assert diff.summary() == {"added": 5, "removed": 0, "changed": 0}
+        assert (tmp_path / "exports" / "Safari.json").exists()
+
+    def test_unchanged_makes_no_requests(self, tmp_path: Path) -> None:
+        sheet, diff, gc = self._run(tmp_path, OLD_ITEMS, OLD_ITEMS)
+        assert diff.is_empty()
+        gc.open_by_key.assert_called_once_with("sheet-key")
+        sheet.batch_update.assert_not_called()
+        sheet.values_batch_update.assert_not_called()
+
+    def test_applies_added_removed_changed(self, tmp_path: Path) -> None:
+        new = [
+            ("Cmd", "N", ["ファイル", "新規"]),
+            ("Cmd+Shift", "N", ["ファイル", "新規ウィンドウ"]),
+            ("Cmd+Opt", "O", ["ファイル", "開く"]),
+            ("Cmd", "C", ["編集", "コピー"]),
+            ("Cmd", "A", ["編集", "すべてを選択"]),
+        ]
+        sheet, diff, _ = self._run(tmp_path, OLD_ITEMS, new)
+
+        assert diff.summary() == {"added": 2, "removed": 2, "changed": 1}
+        assert sheet.batch_update.call_count == 1
+        assert sheet.values_batch_update.call_count == 1
+        assert sheet.values() == [
+            ["修飾キー", "キー", "Level 1", "Level 2"],
+            ["Cmd", "N", "ファイル", "新規"],
+            ["Cmd+Shift", "N", "ファイル", "新規ウィンドウ"],
+            ["Cmd+Opt", "O", "ファイル", "開く"],
+            ["Cmd", "C", "編集", "コピー"],
+            ["Cmd", "A", "編集", "すべてを選択"],
+        ]
+
+    @pytest.mark.parametrize("status", [None, 403, 404])
+    def test_missing_spreadsheet_starts_over(
+        self, tmp_path: Path, status: Optional[int]
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        state_dir = tmp_path / "exports"
+        state_dir.mkdir()
+        (state_dir / "Safari.json").write_text(
+            json.dumps({"spreadsheet_id": "deleted", "items": []}), encoding="utf-8"
+        )
+        if status is None:
+            error: Exception = gspread.exceptions.SpreadsheetNotFound()
+        else:
+            error = gspread.exceptions.APIError.__new__(gspread.exceptions.APIError)
+            error.response = MagicMock(status_code=status)  # type: ignore[attr-defined]
+        sheet = FakeSheet([])
+        gc = MagicMock()
+        gc.open_by_key.side_effect = error
+        gc.create.return_value = sheet
+        with patch("sheet_writer.Credentials.from_service_account_file"), patch(
+            "sheet_writer.gspread.authorize", return_value=gc
+        ):
+            url, diff = write_incremental(
+                "Safari", OLD_ITEMS, str(creds_file), str(state_dir)
+            )
+
+        assert url == sheet.url
+        assert diff.summary() == {"added": 5, "removed": 0, "changed": 0}
+        state = json.loads((state_dir / "Safari.json").read_text(encoding="utf-8"))
+        assert state["spreadsheet_id"] == "sheet-key"
+
+    def test_other_open_errors_are_raised(self, tmp_path: Path) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        state_dir = tmp_path / "exports"
+        state_dir.mkdir()
+        (state_dir / "Safari.json").write_text(
+            json.dumps({"spreadsheet_id": "busy", "items": []}), encoding="utf-8"
+        )
+        error = gspread.exceptions.APIError.__new__(gspread.exceptions.APIError)
+        error.response = MagicMock(status_code=500)
+        gc = MagicMock()
+        gc.open_by_key.side_effect = error
+        with patch("sheet_writer.Credentials.from_service_account_file"), patch(
+            "sheet_writer.gspread.authorize", return_value=gc
+        ):
+            with pytest.raises(gspread.exceptions.APIError):
+                write_incremental("Safari", OLD_ITEMS, str(creds_file), str(state_dir))
+        gc.create.assert_not_called()
+
+    def test_reordered_rows_are_rewritten(self, tmp_path: Path) -> None:
+        new = list(reversed(OLD_ITEMS))
+        sheet, diff, _ = self._run(tmp_path, OLD_ITEMS, new)
+        assert not diff.in_order
+        sheet.batch_update.assert_not_called()
+        assert sheet.values()[1] == ["Cmd", "V", "編集", "ペースト"]
+
+
+class TestWriteBatch:
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_one_request_for_all_worksheets(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: Path
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        mock_gc = mock_auth.return_value
+        mock_sh = mock_gc.create.return_value
+        mock_sh.url = "https://example.com"
+
+        results: List[Tuple[str, List[MenuItem]]] = [
+            ("Safari", [("Cmd", "N", ["ファイル", "新規"])]),
+            ("Finder", [("", "", ["表示", "アイコン", "小"])]),
+        ]
+        assert write_batch(results, str(creds_file)) == "https://example.com"
+
+        assert mock_gc.create.call_args[0][0].startswith("menus_")
+        mock_sh.batch_update.assert_called_once()
+        mock_sh.values_batch_update.assert_not_called()
+        requests = mock_sh.batch_update.call_args[0][0]["requests"]
+        assert [next(iter(r)) for r in requests] == [
+            "updateSheetProperties",
+            "updateCells",
+            "addSheet",
+            "updateCells",
+        ]
+        first = requests[0]["updateSheetProperties"]["properties"]
+        assert first == {
+            "sheetId": 0,
+            "title": "Safari",
+            "gridProperties": {"rowCount": 2, "columnCount": 4},
+        }
+        assert requests[2]["addSheet"]["properties"]["sheetId"] == 1
+        assert requests[2]["addSheet"]["properties"]["title"] == "Finder"
+        cells = requests[3]["updateCells"]
+        assert cells["start"] == {"sheetId": 1, "rowIndex": 0, "columnIndex": 0}
+        assert cells["rows"][1]["values"] == [
+            {},
+            {},
+            {"userEnteredValue": {"stringValue": "表示"}},
+            {"userEnteredValue": {"stringValue": "アイコン"}},
+            {"userEnteredValue": {"stringValue": "小"}},
+        ]
+
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_large_batch_is_split_by_size(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: Path
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        mock_sh = mock_auth.return_value.create.return_value
+        items: List[MenuItem] = [
+            ("Cmd", "N", ["ファイル", f"書き出す{i}", "x" * 100]) for i in range(3000)
+        ]
+        results = [(f"App{n}", items) for n in range(4)]
+
+        write_batch(results, str(creds_file))
+
+        bodies = [c[0][0] for c in mock_sh.batch_update.call_args_list]
+        assert len(bodies) > 1
+        for body in bodies:
+            assert (
+                len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+                < DEFAULT_CHUNK_BYTES * 1.01
+            )
+        requests = [r for body in bodies for r in body["requests"]]
+        created = set()
+        written: Dict[int, int] = {}
+        for request in requests:
+            kind, value = next(iter(request.items()))
+            if kind != "updateCells":
+                created.add(value["properties"]["sheetId"])
+                continue
+            # Each worksheet exists before it is filled, top to bottom
+            sheet_id = value["start"]["sheetId"]
+            assert sheet_id in created
+            assert value["start"]["rowIndex"] == written.get(sheet_id, 0)
+            written[sheet_id] = written.get(sheet_id, 0) + len(value["rows"])
+        assert written == {n: len(items) + 1 for n in range(4)}
+
+    def test_duplicate_titles_are_made_unique(self) -> None:
+        items: List[MenuItem] = [("", "", ["ファイル"])]
+        requests = _batch_requests([("App", items), ("App", items), ("x" * 120, items)])
+        titles = [
+            (r.get("addSheet") or r.get("updateSheetProperties"))["properties"]["title"]
+            for r in requests[::2]
+        ]
+        assert titles == ["App", "App (2)", "x" * 100]
+
+    def test_no_results(self) -> None:
+        with pytest.raises(ValueError):
+            write_batch([], "credentials.json")
+
+
+class TestWriteMaster:
+    ROWS = [["修飾キー", "キー", "Level 1"], ["Cmd", "N", "ファイル"]]
+
+    def _gc(self, worksheets: List[Tuple[str, int]]) -> MagicMock:
+        gc = MagicMock()
+        sh = gc.open_by_key.return_value
+        sh.url = "https://example.com/master"
+        sh.worksheets.return_value = [MagicMock(title=t, id=i) for t, i in worksheets]
+        return gc
+
+    def test_adds_missing_worksheet(self, tmp_path: Path) -> None:
+        gc = self._gc([("Sheet1", 0), ("Finder", 7)])
+        path = str(tmp_path / "master_sheets.json")
+
+        url = write_master(gc, "key", [("Safari", self.ROWS)], path)
+
+        assert url == "https://example.com/master#gid=8"
+        sh = gc.open_by_key.return_value
+        sh.batch_update.assert_called_once()
+        requests = sh.batch_update.call_args[0][0]["requests"]
+        assert [next(iter(r)) for r in requests] == [
+            "addSheet",
+            "updateSheetProperties",
+            "updateCells",
+            "updateCells",
+        ]
+        assert requests[0]["addSheet"]["properties"] == {
+            "sheetId": 8,
+            "title": "Safari",
+        }
+        assert requests[1]["updateSheetProperties"]["properties"]["gridProperties"] == {
+            "rowCount": 2,
+            "columnCount": 3,
+        }
+        # Clears the whole worksheet before writing from A1
+        assert requests[2]["updateCells"] == {
+            "range": {"sheetId": 8},
+            "fields": "userEnteredValue",
+        }
+        assert requests[3]["updateCells"]["start"]["sheetId"] == 8
+        cache = json.loads(Path(path).read_text(encoding="utf-8"))
+        assert cache == {"key": {"Sheet1": 0, "Finder": 7, "Safari": 8}}
+
+    def test_cached_ids_skip_listing(self, tmp_path: Path) -> None:
+        path = tmp_path / "master_sheets.json"
+        path.write_text(json.dumps({"key": {"Safari": 3}}), encoding="utf-8")
+        gc = self._gc([])
+
+        url = write_master(gc, "key", [("Safari", self.ROWS)], str(path))
+
+        assert url.endswith("#gid=3")
+        sh = gc.open_by_key.return_value
+        sh.worksheets.assert_not_called()
+        requests = sh.batch_update.call_args[0][0]["requests"]
+        assert [next(iter(r)) for r in requests] == [
+            "updateSheetProperties",
+            "updateCells",
+            "updateCells",
+        ]
+
+    def test_large_worksheets_are_split_by_size(self, tmp_path: Path) -> None:
+        path = tmp_path / "master_sheets.json"
+        path.write_text(
+            json.dumps({"key": {"Safari": 3, "Finder": 4}}), encoding="utf-8"
+        )
+        gc = self._gc([])
+        rows = [self.ROWS[0]] + [
+            ["Cmd", "N", f"ファイル{i}" + "x" * 100] for i in range(6000)
+        ]
+
+        write_master(gc, "key", [("Safari", rows), ("Finder", rows)], str(path))
+
+        bodies = [
+            c[0][0] for c in gc.open_by_key.return_value.batch_update.call_args_list
+        ]
+        assert len(bodies) > 1
+        assert all(
+            len(json.dumps(b, ensure_ascii=False).encode("utf-8"))
+            < DEFAULT_CHUNK_BYTES * 1.01
+            for b in bodies
+        )
+        cells = [
+            r["updateCells"]
+            for b in bodies
+            for r in b["requests"]
+            if "rows" in r.get("updateCells", {})
+        ]
+        assert sum(len(c["rows"]) for c in cells) == 2 * len(rows)
+
+    def test_stale_cached_id_is_refreshed(self, tmp_path: Path) -> None:
+        path = tmp_path / "master_sheets.json"
+        path.write_text(json.dumps({"key": {"Safari": 3}}), encoding="utf-8")
+        gc = self._gc([("Safari", 5)])
+        sh = gc.open_by_key.return_value
+        error = gspread.exceptions.APIError.__new__(gspread.exceptions.APIError)
+        error.response = MagicMock(status_code=400)
+        sh.batch_update.side_effect = [error, None]
+
+        assert write_master(gc, "key", [("Safari", self.ROWS)], str(path)).endswith(
+            "#gid=5"
+        )
+        assert sh.batch_update.call_count == 2
+        assert json.loads(path.read_text(encoding="utf-8")) == {"key": {"Safari": 5}}
+
+    def test_other_api_errors_are_raised(self, tmp_path: Path) -> None:
+        path = tmp_path / "master_sheets.json"
+        path.write_text(json.dumps({"key": {"Safari": 3}}), encoding="utf-8")
+        gc = self._gc([])
+        error = gspread.exceptions.APIError.__new__(gspread.exceptions.APIError)
+        error.response = MagicMock(status_code=429)
+        gc.open_by_key.return_value.batch_update.side_effect = error
+
+        with pytest.raises(gspread.exceptions.APIError):
+            write_master(gc, "key", [("Safari", self.ROWS)], str(path))
+
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_write_to_spreadsheet_uses_master(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: Path
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        gc = self._gc([("Sheet1", 0)])
+        mock_auth.return_value = gc
+
+        items: List[MenuItem] = [("Cmd", "N", ["ファイル"])]
+        url = write_to_spreadsheet(
+            "Safari", items, str(creds_file), master_key="key", sheet_ids_path=None
+        )
+
+        assert url == "https://example.com/master#gid=1"
+        gc.create.assert_not_called()
+        gc.open_by_key.assert_called_once_with("key")
+
+    @patch("sheet_writer.gspread.authorize")
+    @patch("sheet_writer.Credentials.from_service_account_file")
+    def test_write_batch_uses_master(
+        self, mock_creds: MagicMock, mock_auth: MagicMock, tmp_path: Path
+    ) -> None:
+        creds_file = tmp_path / "credentials.json"
+        creds_file.write_text("{}")
+        gc = self._gc([("Safari", 0)])
+        mock_auth.return_value = gc
+
+        results: List[Tuple[str, List[MenuItem]]] = [
+            ("Safari", [("Cmd", "N", ["ファイル"])]),
+            ("Finder", [("", "", ["表示"])]),
+        ]
+        write_batch(results, str(creds_file), master_key="key")
+
+        gc.create.assert_not_called()
+        requests = gc.open_by_key.return_value.batch_update.call_args[0][0]["requests"]
+        assert requests[0] == {
+            "addSheet": {"properties": {"sheetId": 1, "title": "Finder"}}
+        }
+        assert len(requests) == 7
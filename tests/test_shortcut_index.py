@@ -0,0 +1,172 @@
+"""Tests for shortcut_index module."""
+
+import json
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from menu_extractor import MenuItem
+from shortcut_index import Hit, ShortcutIndex, alfred_items, main, parse_shortcut
+
+XCODE: List[MenuItem] = [
+    ("Cmd+Shift", "K", ["製品", "クリーンビルドフォルダ"]),
+    ("Cmd", "B", ["製品", "ビルド"]),
+    ("", "", ["表示", "ツールバーを表示"]),
+]
+SAFARI: List[MenuItem] = [
+    ("Cmd", "N", ["ファイル", "新規ウインドウ"]),
+    ("Cmd+Shift", "K", ["表示", "100%_拡大"]),
+]
+
+
+@pytest.fixture
+def index() -> Iterator[ShortcutIndex]:
+    with ShortcutIndex(":memory:") as index:
+        index.update("Xcode", XCODE)
+        index.update("Safari", SAFARI)
+        yield index
+
+
+def _paths(hits: List[Hit]) -> List[str]:
+    return sorted(f"{h.app_name}:{' > '.join(h.levels)}" for h in hits)
+
+
+class TestParseShortcut:
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("cmd+shift+k", ("Cmd+Shift", "K")),
+            ("Shift+Command+k", ("Cmd+Shift", "K")),
+            ("⇧⌘K", ("Cmd+Shift", "K")),
+            ("⌥⌃F5", ("Ctrl+Opt", "F5")),
+            ("ctrl+opt+Delete", ("Ctrl+Opt", "Delete")),
+            ("cmd++", ("Cmd", "+")),
+            ("cmd+", ("Cmd", "+")),
+            ("cmd+shift++", ("Cmd+Shift", "+")),
+            ("⌘+", ("Cmd", "+")),
+            ("⇧⌘+", ("Cmd+Shift", "+")),
+        ],
+    )
+    def test_shortcuts(self, text: str, expected: tuple) -> None:
+        assert parse_shortcut(text) == expected
+
+    @pytest.mark.parametrize(
+        "text",
+        ["k", "ビルド", "cmd", "⌘", "foo+k", "cmd+shift", "+", "++", "cmd++k", "foo+"],
+    )
+    def test_not_shortcuts(self, text: str) -> None:
+        assert parse_shortcut(text) is None
+
+
+class TestShortcutIndex:
+    def test_shortcut_across_apps(self, index: ShortcutIndex) -> None:
+        assert _paths(index.search("cmd+shift+k")) == [
+            "Safari:表示 > 100%_拡大",
+            "Xcode:製品 > クリーンビルドフォルダ",
+        ]
+        assert len(index.search("⇧⌘k")) == 2
+        assert len(index.search("cmd shift k")) == 2
+
+    def test_plus_key(self) -> None:
+        with ShortcutIndex(":memory:") as index:
+            index.update(
+                "Preview",
+                [("Cmd", "+", ["表示", "拡大"]), ("Cmd", "-", ["表示", "縮小"])],
+            )
+            for query in ("⌘+", "cmd++", "cmd +"):
+                assert _paths(index.search(query)) == ["Preview:表示 > 拡大"]
+
+    def test_shortcut_and_words(self, index: ShortcutIndex) -> None:
+        assert _paths(index.search("⇧⌘K Xcode")) == [
+            "Xcode:製品 > クリーンビルドフォルダ"
+        ]
+
+    def test_words(self, index: ShortcutIndex) -> None:
+        # Three or more characters go through FTS, shorter words through LIKE
+        assert _paths(index.search("ビルド")) == [
+            "Xcode:製品 > クリーンビルドフォルダ",
+            "Xcode:製品 > ビルド",
+        ]
+        assert _paths(index.search("表示 safari")) == ["Safari:表示 > 100%_拡大"]
+
+    def test_like_wildcards_are_literal(self, index: ShortcutIndex) -> None:
+        assert _paths(index.search("%_")) == ["Safari:表示 > 100%_拡大"]
+        assert index.search("r_") == []
+
+    def test_without_fts(self, index: ShortcutIndex) -> None:
+        index.fts = False
+        assert len(index.search("ビルド")) == 2
+
+    def test_limit_and_empty(self, index: ShortcutIndex) -> None:
+        assert len(index.search("cmd+shift+k", limit=1)) == 1
+        assert index.search("  ") == []
+
+    def test_update_replaces_app(self, index: ShortcutIndex) -> None:
+        assert not index.update("Xcode", XCODE)
+        assert index.update("Xcode", XCODE[:1])
+        assert _paths(index.search("ビルド")) == ["Xcode:製品 > クリーンビルドフォルダ"]
+        assert index.apps() == ["Safari", "Xcode"]
+
+    def test_remove(self, index: ShortcutIndex) -> None:
+        index.remove("Safari")
+        assert index.apps() == ["Xcode"]
+        assert _paths(index.search("cmd+n")) == []
+
+    def test_persists(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "data" / "shortcuts.db")
+        with ShortcutIndex(path) as index:
+            index.update("Xcode", XCODE)
+        with ShortcutIndex(path) as index:
+            assert index.search("cmd+b")[0].levels == ["製品", "ビルド"]
+
+
+class TestScriptFilter:
+    def test_alfred_items(self) -> None:
+        result = alfred_items([Hit("Xcode", "Cmd+Shift", "K", ["製品", "クリーン"])])
+        assert result == {
+            "items": [
+                {
+                    "uid": "Xcode/製品 > クリーン",
+                    "title": "製品 > クリーン",
+                    "subtitle": "Xcode  Cmd+Shift+K",
+                    "arg": "Cmd+Shift+K",
+                    "text": {
+                        "copy": "Xcode: 製品 > クリーン Cmd+Shift+K",
+                        "largetype": "Cmd+Shift+K",
+                    },
+                }
+            ]
+        }
+
+    def test_item_without_shortcut(self) -> None:
+        item = alfred_items([Hit("Xcode", "", "", ["表示"])])["items"][0]
+        assert item["subtitle"] == "Xcode"
+        assert item["arg"] == "表示"
+
+    def test_main(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        path = str(tmp_path / "shortcuts.db")
+        with ShortcutIndex(path) as index:
+            index.update("Xcode", XCODE)
+
+        main(["--db", path, "cmd+b"])
+        result = json.loads(capsys.readouterr().out)
+        assert [i["title"] for i in result["items"]] == ["製品 > ビルド"]
+
+        main(["--db", path, "nothing"])
+        assert (
+            json.loads(capsys.readouterr().out)["items"][0]["title"] == "見つかりません"
+        )
+
+    def test_main_without_index(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        monkeypatch.setenv("alfred_workflow_data", str(tmp_path))
+        main(["cmd+b"])
+        item = json.loads(capsys.readouterr().out)["items"][0]
+        assert item["title"] == "インデックスがありません"
+        assert item["valid"] is False
+        assert not (tmp_path / "shortcuts.db").exists()
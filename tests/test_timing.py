@@ -0,0 +1,96 @@
+"""Tests for timing module."""
+
+import json
+import threading
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+import timing
+
+
+@pytest.fixture(autouse=True)
+def _reset() -> Iterator[None]:
+    yield
+    timing.disable()
+
+
+class TestDisabled:
+    def test_span_is_shared_no_op(self) -> None:
+        assert timing.active() is None
+        first = timing.span("a")
+        assert first is timing.span("b")
+        with first:
+            pass
+
+    def test_counters_are_ignored(self) -> None:
+        timing.count("items", 3)
+        timing.peak("max_depth", 2)
+        profiler = timing.enable()
+        assert profiler.counters == {}
+
+
+class TestProfiler:
+    def test_spans_accumulate(self) -> None:
+        profiler = timing.enable()
+        with patch("timing.time.perf_counter", side_effect=[1.0, 1.5, 2.0, 2.25]):
+            with timing.span("osascript"):
+                pass
+            with timing.span("osascript"):
+                pass
+        assert profiler.spans == {"osascript": [2, 0.75]}
+
+    def test_span_records_on_error(self) -> None:
+        profiler = timing.enable()
+        with pytest.raises(ValueError):
+            with timing.span("upload"):
+                raise ValueError
+        assert profiler.spans["upload"][0] == 1
+
+    def test_counters_and_peaks(self) -> None:
+        profiler = timing.enable()
+        timing.count("api_calls")
+        timing.count("api_calls", 2)
+        timing.peak("max_depth", 3)
+        timing.peak("max_depth", 2)
+        assert profiler.counters == {"api_calls": 3, "max_depth": 3}
+
+    def test_threads(self) -> None:
+        profiler = timing.enable()
+
+        def _work() -> None:
+            for _ in range(1000):
+                timing.count("n")
+
+        threads = [threading.Thread(target=_work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert profiler.counters["n"] == 4000
+
+    def test_report_and_summary(self, tmp_path: Path) -> None:
+        profiler = timing.enable()
+        profiler.add_span("extract", 1.5)
+        profiler.add_span("parse", 0.01)
+        profiler.add_span("write", 0.75)
+        profiler.add_count("items", 10)
+
+        report = profiler.report()
+        assert report["spans"]["extract"] == {"calls": 1, "seconds": 1.5}
+        assert report["counters"] == {"items": 10}
+        assert profiler.summary(limit=2).endswith(": extract 1.50s, write 0.75s")
+
+        path = tmp_path / "sub" / "profile.json"
+        timing.save_report(profiler, str(path))
+        assert (
+            json.loads(path.read_text(encoding="utf-8"))["spans"]["write"]["seconds"]
+            == 0.75
+        )
+
+    def test_disable_returns_profiler(self) -> None:
+        profiler = timing.enable()
+        assert timing.disable() is profiler
+        assert timing.active() is None
@@ -0,0 +1,136 @@
+"""Per-stage timing spans and counters for profiling a workflow run."""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class Profiler:
+    """Collects span durations and counters; safe to use from threads."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        # name -> [calls, seconds], in order of first use
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.spans.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_peak(self, name: str, value: int) -> None:
+        with self._lock:
+            current = self.counters.get(name)
+            if current is None or value > current:
+                self.counters[name] = value
+
+    def report(self) -> Dict[str, Any]:
+        """Spans, counters and total wall time as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 4),
+                "spans": {
+                    name: {"calls": int(calls), "seconds": round(seconds, 4)}
+                    for name, (calls, seconds) in self.spans.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def summary(self, limit: int = 4) -> str:
+        """One-line summary of the slowest spans, for a notification."""
+        with self._lock:
+            slowest = sorted(self.spans.items(), key=lambda kv: kv[1][1], reverse=True)
+            parts = [f"{name} {seconds:.2f}s" for name, (_, seconds) in slowest[:limit]]
+        total = time.perf_counter() - self.started
+        return (
+            f"合計 {total:.2f}s: " + ", ".join(parts) if parts else f"合計 {total:.2f}s"
+        )
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.profiler.add_span(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+# Profiler of the current run; None (the default) disables every hook
+_active: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """Start collecting into a new profiler and return it."""
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def disable() -> Optional[Profiler]:
+    """Stop collecting and return the profiler that was active, if any."""
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    """The active profiler, or None when profiling is off."""
+    return _active
+
+
+def span(name: str) -> Any:
+    """Context manager timing a stage; a shared no-op when profiling is off."""
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return _Span(profiler, name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to a counter when profiling is on."""
+    profiler = _active
+    if profiler is not None:
+        profiler.add_count(name, n)
+
+
+def peak(name: str, value: int) -> None:
+    """Keep the largest ``value`` seen for a counter when profiling is on."""
+    profiler = _active
+    if profiler is not None:
+        profiler.set_peak(name, value)
+
+
+def save_report(profiler: Profiler, path: str) -> None:
+    """Write ``profiler.report()`` as JSON."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profiler.report(), f, ensure_ascii=False, indent=2)